@@ -1,5 +1,6 @@
 # Streamlit UI
 import streamlit as st
+import json
 import uuid
 import requests
 from langchain_core.messages import HumanMessage, AIMessage
@@ -85,13 +86,29 @@ if "agent_state" not in st.session_state:
     st.session_state.pending_tool_call = None
 
 API_URL = "http://localhost:5000/chat"
+STREAM_URL = f"{API_URL}/stream"
 
 # ───────────────────────────────────────────────
 # 3. Helper Functions 🛠️
 # ───────────────────────────────────────────────
+def _iter_sse(response):
+    """Parses a server-sent event stream into (event, data) pairs."""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
 def run_agent(user_input=None, resume_input=None):
     """
-    Client-side logic to call the Flask API.
+    Client-side logic to call the API.
+    Streams the run from /chat/stream: answer tokens appear as they are generated
+    and tool calls show up in a status box while the agent works.
     """
     payload = {
         "thread_id": st.session_state.thread_id
@@ -107,37 +124,60 @@ def run_agent(user_input=None, resume_input=None):
         payload["action"] = resume_input # "APPROVE" or "REJECT"
     
     try:
-        with st.spinner("🤖 AI is processing..."):
-            response = requests.post(API_URL, json=payload)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Case 1: Completed successfully
-                if data["status"] == "completed":
-                    response_text = data["response"]
-                    st.session_state.messages.append(AIMessage(content=response_text))
-                    st.session_state.agent_state = "ready"
-                    st.session_state.pending_tool_call = None
-                    st.rerun()
-                
-                # Case 2: Requires Action (Interrupt)
-                elif data["status"] == "requires_action":
-                    st.session_state.agent_state = "waiting_approval"
-                    st.session_state.pending_tool_call = {
-                        "name": data["tool"],
-                        "args": data["args"],
-                        "message": data["message"]
-                    }
-                    st.rerun()
-                
-                # Case 3: Stopped (e.g. Rejected)
-                elif data["status"] == "stopped":
-                    st.error(f"Workflow Stopped: {data.get('reason')}")
-                    st.session_state.agent_state = "ready"
-            
-            else:
-                 st.error(f"API Error: {response.text}")
+        with st.chat_message("assistant"):
+            status = st.status("🤖 AI is processing...", expanded=False)
+            placeholder = st.empty()
+            streamed = ""
+
+            with requests.post(STREAM_URL, json=payload, stream=True, timeout=(5, 300)) as response:
+                if response.status_code != 200:
+                    st.error(f"API Error: {response.text}")
+                    return
+
+                for event, data in _iter_sse(response):
+                    if event == "token":
+                        streamed += data["content"]
+                        placeholder.markdown(streamed + "▌")
+
+                    elif event == "tool_call":
+                        # A new model turn follows the tool; start its answer fresh
+                        streamed = ""
+                        placeholder.empty()
+                        status.write(f"🛠️ Calling `{data['name']}`")
+
+                    elif event == "tool_result":
+                        streamed = ""
+                        placeholder.empty()
+                        status.write(f"✅ `{data['name']}` finished")
+
+                    # Case 1: Completed successfully
+                    elif event == "done" and data["status"] == "completed":
+                        status.update(label="✅ Done", state="complete")
+                        st.session_state.messages.append(AIMessage(content=data["response"]))
+                        st.session_state.agent_state = "ready"
+                        st.session_state.pending_tool_call = None
+                        st.rerun()
+
+                    # Case 2: Requires Action (Interrupt)
+                    elif event == "interrupt":
+                        status.update(label="✋ Waiting for approval", state="complete")
+                        st.session_state.agent_state = "waiting_approval"
+                        st.session_state.pending_tool_call = {
+                            "name": data["tool"],
+                            "args": data["args"],
+                            "message": data["message"]
+                        }
+                        st.rerun()
+
+                    # Case 3: Stopped (e.g. Rejected)
+                    elif event == "done" and data["status"] == "stopped":
+                        status.update(label="🚫 Stopped", state="error")
+                        st.error(f"Workflow Stopped: {data.get('reason')}")
+                        st.session_state.agent_state = "ready"
+
+                    elif event == "error":
+                        status.update(label="❌ Error", state="error")
+                        st.error(f"API Error: {data.get('error') or data.get('message')}")
                  
     except requests.exceptions.ConnectionError:
         st.error("❌ Could not connect to Backend. Is `main.py` running on Port 5000?")
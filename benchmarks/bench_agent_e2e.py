@@ -0,0 +1,232 @@
+# Benchmark: end-to-end agent sessions, fully offline (scripted LLM, no network)
+# Usage: python -m benchmarks.bench_agent_e2e [--rows 10000] [--sessions 50] [--concurrency 8]
+#                                             [--llm-latency-ms 0] [--flow chat|interactive|both]
+#                                             [--fake-embeddings]
+#
+# Each session handles one synthetic customer the way a user would:
+#   chat:        POST /chat "Process retention for customer N" -> requires_action (email)
+#                -> POST /chat APPROVE -> completed   (ASGI app in-process, sessions concurrent)
+#   interactive: runner.run_turn on the sync graph: the same request + approval, then a
+#                "details" follow-up turn   (sessions one after another, like the CLI)
+# The LLM is src.agents.llm's retention script; the DB, churn model, policy rule table and
+# vectorstore are built from scratch in a temp dir. Reports p50/p99 per request, sessions/s
+# and where the time goes (LLM, SQL, ML, RAG).
+
+import os
+os.environ["LLM_PROVIDER"] = "fake"     # before anything creates a model
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+import uuid
+
+import httpx
+from langchain_core.messages import HumanMessage, ToolMessage
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+import main
+from src.agents import graph
+from src.agents.runner import run_turn
+from src.ml import predictor
+from src.ml.artifact import load_artifact
+from src.ml.registry import ModelRegistry
+from src.rag import policy_rules, retriever, store
+from src.tools import fetch_bookings, policy_search
+from src.utils import db_ops
+from src.utils.setup_db import setup_database
+
+# Which tool's time counts towards which stage
+STAGES = {
+    "fetch_customer_booking": "SQL",
+    "get_customer_risk_score": "ML",
+    "get_policy_limits": "RAG",
+    "search_retention_policy": "RAG",
+}
+TRAIN_ROWS = 20_000     # the churn model is trained on (at most) this many bookings
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return statistics.median(samples) * 1000, p99 * 1000
+
+def _use_embeddings(fake):
+    """The real embedding model if it can be loaded (and `fake` is off), else deterministic fake vectors."""
+    if not fake:
+        try:
+            store.get_embedding_model().embed_query("warm up")
+            return "all-MiniLM-L6-v2"
+        except Exception as e:
+            print(f"⚠️ Embedding model not available ({type(e).__name__}); using fake embeddings")
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    model = DeterministicFakeEmbedding(size=384)
+    store.get_embedding_model = retriever.get_embedding_model = lambda: model
+    return "fake (384-d)"
+
+def prepare(tmp_dir, rows, fake_embeddings=False):
+    """Builds every data dependency in tmp_dir and points the tools at it."""
+    db_path = os.path.join(tmp_dir, "bookings.db")
+    setup_database(db_path, rows=rows)
+    db_ops.DB_PATH = fetch_bookings.DB_PATH = db_path
+
+    # Churn model
+    train_db = db_path
+    if rows > TRAIN_ROWS:
+        train_db = os.path.join(tmp_dir, "train.db")
+        setup_database(train_db, rows=TRAIN_ROWS, migrate=False)
+    predictor.DB_PATH = train_db
+    predictor.MODEL_PATH = os.path.join(tmp_dir, "churn_model.joblib")
+    predictor.model_registry = ModelRegistry(predictor.MODEL_PATH, loader=load_artifact)
+    predictor.train_model()
+
+    # Policy rule table + vectorstore
+    rules_path = os.path.join(tmp_dir, "policy_rules.db")
+    policy_rules.build_policy_rules(policy_rules.PDF_PATH, rules_path)
+    policy_rules.policy_rulebook = policy_rules.PolicyRuleBook(rules_path)
+    embeddings = _use_embeddings(fake_embeddings)
+    vector_path = os.path.join(tmp_dir, "chroma_db")
+    store.build_vectorstore(store.PDF_PATH, vector_path)
+    retriever.retriever_service = policy_search.retriever_service = retriever.RetrieverService(db_path=vector_path)
+    retriever.retriever_service.warm()
+
+    # Never send real email from a benchmark
+    os.environ.pop("EMAIL_ADDRESS", None)
+    os.environ.pop("EMAIL_PASSWORD", None)
+    return embeddings
+
+def _tool_timings(messages, stage_samples):
+    for message in messages:
+        if isinstance(message, ToolMessage) and "duration_ms" in message.response_metadata:
+            stage = STAGES.get(message.name, "other tools")
+            stage_samples.setdefault(stage, []).append(message.response_metadata["duration_ms"] / 1000)
+
+# ───────────────────────────────────────────────
+# Flows
+# ───────────────────────────────────────────────
+async def chat_flow(customer_ids, concurrency, memory_path):
+    requests, sessions, stages, failures = [], [], {}, 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async with graph.async_agent(memory_path) as agent:
+        main.app.state.agent = agent
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+
+            async def post(payload):
+                start = time.perf_counter()
+                response = await client.post("/chat", json=payload)
+                requests.append(time.perf_counter() - start)
+                return response.json()
+
+            async def session(customer_id):
+                nonlocal failures
+                async with sem:
+                    thread_id = f"bench_{customer_id}_{uuid.uuid4().hex[:8]}"
+                    start = time.perf_counter()
+                    data = await post({"message": f"Process retention for customer {customer_id}",
+                                       "thread_id": thread_id})
+                    if data.get("status") == "requires_action":
+                        data = await post({"action": "APPROVE", "thread_id": thread_id})
+                    sessions.append(time.perf_counter() - start)
+                    if data.get("status") != "completed":
+                        failures += 1
+                    state = await agent.aget_state({"configurable": {"thread_id": thread_id}})
+                    _tool_timings(state.values["messages"], stages)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(session(c) for c in customer_ids))
+            wall = time.perf_counter() - start
+    return {"requests": requests, "sessions": sessions, "stages": stages, "wall": wall, "failures": failures}
+
+def interactive_flow(customer_ids, memory_path):
+    requests, sessions, stages, failures = [], [], {}, 0
+    agent = graph.build_agent(SqliteSaver(sqlite3.connect(memory_path, check_same_thread=False)))
+
+    def turn(config, inputs):
+        start = time.perf_counter()
+        values = run_turn(agent, config, inputs, verbose=False)
+        requests.append(time.perf_counter() - start)
+        return values
+
+    start = time.perf_counter()
+    for customer_id in customer_ids:
+        config = {"configurable": {"thread_id": f"retention_{customer_id}_{uuid.uuid4().hex[:8]}"}}
+        session_start = time.perf_counter()
+        turn(config, {"messages": [HumanMessage(f"Please process retention for customer_id {customer_id}. Start now.")]})
+        if agent.get_state(config).next:
+            turn(config, None)      # approve the email
+        values = turn(config, {"messages": [HumanMessage(f"Show details for customer {customer_id}")]})
+        sessions.append(time.perf_counter() - session_start)
+        if agent.get_state(config).next:
+            failures += 1
+        _tool_timings(values["messages"], stages)
+    wall = time.perf_counter() - start
+    return {"requests": requests, "sessions": sessions, "stages": stages, "wall": wall, "failures": failures}
+
+# ───────────────────────────────────────────────
+# Report
+# ───────────────────────────────────────────────
+def _report(name, result, llm_seconds):
+    req_p50, req_p99 = _percentiles(result["requests"])
+    ses_p50, ses_p99 = _percentiles(result["sessions"])
+    n = len(result["sessions"])
+    print(f"\n📊 {name}: {n} sessions, {len(result['requests'])} requests in {result['wall']:.2f}s "
+          f"({n / result['wall']:.1f} sessions/s, {result['failures']} not completed)")
+    print(f"{'':<12}{'p50 ms':>10}{'p99 ms':>10}")
+    print(f"{'request':<12}{req_p50:>10.1f}{req_p99:>10.1f}")
+    print(f"{'session':<12}{ses_p50:>10.1f}{ses_p99:>10.1f}")
+
+    stages = dict(result["stages"])
+    stages["LLM"] = llm_seconds
+    busy = sum(result["sessions"])
+    print(f"{'stage':<14}{'calls':>7}{'total s':>10}{'p50 ms':>10}{'p99 ms':>10}{'% session':>11}")
+    for stage in ("LLM", "SQL", "ML", "RAG", "other tools"):
+        samples = stages.get(stage)
+        if not samples:
+            continue
+        p50, p99 = _percentiles(samples)
+        print(f"{stage:<14}{len(samples):>7}{sum(samples):>10.2f}{p50:>10.2f}{p99:>10.2f}"
+              f"{100 * sum(samples) / busy:>10.1f}%")
+
+def run(rows, sessions, concurrency, llm_latency_ms, flow, fake_embeddings=False):
+    tmp_dir = tempfile.mkdtemp(prefix="bench_agent_")
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        embeddings = prepare(tmp_dir, rows, fake_embeddings)
+        graph.llm.latency_ms = fetch_bookings.llm.latency_ms = llm_latency_ms
+
+        rng = random.Random(7)
+        customer_ids = [rng.randrange(101, 101 + rows) for _ in range(sessions)]
+        print(f"\n🏗️  {rows:,} bookings | embeddings: {embeddings} | LLM: scripted, {llm_latency_ms:.0f} ms/call")
+
+        if flow in ("chat", "both"):
+            graph.llm.call_seconds.clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = asyncio.run(chat_flow(customer_ids, concurrency, os.path.join(tmp_dir, "chat_memory.db")))
+            _report(f"/chat (concurrency {concurrency})", result, list(graph.llm.call_seconds))
+
+        if flow in ("interactive", "both"):
+            graph.llm.call_seconds.clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = interactive_flow(customer_ids, os.path.join(tmp_dir, "cli_memory.db"))
+            _report("run_interactive_session (sequential)", result, list(graph.llm.call_seconds))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000, help="Synthetic bookings (10k - 1M)")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent /chat sessions")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated time per LLM call")
+    parser.add_argument("--flow", choices=["chat", "interactive", "both"], default="both")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Skip loading all-MiniLM-L6-v2 (offline)")
+    args = parser.parse_args()
+    run(args.rows, args.sessions, args.concurrency, args.llm_latency_ms, args.flow, args.fake_embeddings)
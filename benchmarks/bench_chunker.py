@@ -0,0 +1,71 @@
+# Benchmark: character splitter (split_documents) vs streaming token-aware chunker (iter_chunks)
+# Usage: python -m benchmarks.bench_chunker [--copies 500]
+#
+# The corpus is the retention policy PDF repeated `copies` times (each copy a separate source).
+# Reports chunks/sec, peak Python memory (tracemalloc) and the spread of chunk token counts.
+
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from langchain_core.documents import Document
+
+from src.rag.chunker import get_token_counter, iter_chunks, split_documents
+from src.rag.loader import iter_policy_pages
+from src.rag.store import PDF_PATH
+
+def _corpus(pages, copies):
+    """Yields the policy pages `copies` times, building each Document on demand."""
+    for copy in range(copies):
+        for page in pages:
+            yield Document(
+                page_content=page.page_content,
+                metadata={**page.metadata, "source": f"policy_copy_{copy}.pdf"},
+            )
+
+def _measure(name, run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    token_counts = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "name": name,
+        "chunks": len(token_counts),
+        "chunks_per_sec": len(token_counts) / elapsed,
+        "peak_mb": peak / 1e6,
+        "mean_tokens": statistics.mean(token_counts),
+        "stdev_tokens": statistics.pstdev(token_counts),
+        "max_tokens": max(token_counts),
+    }
+
+def run(copies):
+    pages = list(iter_policy_pages(PDF_PATH))
+    count = get_token_counter()
+
+    def legacy():
+        chunks = split_documents(list(_corpus(pages, copies)))
+        return [count(chunk.page_content) for chunk in chunks]
+
+    def streaming():
+        # Chunks are consumed as they are produced, like the indexing pipeline does
+        return [chunk.metadata["tokens"] for chunk in iter_chunks(_corpus(pages, copies))]
+
+    results = [
+        _measure("split_documents (500 chars)", legacy),
+        _measure("iter_chunks (200 tokens)", streaming),
+    ]
+
+    print(f"\n📊 Chunking {len(pages) * copies:,} pages")
+    print(f"{'chunker':<30}{'chunks':>9}{'chunks/s':>11}{'peak MB':>9}{'mean tok':>10}{'stdev':>8}{'max':>6}")
+    for r in results:
+        print(f"{r['name']:<30}{r['chunks']:>9,}{r['chunks_per_sec']:>11,.0f}{r['peak_mb']:>9.1f}"
+              f"{r['mean_tokens']:>10.1f}{r['stdev_tokens']:>8.1f}{r['max_tokens']:>6}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=500, help="How many times to repeat the policy PDF")
+    args = parser.parse_args()
+    run(args.copies)
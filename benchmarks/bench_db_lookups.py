@@ -0,0 +1,90 @@
+# Benchmark: booking lookups before/after the index migrations
+# Usage: python -m benchmarks.bench_db_lookups [--rows 1000000] [--iterations 200]
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+from src.utils import db_ops
+from src.utils.setup_db import setup_database
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return statistics.median(samples) * 1000, p99 * 1000
+
+def _time_calls(fn, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return _percentiles(samples)
+
+# The pre-migration code path: new connection + pandas per call, no indexes
+def _legacy_by_id(db_path, customer_id):
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql("SELECT * FROM bookings WHERE customer_id = ?", conn, params=(customer_id,))
+    conn.close()
+    return df.iloc[0].to_dict() if not df.empty else None
+
+def _legacy_by_name(db_path, term):
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql("SELECT * FROM bookings WHERE name LIKE ?", conn, params=(f"%{term}%",))
+    conn.close()
+    return df.to_dict(orient="records")
+
+def _legacy_recent(db_path, limit):
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql("SELECT * FROM bookings ORDER BY checkout_date DESC LIMIT ?", conn, params=(limit,))
+    conn.close()
+    return df.to_dict(orient="records")
+
+def run(rows, iterations):
+    tmp_dir = tempfile.mkdtemp(prefix="bench_db_")
+    db_path = os.path.join(tmp_dir, "bookings.db")
+    setup_database(db_path, rows=rows, migrate=False)
+
+    rng = random.Random(7)
+    ids = [(rng.randrange(101, 101 + rows),) for _ in range(iterations)]
+    # Unique name suffixes (customer ids) -> selective substring searches
+    names = [(str(rng.randrange(101, 101 + rows)),) for _ in range(iterations)]
+    recent = [(5,)] * iterations
+
+    # Full scans are slow at 1M rows; a handful of samples is enough for the baseline
+    legacy_n = max(5, iterations // 20)
+    results = {}
+    results["by_id (before)"] = _time_calls(lambda c: _legacy_by_id(db_path, c), ids[:legacy_n])
+    results["by_name (before)"] = _time_calls(lambda t: _legacy_by_name(db_path, t), names[:legacy_n])
+    results["recent (before)"] = _time_calls(lambda n: _legacy_recent(db_path, n), recent[:legacy_n])
+
+    # db_ops applies the index migrations on its first connection
+    db_ops.DB_PATH = db_path
+    start = time.perf_counter()
+    db_ops.fetch_booking_by_id(101)
+    print(f"🛠️  Migrations + first connection: {time.perf_counter() - start:.1f}s")
+
+    results["by_id (after)"] = _time_calls(db_ops.fetch_booking_by_id, ids)
+    results["by_name (after)"] = _time_calls(db_ops.search_customers_by_name, names)
+    results["recent (after)"] = _time_calls(db_ops.fetch_recent_bookings, recent)
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"\n📊 Lookup latency at {rows:,} bookings")
+    print(f"{'lookup':<20}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, (p50, p99) in results.items():
+        print(f"{name:<20}{p50:>10.3f}{p99:>10.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    run(args.rows, args.iterations)
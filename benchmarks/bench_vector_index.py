@@ -0,0 +1,84 @@
+# Benchmark: policy retrieval latency, Chroma vs the in-process NumpyVectorIndex
+# Usage: python -m benchmarks.bench_vector_index [--chunks 20,1000,20000] [--iterations 500] [--k 2]
+#
+# Vectors are random unit vectors (all-MiniLM-L6-v2 size), so the numbers measure the index
+# alone: the query embedding is computed once and cached in production anyway.
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from langchain_community.vectorstores import Chroma
+
+from src.rag.numpy_index import NumpyVectorIndex
+
+DIM = 384
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return statistics.median(samples) * 1000, p99 * 1000
+
+def _time_queries(store, queries, k):
+    samples, results = [], []
+    for vector in queries:
+        start = time.perf_counter()
+        docs = store.similarity_search_by_vector(vector, k=k)
+        samples.append(time.perf_counter() - start)
+        results.append([doc.page_content for doc in docs])
+    return _percentiles(samples), results
+
+def run(chunk_counts, iterations, k):
+    rng = np.random.default_rng(7)
+    rows = []
+    for n in chunk_counts:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_vec_")
+        vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [f"chunk-{i}" for i in range(n)]
+        texts = [f"policy chunk {i}" for i in range(n)]
+        metadatas = [{"page": i % 50} for i in range(n)]
+        queries = [v.tolist() for v in rng.standard_normal((iterations, DIM)).astype(np.float32)]
+
+        # Chroma (same wrapper RetrieverService uses)
+        chroma_path = os.path.join(tmp_dir, "chroma")
+        chroma = Chroma(persist_directory=chroma_path)
+        for i in range(0, n, 5000):
+            chroma._collection.add(ids=ids[i:i + 5000], embeddings=vectors[i:i + 5000],
+                                   documents=texts[i:i + 5000], metadatas=metadatas[i:i + 5000])
+        del chroma
+        start = time.perf_counter()
+        chroma = Chroma(persist_directory=chroma_path)
+        chroma_open = time.perf_counter() - start
+        chroma_lat, chroma_ids = _time_queries(chroma, queries, k)
+
+        # NumpyVectorIndex (memory-mapped)
+        numpy_path = os.path.join(tmp_dir, "numpy_index")
+        NumpyVectorIndex.from_embeddings(None, vectors, texts, metadatas=metadatas, ids=ids, path=numpy_path)
+        start = time.perf_counter()
+        index = NumpyVectorIndex.load(numpy_path, None)
+        numpy_open = time.perf_counter() - start
+        numpy_lat, numpy_ids = _time_queries(index, queries, k)
+
+        # The numpy index is exact, so it is the reference for Chroma's (HNSW) recall
+        recall = statistics.mean(len(set(a) & set(b)) / k for a, b in zip(chroma_ids, numpy_ids))
+        rows.append((n, "chroma", chroma_open, *chroma_lat, recall))
+        rows.append((n, "numpy", numpy_open, *numpy_lat, 1.0))
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"\n📊 top-{k} retrieval latency ({iterations} queries, dim {DIM})")
+    print(f"{'chunks':>8}  {'backend':<8}{'open ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'recall':>8}")
+    for n, backend, open_s, p50, p99, recall in rows:
+        print(f"{n:>8}  {backend:<8}{open_s * 1000:>10.2f}{p50:>10.3f}{p99:>10.3f}{recall:>8.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", default="20,1000,20000", help="Comma-separated corpus sizes")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--k", type=int, default=2)
+    args = parser.parse_args()
+    run([int(n) for n in args.chunks.split(",")], args.iterations, args.k)
@@ -1,34 +1,213 @@
-import os
+import json
 import uuid
 import logging
-from flask import Flask, request, jsonify
-from langchain_core.messages import HumanMessage, AIMessage
-from langgraph.types import Command
-from src.agents.graph import app as agent_app
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, ToolMessage
+from src.agents.graph import SAFE_TOOLS, async_agent
+from src.agents.checkpoints import memory_report, start_maintenance
+from src.agents.llm_cache import llm_cache_stats
+from src.agents.tracing import render_metrics, start_export, stop_export
+from src.ml.predictor import get_model_stats, warm_model
+from src.rag.retriever import retriever_service, warm_retriever
+from src.utils.schema_cache import schema_cache
+from src.utils.sql_cache import sql_cache
 
 # ───────────────────────────────────────────────
 # 1. Setup & Config
 # ───────────────────────────────────────────────
-app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Safe tools to auto-approve
-SAFE_TOOLS = [
-    "fetch_customer_booking", 
-    "get_customer_risk_score", 
-    "search_retention_policy",
-]
-SENSITIVE_TOOLS = ["request_manager_approval", "send_retention_email"]
+@asynccontextmanager
+async def lifespan(api):
+    # Load & schema-check the churn model once, before the first request
+    warm_model()
+    # Load the embedding model + vectorstore once, before the first policy search
+    warm_retriever()
+    # Keep agent_memory.db bounded: prune old checkpoints / idle threads in the background
+    maintainer = api.state.maintainer = start_maintenance()
+    # Spans of every node / tool / LLM / SQL call go to data/traces.jsonl (AGENT_TRACE_FILE)
+    start_export()
+    # One async agent (and checkpointer connection) serves every session
+    try:
+        async with async_agent() as agent:
+            api.state.agent = agent
+            yield
+    finally:
+        maintainer.stop()
+        stop_export()
+        sql_cache.flush_hits()
+
+app = FastAPI(title="Hotel Retention Agent API", lifespan=lifespan)
+
+@app.get("/")
+async def health_check():
+    return {"status": "healthy", "service": "Hotel Retention Agent API"}
+
+@app.get("/admin/memory")
+def agent_memory(request: Request):
+    """Checkpoint DB size, the biggest threads and the last maintenance run."""
+    report = memory_report()
+    report["last_maintenance"] = request.app.state.maintainer.last_run
+    return report
+
+def cache_stats():
+    """Hit / miss counters of the in-process caches, churn model reloads and retriever load."""
+    retrieval = retriever_service.stats()
+    return {
+        "churn_model": get_model_stats(),
+        "schema": schema_cache.stats(),
+        "sql": sql_cache.stats(),
+        "embeddings": retrieval.pop("embedding_cache"),
+        "policy_answers": retrieval.pop("semantic_cache"),
+        "retriever": retrieval,
+    }
+
+def render_cache_metrics(stats):
+    """cache_stats() in Prometheus text format."""
+    caches = {name: s for name, s in stats.items() if s and "misses" in s}
+    sql, model, retrieval = stats["sql"], stats["churn_model"], stats["retriever"]
+    embeddings = stats["embeddings"] or {}
+    families = [
+        ("agent_cache_hits_total", "counter", "Lookups answered by an in-process cache.",
+         {name: s.get("hits", s.get("cache_hits")) for name, s in caches.items()}),
+        ("agent_cache_misses_total", "counter", "Lookups an in-process cache could not answer.",
+         {name: s["misses"] for name, s in caches.items()}),
+        ("agent_cache_entries", "gauge", "Entries held by an in-process cache.",
+         {name: s["entries"] for name, s in caches.items() if "entries" in s}),
+        ("agent_sql_template_hits_total", "counter", "Questions answered by a SQL template (no LLM call).",
+         {None: sql["template_hits"]}),
+        ("agent_embedding_cache_disk_hits_total", "counter", "Query embeddings read from the disk cache.",
+         {None: embeddings.get("disk_hits", 0)}),
+        ("agent_churn_model_loads_total", "counter", "Times the churn model artifact was (re)loaded.",
+         {None: model["loads"]}),
+        ("agent_churn_model_load_seconds_total", "counter", "Time spent loading the churn model.",
+         {None: model["total_load_seconds"]}),
+        ("agent_retriever_queries_total", "counter", "Policy retrieval queries.", {None: retrieval["queries"]}),
+        ("agent_retriever_errors_total", "counter", "Policy retrieval queries that failed.",
+         {None: retrieval["errors"]}),
+    ]
+    lines = []
+    for metric, kind, help_text, samples in families:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for cache, value in samples.items():
+            labels = f'{{cache="{cache}"}}' if cache else ""
+            lines.append(f"{metric}{labels} {value}")
+    return "\n".join(lines) + "\n"
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Span durations / errors and cache counters, in Prometheus text format."""
+    text = render_metrics() + render_cache_metrics(cache_stats())
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
 
-@app.route("/", methods=["GET"])
-def health_check():
-    return jsonify({"status": "healthy", "service": "Hotel Retention Agent API"})
+@app.get("/admin/caches")
+def caches():
+    """Per cache: entries, hits, misses and hit rate; churn model reloads; retriever latency."""
+    return cache_stats()
 
-@app.route("/chat", methods=["POST"])
-def chat():
+@app.get("/admin/llm-cache")
+def llm_cache():
+    """LLM cache mode and, per model, entries, hit rate and LLM time saved."""
+    return llm_cache_stats()
+
+# ───────────────────────────────────────────────
+# 2. Agent run -> event stream
+# ───────────────────────────────────────────────
+async def run_agent_events(agent, thread_id, user_message=None, action=None):
     """
-    Main/Chat Endpoint.
+    Runs the agent with `astream` and yields events as (name, payload):
+      token        - a piece of the AI's answer as it is generated
+      tool_call    - the AI decided to call a tool
+      tool_result  - a tool finished (with its duration_ms)
+      interrupt    - a sensitive tool needs approval (run stops here)
+      done         - final status, same shape as the JSON /chat response
+    """
+    config = {"configurable": {"thread_id": thread_id}}
+
+    if action:
+        # RESUME MODE
+        logger.info(f"Resuming thread {thread_id} with action: {action}")
+        if action == "REJECT":
+            # For now, we just stop. Real-world: Insert "Tool Rejected" message.
+            yield "done", {"status": "stopped", "reason": "User rejected action.", "thread_id": thread_id}
+            return
+        if action != "APPROVE":
+            yield "error", {"error": f"Unknown action: {action}", "thread_id": thread_id}
+            return
+        # Resume with None -> Runs the pending tool
+        inputs = None
+    elif user_message:
+        # NEW MESSAGE MODE
+        logger.info(f"New message on thread {thread_id}: {user_message}")
+        inputs = {"messages": [HumanMessage(content=user_message)]}
+    else:
+        yield "error", {"error": "Either 'message' or 'action' is required."}
+        return
+
+    final_response = ""
+    # Safe tools run inside the graph (in parallel); it only pauses before sensitive ones
+    async for mode, chunk in agent.astream(inputs, config, stream_mode=["messages", "updates"]):
+        if mode == "messages":
+            message, metadata = chunk
+            # Only the agent's own answer: tools that call a model (text-to-SQL) stream too
+            if (isinstance(message, AIMessageChunk) and message.content
+                    and metadata.get("langgraph_node") == "agent"):
+                yield "token", {"content": message.content}
+            continue
+
+        for node, update in chunk.items():
+            if not isinstance(update, dict):
+                continue    # e.g. "__interrupt__"
+            for message in update.get("messages", []):
+                if isinstance(message, AIMessage):
+                    if message.content:
+                        final_response = message.content
+                    for tc in message.tool_calls:
+                        yield "tool_call", {"id": tc["id"], "name": tc["name"], "args": tc["args"]}
+                elif isinstance(message, ToolMessage):
+                    yield "tool_result", {"id": message.tool_call_id, "name": message.name,
+                                          "content": str(message.content)[:2000],
+                                          "duration_ms": message.response_metadata.get("duration_ms")}
+
+    # CHECK STATE
+    snapshot = await agent.aget_state(config)
+    if not snapshot.next:
+        # Execution Finished
+        yield "done", {"status": "completed", "response": final_response, "thread_id": thread_id}
+        return
+
+    # We are PAUSED -> a sensitive tool needs approval
+    last_msg = snapshot.values["messages"][-1]
+    sensitive = [tc for tc in getattr(last_msg, "tool_calls", []) if tc["name"] not in SAFE_TOOLS]
+    if not sensitive:
+        yield "error", {"status": "error", "message": "Unknown interrupt state", "thread_id": thread_id}
+        return
+
+    # REAL INTERRUPT -> Return to Client
+    yield "interrupt", {
+        "status": "requires_action",
+        "tool": sensitive[0]["name"],
+        "args": sensitive[0]["args"],
+        "thread_id": thread_id,
+        "message": f"Approval required for {sensitive[0]['name']}",
+    }
+
+async def _read_request(request):
+    data = await request.json()
+    return data.get("thread_id") or str(uuid.uuid4()), data.get("message"), data.get("action")
+
+# ───────────────────────────────────────────────
+# 3. Endpoints
+# ───────────────────────────────────────────────
+@app.post("/chat")
+async def chat(request: Request):
+    """
+    Main/Chat Endpoint (waits for the run, returns one JSON response).
     Input JSON:
     {
         "message": "User message here",       (Optional if resuming)
@@ -36,110 +215,46 @@ def chat():
         "action": "APPROVE" | "REJECT"        (Optional, for resuming interrupts)
     }
     """
-    data = request.json
-    thread_id = data.get("thread_id", str(uuid.uuid4()))
-    user_message = data.get("message")
-    action = data.get("action") # "APPROVE" or "REJECT"
-
-    config = {"configurable": {"thread_id": thread_id}}
-
+    thread_id, user_message, action = await _read_request(request)
+    if not user_message and not action:
+        return JSONResponse({"error": "Either 'message' or 'action' is required."}, status_code=400)
     try:
-        # ───────────────────────────────────────────────
-        # 2. Determine Execution Mode (Start vs Resume)
-        # ───────────────────────────────────────────────
-        iterator = None
-        
-        if action:
-            # RESUME MODE
-            logger.info(f"Resuming thread {thread_id} with action: {action}")
-            if action == "APPROVE":
-                # Resume with None -> Runs the tool
-                # cmd = Command(resume=None)  <-- Old way causing error
-                # For interrupt_before, we just call stream with None/Input?
-                # Actually, for create_react_agent, we just continue.
-                iterator = agent_app.stream(None, config, stream_mode="values")
-            elif action == "REJECT":
-                # For now, we just stop. Real-world: Insert "Tool Rejected" message.
-                return jsonify({
-                    "status": "stopped",
-                    "reason": "User rejected action.",
-                    "thread_id": thread_id
-                })
-        elif user_message:
-            # NEW MESSAGE MODE
-            logger.info(f"New message on thread {thread_id}: {user_message}")
-            inputs = {"messages": [HumanMessage(content=user_message)]}
-            iterator = agent_app.stream(inputs, config, stream_mode="values")
-        else:
-            return jsonify({"error": "Either 'message' or 'action' is required."}), 400
-
-        # ───────────────────────────────────────────────
-        # 3. Process Stream & Handle Interrupts
-        # ───────────────────────────────────────────────
-        final_response = ""
-        
-        # We need to loop manually to handle the "Safe Tool" auto-resume recursion
-        # But `agent_app.stream` yields events. If it hits an interrupt, it stops yielding.
-        
-        # NOTE: To handle "Auto-Resume" correctly in a sync API loop, we might need a while loop?
-        # Or simply: run stream -> check state -> if interrupt & safe -> resume -> repeat.
-        
-        # Let's use a helper to drain the stream until a REAL stop
-        
-        current_iterator = iterator
-        
-        while True:
-            # Consume the iterator
-            last_event = None
-            for event in current_iterator:
-                last_event = event
-                # Capture the AI's final text response if present
-                if "messages" in event:
-                    last_msg = event["messages"][-1]
-                    if isinstance(last_msg, AIMessage) and last_msg.content:
-                        final_response = last_msg.content
-            
-            # CHECK STATE
-            snapshot = agent_app.get_state(config)
-            
-            if not snapshot.next:
-                # Execution Finished
-                return jsonify({
-                    "status": "completed",
-                    "response": final_response,
-                    "thread_id": thread_id
-                })
-            
-            # We are PAUSED. Why?
-            last_msg = snapshot.values["messages"][-1]
-            if not isinstance(last_msg, AIMessage) or not last_msg.tool_calls:
-                 return jsonify({"status": "error", "message": "Unknown interrupt state"}), 500
-            
-            tool_calls = last_msg.tool_calls
-            is_sensitive = any(tc["name"] in SENSITIVE_TOOLS for tc in tool_calls)
-            
-            if is_sensitive:
-                # REAL INTERRUPT -> Return to Client
-                sensitive_tool_call = next(tc for tc in tool_calls if tc["name"] in SENSITIVE_TOOLS)
-                return jsonify({
-                    "status": "requires_action",
-                    "tool": sensitive_tool_call["name"],
-                    "args": sensitive_tool_call["args"],
-                    "thread_id": thread_id,
-                    "message": f"Approval required for {sensitive_tool_call['name']}"
-                })
-            else:
-                # SAFE INTERRUPT -> Auto-Resume
-                logger.info("Auto-approving safe tool...")
-                # cmd = Command(resume=None) <-- Old way causing error
-                current_iterator = agent_app.stream(None, config, stream_mode="values")
-                # Loop continues...
-
+        async for event, payload in run_agent_events(request.app.state.agent, thread_id, user_message, action):
+            if event in ("done", "interrupt"):
+                return payload
+            if event == "error":
+                return JSONResponse(payload, status_code=500)
     except Exception as e:
         logger.error(f"Error: {e}")
-        return jsonify({"error": str(e)}), 500
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.post("/chat/stream")
+async def chat_stream(request: Request):
+    """
+    Same input as /chat, but answers with server-sent events as the agent works:
+    token / tool_call / tool_result while running, then interrupt, done or error.
+    """
+    thread_id, user_message, action = await _read_request(request)
+    if not user_message and not action:
+        return JSONResponse({"error": "Either 'message' or 'action' is required."}, status_code=400)
+    agent = request.app.state.agent
+
+    async def sse():
+        yield f"event: start\ndata: {json.dumps({'thread_id': thread_id})}\n\n"
+        try:
+            async for event, payload in run_agent_events(agent, thread_id, user_message, action):
+                yield f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+        except Exception as e:
+            logger.error(f"Error: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e), 'thread_id': thread_id})}\n\n"
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 if __name__ == "__main__":
-    # Run on port 5000
-    print("🚀 Starting Flask Server on http://localhost:5000")
-    app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)
+    # Run on port 5000 (single async worker; sessions run concurrently on its event loop)
+    print("🚀 Starting API Server on http://localhost:5000")
+    uvicorn.run(app, host="0.0.0.0", port=5000)
@@ -0,0 +1,284 @@
+# Checkpoint maintenance for agent_memory.db
+
+# The checkpointer writes a full checkpoint for every step of every thread and never
+# deletes anything, so the file (and the work behind each get_state) keeps growing.
+# This module keeps it bounded:
+#   - retention: only the latest `keep` checkpoints of each thread (plus their writes)
+#   - expiry: threads idle for longer than `ttl_days` are removed completely
+#   - space: incremental vacuum returns freed pages, a WAL checkpoint truncates the -wal file
+# `start_maintenance()` runs all of it on a background thread; `memory_report()` shows
+# the DB size and the biggest threads.
+#
+# Concurrency: the in-process sync checkpointer shares the pool's writer lock, but the
+# API's AsyncSqliteSaver has its own aiosqlite connection. Against that connection only
+# SQLite's file lock (busy_timeout on both sides) serializes writes, so background
+# maintenance sticks to short DELETE transactions and incremental vacuum steps, and
+# retries when the database is busy. A full VACUUM rewrites the whole file and is
+# OFFLINE ONLY: run it with --full-vacuum while the server is stopped (it is needed
+# once, to switch an existing file to incremental auto-vacuum).
+#
+# Usage: python -m src.agents.checkpoints [--report] [--keep 20] [--ttl-days 30] [--db path]
+#                                         [--full-vacuum]
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from src.utils.sqlite_pool import get_pool
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+AGENT_MEMORY_PATH = os.path.join(BASE_DIR, "agent_memory.db")
+
+KEEP_CHECKPOINTS = int(os.getenv("AGENT_MEMORY_KEEP", "20"))
+THREAD_TTL_DAYS = float(os.getenv("AGENT_MEMORY_TTL_DAYS", "30"))
+MAINTENANCE_INTERVAL_S = int(os.getenv("AGENT_MEMORY_MAINTENANCE_S", "3600"))
+VACUUM_PAGES = 2000     # pages returned to the OS per incremental_vacuum step
+BUSY_RETRIES = 3        # attempts when the live server holds the write lock
+BUSY_RETRY_DELAY_S = 1.0
+
+# 100-ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+def checkpoint_id_at(unix_time):
+    """
+    The smallest checkpoint id created at `unix_time`.
+    Checkpoint ids are UUIDv6 (time first), so they sort by creation time as strings.
+    """
+    ts = int(unix_time * 10_000_000) + _UUID_EPOCH_OFFSET
+    value = ((ts >> 12) << 80) | (0x6 << 76) | ((ts & 0x0FFF) << 64) | (0x2 << 62)   # version 6, RFC variant
+    return str(uuid.UUID(int=value))
+
+def checkpoint_time(checkpoint_id):
+    """Unix time a checkpoint id was created at."""
+    value = uuid.UUID(checkpoint_id).int
+    ts = ((value >> 80) << 12) | ((value >> 64) & 0x0FFF)
+    return (ts - _UUID_EPOCH_OFFSET) / 10_000_000
+
+def _is_busy(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+def _retry_busy(func, *args, retries=BUSY_RETRIES, delay=BUSY_RETRY_DELAY_S, **kwargs):
+    """Runs func, retrying while the database is locked by another connection."""
+    for attempt in range(retries):
+        try:
+            return func(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt == retries - 1:
+                raise
+            time.sleep(delay * (attempt + 1))
+
+def _has_tables(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'checkpoints'"
+    ).fetchone() is not None
+
+def compact_checkpoints(path=AGENT_MEMORY_PATH, keep=KEEP_CHECKPOINTS, ttl_days=THREAD_TTL_DAYS):
+    """
+    Expires idle threads and trims the rest to their latest `keep` checkpoints.
+    The latest checkpoint (with its pending writes) is always kept, so every live
+    thread - including one waiting for approval - resumes exactly as before.
+    Returns: {"threads_expired", "checkpoints_deleted", "writes_deleted"}
+    """
+    keep = max(1, int(keep))
+    stats = {"threads_expired": 0, "checkpoints_deleted": 0, "writes_deleted": 0}
+    pool = get_pool(path)
+    with pool.writer() as conn:
+        if not _has_tables(conn):
+            return stats
+
+        if ttl_days and ttl_days > 0:
+            cutoff = checkpoint_id_at(time.time() - ttl_days * 86400)
+            expired = [row[0] for row in conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(checkpoint_id) < ?",
+                (cutoff,),
+            )]
+            for thread_id in expired:
+                stats["checkpoints_deleted"] += conn.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,)).rowcount
+                stats["writes_deleted"] += conn.execute(
+                    "DELETE FROM writes WHERE thread_id = ?", (thread_id,)).rowcount
+            stats["threads_expired"] = len(expired)
+
+        stats["checkpoints_deleted"] += conn.execute("""
+            DELETE FROM checkpoints
+            WHERE (thread_id, checkpoint_ns, checkpoint_id) IN (
+                SELECT thread_id, checkpoint_ns, checkpoint_id FROM (
+                    SELECT thread_id, checkpoint_ns, checkpoint_id,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                           ) AS age
+                    FROM checkpoints
+                ) WHERE age > ?
+            )
+        """, (keep,)).rowcount
+        # Writes belong to a checkpoint; drop the ones whose checkpoint is gone
+        stats["writes_deleted"] += conn.execute("""
+            DELETE FROM writes
+            WHERE NOT EXISTS (
+                SELECT 1 FROM checkpoints c
+                WHERE c.thread_id = writes.thread_id
+                  AND c.checkpoint_ns = writes.checkpoint_ns
+                  AND c.checkpoint_id = writes.checkpoint_id
+            )
+        """).rowcount
+    return stats
+
+def reclaim_space(path=AGENT_MEMORY_PATH, pages=VACUUM_PAGES, full_vacuum=False):
+    """
+    Returns free pages to the OS and truncates the WAL.
+    Incremental vacuum only works once the file is in incremental auto-vacuum mode; switching
+    needs one full VACUUM, which only runs with full_vacuum=True (offline, server stopped).
+    Returns: {"vacuumed_pages", "full_vacuum", "needs_full_vacuum", "wal_truncated"}
+    """
+    pool = get_pool(path)
+    with pool.writer() as conn:
+        conn.commit()   # VACUUM cannot run inside a transaction
+        incremental = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if full_vacuum:
+            if not incremental:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            incremental = True
+        elif incremental:
+            # Frees one page per step, so the statement has to be run to completion
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # busy = 1 when a reader still holds the WAL; it is retried on the next run
+        busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    return {
+        "vacuumed_pages": free_before - free_after,
+        "full_vacuum": full_vacuum,
+        "needs_full_vacuum": not incremental,
+        "wal_truncated": busy == 0,
+    }
+
+def run_maintenance(path=AGENT_MEMORY_PATH, keep=KEEP_CHECKPOINTS, ttl_days=THREAD_TTL_DAYS, full_vacuum=False):
+    """
+    One maintenance pass: compaction, then space reclamation (each retried while the DB is busy).
+    full_vacuum: rewrite the whole file - offline only, see the module notes.
+    """
+    start = time.perf_counter()
+    stats = _retry_busy(compact_checkpoints, path, keep=keep, ttl_days=ttl_days)
+    stats.update(_retry_busy(reclaim_space, path, full_vacuum=full_vacuum))
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+def _file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def memory_report(path=AGENT_MEMORY_PATH, top=10):
+    """DB / WAL size, row counts and the `top` threads by stored bytes."""
+    report = {
+        "path": path,
+        "db_bytes": _file_size(path),
+        "wal_bytes": _file_size(path + "-wal"),
+        "threads": 0,
+        "checkpoints": 0,
+        "writes": 0,
+        "top_threads": [],
+    }
+    pool = get_pool(path)
+    with pool.reader() as conn:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        report["free_bytes"] = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+        if not _has_tables(conn):
+            return report
+        report["threads"], report["checkpoints"] = conn.execute(
+            "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints").fetchone()
+        report["writes"] = conn.execute("SELECT COUNT(*) FROM writes").fetchone()[0]
+        rows = conn.execute("""
+            SELECT c.thread_id, c.n, c.bytes + COALESCE(w.bytes, 0), c.last_id
+            FROM (
+                SELECT thread_id, COUNT(*) AS n, MAX(checkpoint_id) AS last_id,
+                       SUM(LENGTH(checkpoint) + LENGTH(metadata)) AS bytes
+                FROM checkpoints GROUP BY thread_id
+            ) c
+            LEFT JOIN (
+                SELECT thread_id, SUM(LENGTH(value)) AS bytes FROM writes GROUP BY thread_id
+            ) w ON w.thread_id = c.thread_id
+            ORDER BY 3 DESC
+            LIMIT ?
+        """, (top,)).fetchall()
+    report["top_threads"] = [
+        {"thread_id": thread_id, "checkpoints": n, "bytes": size, "last_active": checkpoint_time(last_id)}
+        for thread_id, n, size, last_id in rows
+    ]
+    return report
+
+class CheckpointMaintainer:
+    """Runs `run_maintenance` every `interval` seconds on a daemon thread."""
+
+    def __init__(self, path=AGENT_MEMORY_PATH, interval=MAINTENANCE_INTERVAL_S,
+                 keep=KEEP_CHECKPOINTS, ttl_days=THREAD_TTL_DAYS):
+        self.path = path
+        self.interval = interval
+        self.keep = keep
+        self.ttl_days = ttl_days
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.last_run = run_maintenance(self.path, keep=self.keep, ttl_days=self.ttl_days)
+                if self.last_run["checkpoints_deleted"]:
+                    print(f"🧹 Agent memory: {self.last_run}")
+            except sqlite3.OperationalError as e:
+                # Still busy after the retries: try again next interval
+                print(f"⚠️ Agent memory maintenance skipped (database busy): {e}")
+            except Exception as e:
+                print(f"⚠️ Agent memory maintenance failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="checkpoint-maintenance", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+def start_maintenance(path=AGENT_MEMORY_PATH, interval=MAINTENANCE_INTERVAL_S):
+    """Starts background maintenance of the agent memory DB. Returns the maintainer (call .stop())."""
+    return CheckpointMaintainer(path, interval=interval).start()
+
+def _print_report(report):
+    print(f"\n📊 Agent memory: {report['path']}")
+    print(f"   DB {report['db_bytes'] / 1e6:.2f} MB | WAL {report['wal_bytes'] / 1e6:.2f} MB | "
+          f"free {report['free_bytes'] / 1e6:.2f} MB")
+    print(f"   {report['threads']} threads | {report['checkpoints']} checkpoints | {report['writes']} writes")
+    for t in report["top_threads"]:
+        last = time.strftime("%Y-%m-%d %H:%M", time.localtime(t["last_active"]))
+        print(f"   {t['thread_id']:<40}{t['checkpoints']:>6} ckpts{t['bytes'] / 1e3:>10.1f} KB   last {last}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact and report on the agent checkpoint DB")
+    parser.add_argument("--db", default=AGENT_MEMORY_PATH, help="Path to the checkpoint DB")
+    parser.add_argument("--keep", type=int, default=KEEP_CHECKPOINTS, help="Checkpoints kept per thread")
+    parser.add_argument("--ttl-days", type=float, default=THREAD_TTL_DAYS, help="Expire threads idle this long (0 = never)")
+    parser.add_argument("--report", action="store_true", help="Only print the report, change nothing")
+    parser.add_argument("--full-vacuum", action="store_true",
+                        help="Rewrite the file and enable incremental vacuum (stop the server first)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise FileNotFoundError(f"❌ Checkpoint DB not found at {args.db}")
+    if not args.report:
+        print(f"🔄 Compacting {args.db} (keep {args.keep}/thread, TTL {args.ttl_days} days)...")
+        stats = run_maintenance(args.db, keep=args.keep, ttl_days=args.ttl_days, full_vacuum=args.full_vacuum)
+        print(f"✅ {stats}")
+        if stats["needs_full_vacuum"]:
+            print("⚠️ Freed pages are not returned to the OS until this file is switched to incremental "
+                  "auto-vacuum: run once with --full-vacuum while the server is stopped.")
+    _print_report(memory_report(args.db))
@@ -0,0 +1,160 @@
+# Prompt window for the agent model
+
+# The graph state keeps the whole conversation (needed to resume and to audit a case),
+# but the LLM only needs what matters for the next step. `pre_model_hook` builds the
+# messages actually sent, without changing the state:
+#   - tool results the model has not seen yet are sent as-is
+#   - tool results it already answered (this turn or earlier ones) are cut to TOOL_RESULT_TOKENS
+#   - facts tools already returned (customer details, risk scores, policy limits) are
+#     kept as one compact JSON note, so they survive when old turns are left out
+#   - if the history is still over HISTORY_TOKEN_BUDGET, the oldest turns are dropped whole
+
+import json
+import os
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("AGENT_HISTORY_TOKENS", "3000"))
+TOOL_RESULT_TOKENS = int(os.getenv("AGENT_TOOL_RESULT_TOKENS", "200"))
+MAX_FACT_ROWS = 5       # bigger fetch results are listings, not facts about one guest
+FACT_COLUMNS = [
+    "customer_id", "name", "email", "booking_id", "room_type", "booking_price",
+    "checkin_date", "total_stays", "previous_cancellations", "status",
+]
+
+def count_tokens(messages):
+    """Approximate token count of a message list (content + tool calls)."""
+    return count_tokens_approximately(messages)
+
+def _turns(messages):
+    """Splits the history into turns, each starting at a user message."""
+    turns = [[]]
+    for message in messages:
+        if isinstance(message, HumanMessage) and turns[-1]:
+            turns.append([])
+        turns[-1].append(message)
+    return [turn for turn in turns if turn]
+
+def _shorten(message, max_tokens):
+    if not isinstance(message, ToolMessage) or not isinstance(message.content, str):
+        return message
+    total = count_tokens([message])
+    if total <= max_tokens:
+        return message
+    content = message.content[:max_tokens * 4]
+    return message.model_copy(update={
+        "content": f"{content}\n… [truncated: {total} tokens; the key facts are in the notes above]"
+    })
+
+# ───────────────────────────────────────────────
+# Facts from tool results
+# ───────────────────────────────────────────────
+def _customer(facts, key):
+    return facts.setdefault("customers", {}).setdefault(str(key), {})
+
+def _booking_facts(data, facts):
+    columns = data.get("columns")
+    if not isinstance(columns, dict) or not columns:
+        return
+    rows = len(next(iter(columns.values())))
+    if rows > MAX_FACT_ROWS:
+        return
+    for i in range(rows):
+        row = {col: columns[col][i] for col in FACT_COLUMNS if col in columns}
+        _customer(facts, row.get("customer_id", row.get("booking_id", i))).update(row)
+
+def _risk_facts(data, facts):
+    if "customer_id" in data and "risk_score" in data:
+        _customer(facts, data["customer_id"]).update(
+            risk_score=data["risk_score"], risk_level=data.get("risk_level"))
+
+def _policy_facts(data, facts):
+    facts.setdefault("policy_limits", []).append(data)
+
+_FACT_EXTRACTORS = {
+    "fetch_customer_booking": _booking_facts,
+    "get_customer_risk_score": _risk_facts,
+    "get_policy_limits": _policy_facts,
+}
+
+def extract_facts(messages):
+    """Collects structured facts from the JSON results of known tools."""
+    facts = {}
+    for message in messages:
+        extractor = _FACT_EXTRACTORS.get(getattr(message, "name", None))
+        if extractor is None or not isinstance(message, ToolMessage):
+            continue
+        try:
+            data = json.loads(message.content)
+        except (TypeError, ValueError):
+            continue
+        if isinstance(data, dict) and "error" not in data:
+            extractor(data, facts)
+    return facts
+
+# ───────────────────────────────────────────────
+# Window
+# ───────────────────────────────────────────────
+def _last_ai_index(messages):
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], AIMessage):
+            return i
+    return -1
+
+def window_messages(messages, budget=HISTORY_TOKEN_BUDGET, tool_tokens=TOOL_RESULT_TOKENS):
+    """
+    Returns (messages to send, stats).
+    Results the model has not answered yet (after the last AI message) are never cut.
+    Earlier turns are kept or dropped whole, so every tool call keeps its result.
+    """
+    before = count_tokens(messages)
+    stats = {"tokens_before": before, "messages_before": len(messages)}
+    if before <= budget:
+        stats.update(tokens_after=before, messages_after=len(messages), turns_dropped=0)
+        return list(messages), stats
+
+    turns = _turns(messages)
+    current, earlier = turns[-1], turns[:-1]
+    fresh_from = _last_ai_index(current) + 1
+    seen = [message for turn in earlier for message in turn] + current[:fresh_from]
+
+    facts = extract_facts(seen)
+    note = []
+    if facts:
+        note = [SystemMessage(content=(
+            "Facts from earlier in this conversation (already reported to the user):\n"
+            + json.dumps(facts, separators=(",", ":"), default=str)
+        ))]
+    current = [_shorten(message, tool_tokens) for message in current[:fresh_from]] + current[fresh_from:]
+
+    # Newest turns first, until the budget is used up (the current turn always goes in)
+    remaining = budget - count_tokens(note) - count_tokens(current)
+    kept, dropped = [], len(earlier)
+    for turn in reversed(earlier):
+        turn = [_shorten(message, tool_tokens) for message in turn]
+        cost = count_tokens(turn)
+        if cost > remaining:
+            break
+        kept = turn + kept
+        remaining -= cost
+        dropped -= 1
+    if dropped:
+        omitted = f"({dropped} earlier turn(s) omitted to save space.)"
+        note = [SystemMessage(content=f"{note[0].content}\n{omitted}" if note else omitted)]
+
+    window = note + kept + current
+    stats.update(tokens_after=count_tokens(window), messages_after=len(window), turns_dropped=dropped)
+    return window, stats
+
+def pre_model_hook(state):
+    """
+    Pre-model hook: {"llm_input_messages": [...], "prompt_window": stats}.
+    The state's messages are left as they are.
+    """
+    window, stats = window_messages(state["messages"])
+    if stats["tokens_after"] < stats["tokens_before"]:
+        print(f"🧮 Prompt window: {stats['tokens_before']:,} → {stats['tokens_after']:,} tokens "
+              f"({stats['messages_before']} → {stats['messages_after']} messages, "
+              f"{stats['turns_dropped']} turn(s) dropped)")
+    return {"llm_input_messages": window, "prompt_window": stats}
@@ -5,18 +5,30 @@ The agent can reason, call tools in any order it decides, and loop until it has
 Memory (checkpointer) is enabled so sessions can be resumed.
 """
 
-import sqlite3
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from typing import List
 from dotenv import load_dotenv
 
-# Load env before importing ChatGroq
+# Load env (LLM_PROVIDER, GROQ_API_KEY, ...) before creating the LLM
 load_dotenv()
 
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langgraph.prebuilt import create_react_agent
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import StateGraph, START, END
 
 from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from src.utils.sqlite_pool import get_pool
+from src.agents.state import AgentState
+from src.agents.checkpoints import AGENT_MEMORY_PATH
+from src.agents.context import pre_model_hook
+from src.agents.llm import agent_script, get_chat_model
+from src.agents.tracing import span, trace_node
 
 # Import the prompt template (must be ChatPromptTemplate)
 from src.agents.prompts import AGENT_SYSTEM_PROMPT  # ← should be ChatPromptTemplate
@@ -25,16 +37,20 @@ from src.agents.prompts import AGENT_SYSTEM_PROMPT  # ← should be ChatPromptTe
 from src.tools.fetch_bookings import fetch_customer_booking
 from src.tools.get_risk import get_customer_risk_score
 from src.tools.policy_search import search_retention_policy
+from src.tools.policy_rules import get_policy_limits
 from src.tools.send_email import send_retention_email
 from src.tools.human_approval import request_manager_approval
 
 # ───────────────────────────────────────────────
 # 1. LLM Setup
 # ───────────────────────────────────────────────
-llm = ChatGroq(
-    model="llama-3.1-8b-instant",
+# Provider from LLM_PROVIDER (groq / fake, see src/agents/llm.py)
+AGENT_MODEL = "llama-3.1-8b-instant"
+llm = get_chat_model(
+    AGENT_MODEL,
     temperature=0,              # deterministic = better for tool calling
     max_retries=3,
+    script=agent_script(),      # what the offline fake answers with
 )
 
 # ───────────────────────────────────────────────
@@ -43,29 +59,234 @@ llm = ChatGroq(
 tools: List = [
     fetch_customer_booking,
     get_customer_risk_score,
+    get_policy_limits,
     search_retention_policy,
     send_retention_email,
     request_manager_approval,
 ]
+tools_by_name = {t.name: t for t in tools}
+
+# Read-only tools: run without approval, concurrently when the LLM asks for several at once
+SAFE_TOOLS = [
+    "fetch_customer_booking",
+    "get_customer_risk_score",
+    "get_policy_limits",
+    "search_retention_policy",
+]
+# Anything else (these, or an unknown tool) waits for a human APPROVE
+SENSITIVE_TOOLS = ["request_manager_approval", "send_retention_email"]
+TOOL_WORKERS = 4
 
 # ───────────────────────────────────────────────
 # 3. Memory / Checkpointer (SQLite-based persistence)
 # ───────────────────────────────────────────────
-# Creates agent_memory.db in project root
-conn = sqlite3.connect("agent_memory.db", check_same_thread=False)
-memory = SqliteSaver(conn)
+# Uses agent_memory.db in project root, opened on first use of the agent - not on import
+# (old checkpoints / idle threads are pruned by src.agents.checkpoints)
+
+def sync_memory(path=AGENT_MEMORY_PATH):
+    """
+    The sync checkpointer. It writes through the pool's (WAL, busy-timeout) writer
+    connection and shares its lock, so every in-process writer to the file is serialized.
+    """
+    memory_pool = get_pool(path)
+    memory = SqliteSaver(memory_pool.writer_connection)
+    memory.lock = memory_pool.write_lock
+    return memory
 
 # ───────────────────────────────────────────────
-# 4. Build the ReAct Agent (agent ↔ tools loop)
+# 4. Tool execution (parallel, timed)
 # ───────────────────────────────────────────────
-app = create_react_agent(
-    model=llm,
-    tools=tools,
-    prompt=AGENT_SYSTEM_PROMPT,                        # ← must be ChatPromptTemplate
-    checkpointer=memory,
-    interrupt_before=["tools"],                        # PAUSE before EVERY tool call (safety!)
-    # interrupt_before=["send_retention_email", "request_manager_approval"]  # alternative
-)
+def _tool_error(call, error):
+    return ToolMessage(
+        content=f"Error: {error}\n Please fix your mistakes.",
+        name=call["name"],
+        tool_call_id=call["id"],
+        status="error",
+    )
+
+def _timed(call, message, start):
+    # Kept on the message (and so in the checkpoint) for the API / later analysis
+    message.response_metadata["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return message
+
+def _run_tool_call(call, config):
+    start = time.perf_counter()
+    with span(call["name"], "tool") as tool_span:
+        tool = tools_by_name.get(call["name"])
+        if tool is None:
+            message = _tool_error(call, f"{call['name']} is not a valid tool.")
+        else:
+            try:
+                message = tool.invoke({**call, "type": "tool_call"}, config)
+            except Exception as e:
+                message = _tool_error(call, repr(e))
+        if message.status == "error":
+            tool_span.fail(message.content)
+    return _timed(call, message, start)
+
+async def _arun_tool_call(call, config):
+    start = time.perf_counter()
+    with span(call["name"], "tool") as tool_span:
+        tool = tools_by_name.get(call["name"])
+        if tool is None:
+            message = _tool_error(call, f"{call['name']} is not a valid tool.")
+        else:
+            try:
+                # Sync tools are run in the default executor, so these overlap
+                message = await tool.ainvoke({**call, "type": "tool_call"}, config)
+            except Exception as e:
+                message = _tool_error(call, repr(e))
+        if message.status == "error":
+            tool_span.fail(message.content)
+    return _timed(call, message, start)
+
+def _report_timings(results, wall):
+    if len(results) < 2:
+        return
+    total = sum(m.response_metadata["duration_ms"] for m in results)
+    calls = ", ".join(f"{m.name} {m.response_metadata['duration_ms']:.0f} ms" for m in results)
+    print(f"⏱️ {len(results)} tool calls in {wall * 1000:.0f} ms (sequential ~{total:.0f} ms): {calls}")
+
+def run_tools(state, config):
+    """Runs every tool call of the last AI message on a thread pool; results keep the call order."""
+    calls = state["messages"][-1].tool_calls
+    start = time.perf_counter()
+    if len(calls) == 1:
+        results = [_run_tool_call(calls[0], config)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(TOOL_WORKERS, len(calls))) as pool:
+            # Each call runs in a copy of this context, so its spans keep the thread_id / parent
+            futures = [pool.submit(contextvars.copy_context().run, _run_tool_call, call, config) for call in calls]
+            results = [future.result() for future in futures]
+    _report_timings(results, time.perf_counter() - start)
+    return {"messages": results}
+
+async def arun_tools(state, config):
+    calls = state["messages"][-1].tool_calls
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_arun_tool_call(call, config) for call in calls))
+    _report_timings(results, time.perf_counter() - start)
+    return {"messages": list(results)}
+
+def _skipped(calls):
+    return [
+        ToolMessage(
+            content="Skipped: an earlier call in this step failed.",
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+        for call in calls
+    ]
+
+def run_sensitive_tools(state, config):
+    """
+    Runs approved calls one at a time, in the order the LLM gave them (an approval is
+    recorded before an email goes out). Stops at the first error; later calls are skipped.
+    """
+    calls = state["messages"][-1].tool_calls
+    results = []
+    for i, call in enumerate(calls):
+        results.append(_run_tool_call(call, config))
+        if results[-1].status == "error":
+            results += _skipped(calls[i + 1:])
+            break
+    return {"messages": results}
+
+async def arun_sensitive_tools(state, config):
+    calls = state["messages"][-1].tool_calls
+    results = []
+    for i, call in enumerate(calls):
+        results.append(await _arun_tool_call(call, config))
+        if results[-1].status == "error":
+            results += _skipped(calls[i + 1:])
+            break
+    return {"messages": results}
+
+def route_tool_calls(state):
+    """agent -> END (answer), "tools" (all calls safe) or "sensitive_tools" (needs approval)."""
+    last = state["messages"][-1]
+    if not getattr(last, "tool_calls", None):
+        return END
+    names = [call["name"] for call in last.tool_calls]
+    if any(name in SENSITIVE_TOOLS for name in names):
+        return "sensitive_tools"
+    if all(name in SAFE_TOOLS for name in names):
+        return "tools"
+    # Unknown tools are treated as sensitive
+    return "sensitive_tools"
+
+# ───────────────────────────────────────────────
+# 5. Build the ReAct Agent (agent ↔ tools loop)
+# ───────────────────────────────────────────────
+def build_agent(checkpointer):
+    """
+    Compiles the agent graph with the given checkpointer.
+    Safe tool calls run straight away (in parallel); a turn that includes a sensitive
+    tool PAUSES before "sensitive_tools" until the client resumes it (APPROVE).
+    """
+    model = AGENT_SYSTEM_PROMPT | llm.bind_tools(tools)     # ← prompt must be ChatPromptTemplate
+
+    # The model sees a token-budgeted window of the history (src.agents.context);
+    # the state itself keeps every message.
+    def call_model(state, config):
+        hook = pre_model_hook(state)
+        with span(AGENT_MODEL, "llm", prompt_tokens=hook["prompt_window"]["tokens_after"]):
+            response = model.invoke({"messages": hook["llm_input_messages"]}, config)
+        response.response_metadata["prompt_window"] = hook["prompt_window"]
+        return {"messages": [response]}
+
+    async def acall_model(state, config):
+        hook = pre_model_hook(state)
+        with span(AGENT_MODEL, "llm", prompt_tokens=hook["prompt_window"]["tokens_after"]):
+            response = await model.ainvoke({"messages": hook["llm_input_messages"]}, config)
+        response.response_metadata["prompt_window"] = hook["prompt_window"]
+        return {"messages": [response]}
+
+    # Every node is traced (src.agents.tracing) and tied to the run's thread_id
+    def node(name, func, afunc):
+        return RunnableLambda(trace_node(name, func), afunc=trace_node(name, afunc), name=name)
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("agent", node("agent", call_model, acall_model))
+    workflow.add_node("tools", node("tools", run_tools, arun_tools))
+    workflow.add_node("sensitive_tools", node("sensitive_tools", run_sensitive_tools, arun_sensitive_tools))
+    workflow.add_edge(START, "agent")
+    workflow.add_conditional_edges("agent", route_tool_calls, ["tools", "sensitive_tools", END])
+    workflow.add_edge("tools", "agent")
+    workflow.add_edge("sensitive_tools", "agent")
+    return workflow.compile(
+        checkpointer=checkpointer,
+        interrupt_before=["sensitive_tools"],              # PAUSE before sensitive tool calls (safety!)
+    )
+
+_app = None
+_app_lock = threading.Lock()
+
+def sync_agent():
+    """The shared agent with the sync checkpointer (built on first call)."""
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = build_agent(sync_memory())
+    return _app
+
+def __getattr__(name):
+    # `from src.agents.graph import app` still works, but only opens the DB when asked for
+    if name == "app":
+        return sync_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+@asynccontextmanager
+async def async_agent(path=AGENT_MEMORY_PATH):
+    """
+    The same agent with an async checkpointer, for `astream` / `ainvoke` (e.g. the ASGI API).
+    Uses its own aiosqlite connection to agent_memory.db (WAL, so it coexists with `memory`).
+    """
+    async with AsyncSqliteSaver.from_conn_string(path) as saver:
+        await saver.conn.execute("PRAGMA busy_timeout=5000")
+        yield build_agent(saver)
 
 # Optional: Export for notebooks / app.py
-# from src.agents.graph import app
\ No newline at end of file
+# from src.agents.graph import app
@@ -0,0 +1,239 @@
+# LLM provider
+
+# Every chat model in the app comes from `get_chat_model`, so the provider can be switched
+# with one environment variable:
+#   LLM_PROVIDER=groq  (default) ChatGroq, needs GROQ_API_KEY
+#   LLM_PROVIDER=fake  ScriptedChatModel, no network: answers come from a script, so the
+#                      whole agent (graph, API, tools) runs offline and deterministically
+#
+# A script is either a function messages -> AIMessage (e.g. `retention_agent_script`,
+# which walks the standard operating procedure with realistic tool calls) or a list of
+# recorded AIMessages replayed in order (`load_script`, FAKE_LLM_SCRIPT=path.json).
+# FAKE_LLM_LATENCY_MS adds a per-call delay to stand in for network + generation time.
+# Both providers get the LLM response cache from src.agents.llm_cache (LLM_CACHE=...).
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from typing import Any
+
+from pydantic import PrivateAttr
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.agents.llm_cache import get_model_cache
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq").lower()
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+FAKE_LLM_SCRIPT = os.getenv("FAKE_LLM_SCRIPT") or None
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Offline stand-in for a chat model. `script(messages)` (or the next recorded message)
+    decides every answer; tool binding is accepted and ignored.
+    """
+
+    script: Any
+    model_name: str = "scripted"
+    latency_ms: float = 0.0
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _position: int = PrivateAttr(default=0)
+    _call_seconds: list = PrivateAttr(default_factory=list)
+
+    @property
+    def call_seconds(self):
+        """Wall time of every call so far (for benchmarks)."""
+        return self._call_seconds
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    @property
+    def _identifying_params(self):
+        # Part of the LLM cache key (the script itself is not)
+        return {"model_name": self.model_name}
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _next_message(self, messages):
+        if callable(self.script):
+            message = self.script(messages)
+        else:
+            with self._lock:
+                if self._position >= len(self.script):
+                    raise IndexError(f"❌ Scripted model ran out of responses after {self._position} calls")
+                message = self.script[self._position]
+                self._position += 1
+        if isinstance(message, str):
+            message = AIMessage(content=message)
+        return message.model_copy(update={"response_metadata": {**message.response_metadata, "model_name": self.model_name}})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        start = time.perf_counter()
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        message = self._next_message(messages)
+        self._call_seconds.append(time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        start = time.perf_counter()
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        message = self._next_message(messages)
+        self._call_seconds.append(time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, message):
+        # Text streams word by word; tool calls arrive whole in the last chunk
+        words = re.findall(r"\S+\s*", message.content) if isinstance(message.content, str) else []
+        for word in words:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i}
+                for i, tc in enumerate(message.tool_calls)
+            ],
+            response_metadata=message.response_metadata,
+        ))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._generate(messages, stop, **kwargs).generations[0].message
+        for chunk in self._chunks(message):
+            if run_manager and chunk.message.content:
+                run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = (await self._agenerate(messages, stop, **kwargs)).generations[0].message
+        for chunk in self._chunks(message):
+            if run_manager and chunk.message.content:
+                await run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+def load_script(path):
+    """Recorded AI messages (a JSON list in `messages_to_dict` format) to replay in order."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"❌ LLM script not found at {path}")
+    with open(path) as f:
+        return messages_from_dict(json.load(f))
+
+def get_chat_model(model, temperature=0, script=None, **kwargs):
+    """
+    The chat model for `model` from the configured provider.
+    script: what the fake provider answers with (ignored by real providers).
+    """
+    cache = get_model_cache(model, temperature)
+    if LLM_PROVIDER == "fake":
+        return ScriptedChatModel(script=script or _echo_script, model_name=model,
+                                 latency_ms=FAKE_LLM_LATENCY_MS, cache=cache)
+    if LLM_PROVIDER == "groq":
+        from langchain_groq import ChatGroq
+        return ChatGroq(model=model, temperature=temperature, cache=cache, **kwargs)
+    raise ValueError(f"Unknown LLM provider: {LLM_PROVIDER!r} (expected 'groq' or 'fake')")
+
+# ───────────────────────────────────────────────
+# Scripts
+# ───────────────────────────────────────────────
+_call_counter = 0
+_counter_lock = threading.Lock()
+
+def _call_id(name):
+    global _call_counter
+    with _counter_lock:
+        _call_counter += 1
+        return f"call_{name}_{_call_counter}"
+
+def _tool_call(name, **args):
+    return {"name": name, "args": args, "id": _call_id(name), "type": "tool_call"}
+
+def _echo_script(messages):
+    last = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+    return AIMessage(content=f"OK: {last.content if last else ''}")
+
+def _json(message):
+    try:
+        data = json.loads(message.content) if message is not None else None
+    except (TypeError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def _first_booking(message):
+    columns = _json(message).get("columns") or {}
+    return {col: values[0] for col, values in columns.items() if values}
+
+def retention_agent_script(messages):
+    """
+    Plays the agent's standard operating procedure for "process / check retention for
+    customer <id>" (or just reports for "details / status of customer <id>"):
+      1. fetch_customer_booking + get_customer_risk_score (one turn, parallel)
+      2. get_policy_limits + search_retention_policy
+      3. send_retention_email (sensitive -> approval)
+      4. final summary
+    """
+    start = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+    request = messages[start].content if start >= 0 else ""
+    results = {m.name: m for m in messages[start + 1:] if isinstance(m, ToolMessage)}
+
+    ids = re.findall(r"\d+", request)
+    if not ids:
+        return AIMessage(content="Which customer should I look at? Please give a customer ID.")
+    customer_id = int(ids[0])
+    details_only = re.search(r"\b(details?|status|info)\b", request, re.I) and not re.search(
+        r"\b(process|retention|offer|save)\b", request, re.I)
+
+    if "fetch_customer_booking" not in results:
+        return AIMessage(content="", tool_calls=[
+            _tool_call("fetch_customer_booking", query=f"Customer {customer_id}"),
+            _tool_call("get_customer_risk_score", customer_id=customer_id),
+        ])
+
+    booking = _first_booking(results["fetch_customer_booking"])
+    risk = _json(results.get("get_customer_risk_score"))
+    name = booking.get("name", f"Customer {customer_id}")
+    report = (f"**{name}** (Booking {booking.get('booking_id', '?')}): risk score "
+              f"{risk.get('risk_score', 0):.2f} ({risk.get('risk_level', 'UNKNOWN')}), "
+              f"{booking.get('total_stays', 0)} stays.")
+    if details_only or not booking:
+        return AIMessage(content=f"{report} Would you like to propose a retention offer?")
+
+    if "get_policy_limits" not in results:
+        return AIMessage(content=report, tool_calls=[
+            _tool_call("get_policy_limits", risk_score=float(risk.get("risk_score", 0.5)),
+                       customer_tier="SILVER" if int(booking.get("total_stays") or 0) > 1 else "BRONZE"),
+            _tool_call("search_retention_policy",
+                       query=f"retention offers for {(risk.get('risk_level') or 'HIGH').lower()} risk guests"),
+        ])
+
+    limits = _json(results.get("get_policy_limits"))
+    discount = limits.get("max_room_discount_pct", 10)
+    if "send_retention_email" not in results:
+        return AIMessage(content="", tool_calls=[_tool_call(
+            "send_retention_email",
+            customer_name=name,
+            email_address=booking.get("email", "guest@example.com"),
+            subject="We'd love to welcome you back",
+            body=f"Dear {name},\n\nAs a valued guest we are happy to offer you {discount:.0f}% off "
+                 f"your next stay.\n\nWarm regards,\nGuest Relations",
+        )])
+    return AIMessage(content=f"{report} Sent a retention email offering {discount:.0f}% off.")
+
+def agent_script():
+    """The agent's fake script: the recording in FAKE_LLM_SCRIPT if set, else retention_agent_script."""
+    return load_script(FAKE_LLM_SCRIPT) if FAKE_LLM_SCRIPT else retention_agent_script
+
+def sql_script(messages):
+    """Text-to-SQL stand-in: looks up the customer id in the question, or lists a few rows."""
+    question = messages[-1].content if messages else ""
+    ids = re.findall(r"\d+", question)
+    if ids:
+        return AIMessage(content=f"SELECT * FROM bookings WHERE customer_id = {int(ids[0])} LIMIT 5")
+    return AIMessage(content="SELECT * FROM bookings LIMIT 5")
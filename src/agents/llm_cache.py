@@ -0,0 +1,239 @@
+# LLM response cache (record / replay)
+
+# Content-addressed cache for chat model calls, plugged into LangChain's `cache=` hook so it
+# works for every model `get_chat_model` creates (ChatGroq agent + text-to-SQL models, or
+# the scripted fake). The key is sha256 of the model settings (LangChain's llm_string:
+# model, temperature, bound tools, stop words) plus the prompt messages with per-run noise
+# (message and tool call ids, response / usage metadata such as token counts and tool
+# timings) removed.
+#
+# LLM_CACHE modes:
+#   off           (default) no caching
+#   read_through  production: reuse a stored answer, otherwise call the model and store it.
+#                 Only models at temperature 0 are cached (their answers are reproducible).
+#   replay        tests: answers come ONLY from the cache; a miss raises LLMCacheMiss
+#   record        always call the model and (over)write the stored answer
+#
+# Entries live in SQLite (LLM_CACHE_PATH); the least recently used ones are evicted once
+# the stored responses exceed LLM_CACHE_MAX_MB.
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+from src.utils.sqlite_pool import get_pool
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH") or os.path.join(BASE_DIR, "data", "llm_cache.db")
+LLM_CACHE_MODE = os.getenv("LLM_CACHE", "off").lower()
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "64"))
+
+CACHE_MODES = ("off", "read_through", "replay", "record")
+_VOLATILE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+class LLMCacheMiss(KeyError):
+    """Replay mode was asked for a call that was never recorded."""
+
+def _canonical_prompt(prompt):
+    """
+    The serialized prompt without fields that change from run to run. Tool call ids are
+    random per call, so they are renumbered in order of appearance (call_0, call_1, ...).
+    """
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+    call_ids = {}
+
+    def renumber(call_id):
+        return call_ids.setdefault(call_id, f"call_{len(call_ids)}")
+
+    for message in messages if isinstance(messages, list) else []:
+        kwargs = message.get("kwargs") if isinstance(message, dict) else None
+        if not isinstance(kwargs, dict):
+            continue
+        for field in _VOLATILE_FIELDS:
+            kwargs.pop(field, None)
+        raw_calls = (kwargs.get("additional_kwargs") or {}).get("tool_calls") or []
+        for call in kwargs.get("tool_calls", []) + kwargs.get("invalid_tool_calls", []) + raw_calls:
+            if isinstance(call, dict) and call.get("id"):
+                call["id"] = renumber(call["id"])
+        if kwargs.get("tool_call_id"):
+            kwargs["tool_call_id"] = renumber(kwargs["tool_call_id"])
+    return json.dumps(messages, sort_keys=True, separators=(",", ":"))
+
+def cache_key(prompt, llm_string):
+    digest = hashlib.sha256()
+    digest.update(llm_string.encode())
+    digest.update(b"\0")
+    digest.update(_canonical_prompt(prompt).encode())
+    return digest.hexdigest()
+
+class LLMResponseStore:
+    """SQLite table of responses with per-model hit / miss / saved-latency counters."""
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=int(LLM_CACHE_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._ready = False
+        self._total_bytes = None
+        self._lock = threading.Lock()
+        self._stats = {}    # model -> {"hits", "misses", "saved_seconds"}
+
+    def _pool(self):
+        pool = get_pool(self.path)
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    with pool.writer() as conn:
+                        conn.execute("""
+                            CREATE TABLE IF NOT EXISTS llm_cache (
+                                key TEXT PRIMARY KEY,
+                                model TEXT NOT NULL,
+                                response TEXT NOT NULL,
+                                bytes INTEGER NOT NULL,
+                                latency_seconds REAL NOT NULL,
+                                created_at REAL NOT NULL,
+                                last_used REAL NOT NULL,
+                                hits INTEGER NOT NULL DEFAULT 0
+                            ) WITHOUT ROWID
+                        """)
+                        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+                    self._ready = True
+        return pool
+
+    def _count(self, model, field, amount=1):
+        with self._lock:
+            stats = self._stats.setdefault(model, {"hits": 0, "misses": 0, "saved_seconds": 0.0})
+            stats[field] += amount
+
+    def get(self, key, model):
+        """Stored response text for key (and records the hit / miss), or None."""
+        pool = self._pool()
+        with pool.reader() as conn:
+            row = conn.execute(
+                "SELECT response, latency_seconds FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            self._count(model, "misses")
+            return None
+        self._count(model, "hits")
+        self._count(model, "saved_seconds", row[1])
+        with pool.writer() as conn:
+            conn.execute("UPDATE llm_cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key, model, response, latency_seconds):
+        size = len(response.encode())
+        now = time.time()
+        with self._pool().writer() as conn:
+            if self._total_bytes is None:
+                self._total_bytes = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM llm_cache").fetchone()[0]
+            old = conn.execute("SELECT bytes FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, bytes, latency_seconds, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, latency_seconds, now, now),
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict(conn)
+
+    def _evict(self, conn):
+        """Drops least recently used entries until the cache is at 90% of max_bytes."""
+        target = self.max_bytes * 0.9
+        rows = conn.execute("SELECT key, bytes FROM llm_cache ORDER BY last_used").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        conn.executemany("DELETE FROM llm_cache WHERE key = ?", evicted)
+
+    def clear(self, model=None):
+        with self._pool().writer() as conn:
+            if model is None:
+                conn.execute("DELETE FROM llm_cache")
+            else:
+                conn.execute("DELETE FROM llm_cache WHERE model = ?", (model,))
+            self._total_bytes = None
+
+    def stats(self):
+        """Per model: entries, stored bytes, hits, misses, hit rate and LLM seconds saved."""
+        with self._pool().reader() as conn:
+            stored = {model: (n, size) for model, n, size in conn.execute(
+                "SELECT model, COUNT(*), SUM(bytes) FROM llm_cache GROUP BY model")}
+        with self._lock:
+            counters = {model: dict(stats) for model, stats in self._stats.items()}
+        report = {}
+        for model in sorted(set(stored) | set(counters)):
+            entries, size = stored.get(model, (0, 0))
+            c = counters.get(model, {"hits": 0, "misses": 0, "saved_seconds": 0.0})
+            lookups = c["hits"] + c["misses"]
+            report[model] = {
+                "entries": entries,
+                "bytes": size,
+                "hits": c["hits"],
+                "misses": c["misses"],
+                "hit_rate": c["hits"] / lookups if lookups else 0.0,
+                "saved_seconds": round(c["saved_seconds"], 3),
+            }
+        return report
+
+class ModelCache(BaseCache):
+    """The cache as one model sees it (LangChain BaseCache); all models share one store."""
+
+    def __init__(self, store, model, mode):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode!r} (expected one of {', '.join(CACHE_MODES)})")
+        self.store = store
+        self.model = model
+        self.mode = mode
+        self._started = {}      # key -> time the model call started (for the saved-latency stat)
+
+    def lookup(self, prompt, llm_string):
+        key = cache_key(prompt, llm_string)
+        if self.mode != "record":
+            response = self.store.get(key, self.model)
+            if response is not None:
+                return loads(response, allowed_objects="core")
+            if self.mode == "replay":
+                raise LLMCacheMiss(f"❌ No recorded {self.model} response for this prompt (key {key[:12]})")
+        self._started[key] = time.perf_counter()
+        return None
+
+    def update(self, prompt, llm_string, return_val):
+        if self.mode == "replay":
+            return
+        key = cache_key(prompt, llm_string)
+        started = self._started.pop(key, None)
+        latency = time.perf_counter() - started if started is not None else 0.0
+        self.store.put(key, self.model, dumps(return_val), latency)
+
+    def clear(self, **kwargs):
+        self.store.clear(self.model)
+
+# Shared by every model in the process
+llm_response_store = LLMResponseStore()
+
+def get_model_cache(model, temperature=0, mode=None):
+    """
+    The cache to give a chat model, or None when it should not be cached
+    (cache off, or a sampling temperature in read-through / record mode).
+    """
+    mode = (mode or LLM_CACHE_MODE).lower()
+    if mode == "off":
+        return None
+    if mode != "replay" and temperature:
+        return None
+    return ModelCache(llm_response_store, model, mode)
+
+def llm_cache_stats():
+    return {"mode": LLM_CACHE_MODE, "path": llm_response_store.path, "models": llm_response_store.stats()}
@@ -1,9 +1,22 @@
 # src/runner.py  (or wherever you keep it)
 import uuid
 from langchain_core.messages import HumanMessage
-from src.agents.graph import app
+from src.agents.graph import sync_agent
 
-def run_interactive_session(customer_id: int):
+def run_turn(agent, config, inputs, verbose=True):
+    """
+    Streams one turn (a new message, or None to resume after an approval) and
+    returns the final state values.
+    """
+    values = None
+    for event in agent.stream(inputs, config, stream_mode="values"):
+        values = event
+        if verbose:
+            _print_event(event)
+    return values
+
+def run_interactive_session(customer_id: int, agent=None):
+    agent = agent or sync_agent()
     print(f"\n🚀 Starting interactive retention session for Customer ID: {customer_id}")
     print("Type your message or 'exit' to quit.")
     print("=" * 70)
@@ -16,14 +29,7 @@ def run_interactive_session(customer_id: int):
 
     # Send the initial message
     print("\nSending initial request to agent...")
-    events = app.stream(
-        {"messages": [HumanMessage(content=initial_input)]},
-        config,
-        stream_mode="values"
-    )
-
-    for event in events:
-        _print_event(event)
+    run_turn(agent, config, {"messages": [HumanMessage(content=initial_input)]})
 
     # Now enter interactive loop
     while True:
@@ -36,14 +42,7 @@ def run_interactive_session(customer_id: int):
             continue
 
         # Resume / continue the stream with new human message
-        events = app.stream(
-            {"messages": [HumanMessage(content=user_input)]},
-            config,
-            stream_mode="values"
-        )
-
-        for event in events:
-            _print_event(event)
+        run_turn(agent, config, {"messages": [HumanMessage(content=user_input)]})
 
 def _print_event(event):
     """Helper to nicely display agent thoughts, tool calls, results"""
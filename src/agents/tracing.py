@@ -1 +1,367 @@
-# LangSmith tracing setup
\ No newline at end of file
+# Tracing & metrics for the agent hot path
+
+# Built in, no external service: every graph node, tool, LLM call, SQL query, model load
+# and vector search runs inside a `span(...)`, which
+#   - records its duration in a Prometheus histogram (labels: kind, name) -> GET /metrics
+#   - is tied to the conversation's thread_id (a context variable set by the graph nodes,
+#     so tools running on worker threads / tasks inherit it) and to its parent span
+#   - is written as one JSON line to AGENT_TRACE_FILE by a background exporter (once
+#     `start_export()` has been called, e.g. by the API server)
+# AGENT_TRACING=0 turns spans into no-ops.
+#
+# Usage: python -m src.agents.tracing [--file data/traces.jsonl] [--thread THREAD_ID]
+#        (where the time went, per span kind / name, overall or for one retention case)
+
+import argparse
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TRACE_FILE = os.getenv("AGENT_TRACE_FILE") or os.path.join(BASE_DIR, "data", "traces.jsonl")
+TRACE_MAX_MB = float(os.getenv("AGENT_TRACE_MAX_MB", "50"))
+TRACING_ENABLED = os.getenv("AGENT_TRACING", "1").lower() not in ("0", "false", "off")
+
+# Histogram buckets in seconds: sub-ms cache hits up to multi-second LLM calls
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_thread_id = contextvars.ContextVar("trace_thread_id", default=None)
+_current_span = contextvars.ContextVar("trace_current_span", default=None)
+
+def _new_id(n_bytes=8):
+    return os.urandom(n_bytes).hex()
+
+class Span:
+    """One timed operation. `set(...)` adds attributes, `fail(error)` marks it as an error."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "thread_id",
+                 "attributes", "start", "duration", "error")
+
+    def __init__(self, name, kind, parent=None, attributes=None):
+        self.name = name
+        self.kind = kind
+        self.span_id = _new_id()
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else _new_id(16)
+        self.thread_id = _thread_id.get()
+        self.attributes = attributes or {}
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, error):
+        self.error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "thread_id": self.thread_id,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+    def fail(self, error):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+# ───────────────────────────────────────────────
+# Metrics (Prometheus text format)
+# ───────────────────────────────────────────────
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class SpanMetrics:
+    """Duration histogram + error counter per (kind, name)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}       # (kind, name) -> [bucket counts..., sum, count, errors]
+
+    def observe(self, kind, name, seconds, error=False):
+        with self._lock:
+            series = self._series.get((kind, name))
+            if series is None:
+                series = self._series[(kind, name)] = [0] * (len(self.buckets) + 3)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+                    break
+            n = len(self.buckets)
+            series[n] += seconds
+            series[n + 1] += 1
+            series[n + 2] += 1 if error else 0
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(series) for key, series in self._series.items()}
+
+    def render(self):
+        n = len(self.buckets)
+        snapshot = sorted(self.snapshot().items())
+        lines = [
+            "# HELP agent_span_duration_seconds Time spent in traced operations.",
+            "# TYPE agent_span_duration_seconds histogram",
+        ]
+        for (kind, name), series in snapshot:
+            labels = f'kind="{_escape(kind)}",name="{_escape(name)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'agent_span_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'agent_span_duration_seconds_bucket{{{labels},le="+Inf"}} {series[n + 1]}')
+            lines.append(f"agent_span_duration_seconds_sum{{{labels}}} {series[n]:.6f}")
+            lines.append(f"agent_span_duration_seconds_count{{{labels}}} {series[n + 1]}")
+        lines += [
+            "# HELP agent_span_errors_total Traced operations that raised or returned an error.",
+            "# TYPE agent_span_errors_total counter",
+        ]
+        for (kind, name), series in snapshot:
+            lines.append(f'agent_span_errors_total{{kind="{_escape(kind)}",name="{_escape(name)}"}} {series[n + 2]}')
+        return "\n".join(lines) + "\n"
+
+# ───────────────────────────────────────────────
+# JSONL exporter
+# ───────────────────────────────────────────────
+class JsonlSpanExporter:
+    """
+    Appends finished spans to a JSONL file from a background thread, so the traced
+    code never waits on disk. The file is rotated to `<path>.1` past max_bytes.
+    """
+
+    def __init__(self, path=TRACE_FILE, max_bytes=int(TRACE_MAX_MB * 1024 * 1024), max_queue=10_000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.exported = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._loop, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self, spans):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+            os.replace(self.path, self.path + ".1")
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        self.exported += len(spans)
+
+    def _loop(self):
+        while True:
+            span = self._queue.get()
+            if span is None:
+                return
+            spans = [span]
+            while len(spans) < 1000:
+                try:
+                    span = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if span is None:
+                    self._safe_write(spans)
+                    return
+                spans.append(span)
+            self._safe_write(spans)
+
+    def _safe_write(self, spans):
+        try:
+            self._write(spans)
+        except OSError as e:
+            self.dropped += len(spans)
+            print(f"⚠️ Could not write spans to {self.path}: {e}")
+
+    def shutdown(self, timeout=5):
+        """Writes what is queued, then stops the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+# ───────────────────────────────────────────────
+# Tracer
+# ───────────────────────────────────────────────
+class Tracer:
+    def __init__(self, enabled=TRACING_ENABLED):
+        self.enabled = enabled
+        self.metrics = SpanMetrics()
+        self.exporter = None
+
+    @contextmanager
+    def span(self, name, kind="internal", **attributes):
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        span = Span(name, kind, parent=_current_span.get(), attributes=attributes)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            _current_span.reset(token)
+            self.metrics.observe(kind, name, span.duration, error=span.error is not None)
+            exporter = self.exporter
+            if exporter is not None:
+                exporter.export(span)
+
+    def start_export(self, path=TRACE_FILE):
+        """Starts writing spans to `path` (JSONL). Returns the exporter."""
+        if self.exporter is None:
+            self.exporter = JsonlSpanExporter(path)
+        return self.exporter
+
+    def stop_export(self):
+        exporter, self.exporter = self.exporter, None
+        if exporter is not None:
+            exporter.shutdown()
+
+    def render_metrics(self):
+        text = self.metrics.render()
+        exporter = self.exporter
+        if exporter is not None:
+            text += (
+                "# HELP agent_spans_exported_total Spans written to the trace file.\n"
+                "# TYPE agent_spans_exported_total counter\n"
+                f"agent_spans_exported_total {exporter.exported}\n"
+                "# HELP agent_spans_dropped_total Spans lost (queue full or write error).\n"
+                "# TYPE agent_spans_dropped_total counter\n"
+                f"agent_spans_dropped_total {exporter.dropped}\n"
+            )
+        return text
+
+# Shared by the whole process
+tracer = Tracer()
+span = tracer.span
+
+def start_export(path=TRACE_FILE):
+    return tracer.start_export(path)
+
+def stop_export():
+    tracer.stop_export()
+
+def render_metrics():
+    """Every metric in Prometheus text exposition format."""
+    return tracer.render_metrics()
+
+@contextmanager
+def bind_thread(thread_id):
+    """Ties every span opened inside the block to `thread_id`."""
+    token = _thread_id.set(thread_id)
+    try:
+        yield
+    finally:
+        _thread_id.reset(token)
+
+def current_thread_id():
+    return _thread_id.get()
+
+def traced(kind, name=None):
+    """Decorator: runs the (sync or async) function inside a span."""
+    def decorate(func):
+        span_name = name or func.__name__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def trace_node(name, func):
+    """
+    Wraps a graph node `func(state, config)`: binds the config's thread_id and times the
+    node. Keeps the (state, config) signature so LangGraph still passes the config.
+    """
+    def thread_of(config):
+        return ((config or {}).get("configurable") or {}).get("thread_id")
+
+    if asyncio.iscoroutinefunction(func):
+        async def async_node(state, config):
+            with bind_thread(thread_of(config)), span(name, "node"):
+                return await func(state, config)
+        return async_node
+
+    def node(state, config):
+        with bind_thread(thread_of(config)), span(name, "node"):
+            return func(state, config)
+    return node
+
+# ───────────────────────────────────────────────
+# Trace file summary
+# ───────────────────────────────────────────────
+def summarize(path=TRACE_FILE, thread_id=None):
+    """Per (kind, name): span count, total / p50 / max ms and errors, from a trace file."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"❌ Trace file not found at {path}")
+    durations, errors = {}, {}
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if thread_id and record.get("thread_id") != thread_id:
+                continue
+            key = (record["kind"], record["name"])
+            durations.setdefault(key, []).append(record["duration_ms"])
+            errors[key] = errors.get(key, 0) + (record.get("status") == "error")
+    summary = []
+    for (kind, name), samples in durations.items():
+        samples.sort()
+        summary.append({
+            "kind": kind,
+            "name": name,
+            "count": len(samples),
+            "total_ms": round(sum(samples), 1),
+            "p50_ms": round(samples[len(samples) // 2], 2),
+            "max_ms": round(samples[-1], 2),
+            "errors": errors[(kind, name)],
+        })
+    return sorted(summary, key=lambda row: row["total_ms"], reverse=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize agent spans from a trace file")
+    parser.add_argument("--file", default=TRACE_FILE, help="JSONL trace file")
+    parser.add_argument("--thread", default=None, help="Only spans of this thread_id")
+    args = parser.parse_args()
+
+    rows = summarize(args.file, args.thread)
+    print(f"\n📊 {args.file}" + (f" (thread {args.thread})" if args.thread else ""))
+    print(f"{'kind':<14}{'name':<36}{'count':>7}{'total ms':>11}{'p50 ms':>9}{'max ms':>9}{'errors':>8}")
+    for row in rows:
+        print(f"{row['kind']:<14}{row['name'][:35]:<36}{row['count']:>7}{row['total_ms']:>11.1f}"
+              f"{row['p50_ms']:>9.2f}{row['max_ms']:>9.2f}{row['errors']:>8}")
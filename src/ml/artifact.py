@@ -0,0 +1,143 @@
+# Versioned model artifact
+
+# Bundles the trained model with everything needed to build its features
+# (feature order, category maps) so the two can never drift apart.
+
+import hashlib
+import json
+import time
+
+import joblib
+import sklearn
+
+from src.ml.preprocessor import FEATURE_COLUMNS, RAW_COLUMNS, ROOM_MAP, FeatureTransformer
+
+# Bump when the layout of the saved bundle changes
+ARTIFACT_FORMAT_VERSION = 1
+
+# Code given to room types that were not seen during training
+UNKNOWN_CATEGORY = -1
+
+# One compiled transformer per feature schema, shared by every model version that uses it
+_transformer_cache = {}
+
+def compute_schema_hash(feature_columns, raw_columns, category_maps, unknown_category):
+    """Returns a stable SHA-256 of everything that defines the feature layout."""
+    payload = json.dumps(
+        {
+            "feature_columns": list(feature_columns),
+            "raw_columns": list(raw_columns),
+            "category_maps": category_maps,
+            "unknown_category": unknown_category,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_transformer(schema_hash, category_maps, unknown_category):
+    """Returns the cached FeatureTransformer for a schema, building it on first use."""
+    transformer = _transformer_cache.get(schema_hash)
+    if transformer is None:
+        transformer = FeatureTransformer(
+            room_map=category_maps["room_type"],
+            unknown_room=unknown_category,
+        )
+        _transformer_cache[schema_hash] = transformer
+    return transformer
+
+class ChurnArtifact:
+    """A loaded, schema-checked churn model together with its feature transformer."""
+
+    def __init__(self, model, feature_columns, category_maps, unknown_category,
+                 schema_hash, model_version, trained_at=None, sklearn_version=None):
+        self.model = model
+        self.feature_columns = list(feature_columns)
+        self.category_maps = category_maps
+        self.unknown_category = unknown_category
+        self.schema_hash = schema_hash
+        self.model_version = model_version
+        self.trained_at = trained_at
+        self.sklearn_version = sklearn_version
+        self.transformer = get_transformer(schema_hash, category_maps, unknown_category)
+
+    def describe(self):
+        """Returns the artifact metadata (everything except the model itself)."""
+        return {
+            "model_version": self.model_version,
+            "schema_hash": self.schema_hash,
+            "feature_columns": self.feature_columns,
+            "category_maps": self.category_maps,
+            "unknown_category": self.unknown_category,
+            "trained_at": self.trained_at,
+            "sklearn_version": self.sklearn_version,
+        }
+
+def save_artifact(model, category_maps, path, unknown_category=UNKNOWN_CATEGORY):
+    """
+    Writes the model and its preprocessing schema as one versioned bundle.
+    Returns: The schema hash that was written.
+    """
+    schema_hash = compute_schema_hash(FEATURE_COLUMNS, RAW_COLUMNS, category_maps, unknown_category)
+    bundle = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "model_version": time.strftime("%Y%m%d%H%M%S"),
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sklearn_version": sklearn.__version__,
+        "feature_columns": list(FEATURE_COLUMNS),
+        "raw_columns": list(RAW_COLUMNS),
+        "category_maps": category_maps,
+        "unknown_category": unknown_category,
+        "schema_hash": schema_hash,
+        "model": model,
+    }
+    joblib.dump(bundle, path)
+    return schema_hash
+
+def load_artifact(path):
+    """
+    Loads a bundle and validates its schema once, up front.
+    A bare estimator (saved before bundles existed) is wrapped with the legacy room map.
+    Raises: ValueError if the bundle does not match this code's feature layout.
+    """
+    obj = joblib.load(path)
+
+    if not isinstance(obj, dict):
+        print("⚠️ Legacy model file without preprocessing schema. Retrain to get a versioned artifact.")
+        category_maps = {"room_type": dict(ROOM_MAP)}
+        return ChurnArtifact(
+            model=obj,
+            feature_columns=FEATURE_COLUMNS,
+            category_maps=category_maps,
+            unknown_category=0,
+            schema_hash=compute_schema_hash(FEATURE_COLUMNS, RAW_COLUMNS, category_maps, 0),
+            model_version="legacy",
+        )
+
+    if obj.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(
+            f"❌ Unsupported artifact format {obj.get('format_version')} "
+            f"(expected {ARTIFACT_FORMAT_VERSION}). Please retrain."
+        )
+
+    if list(obj["feature_columns"]) != list(FEATURE_COLUMNS) or list(obj["raw_columns"]) != list(RAW_COLUMNS):
+        raise ValueError(
+            f"❌ Feature schema mismatch: artifact has {obj['feature_columns']}, "
+            f"code expects {FEATURE_COLUMNS}. Please retrain."
+        )
+
+    expected_hash = compute_schema_hash(
+        obj["feature_columns"], obj["raw_columns"], obj["category_maps"], obj["unknown_category"]
+    )
+    if expected_hash != obj["schema_hash"]:
+        raise ValueError("❌ Artifact schema hash does not match its contents. The file may be corrupted.")
+
+    return ChurnArtifact(
+        model=obj["model"],
+        feature_columns=obj["feature_columns"],
+        category_maps=obj["category_maps"],
+        unknown_category=obj["unknown_category"],
+        schema_hash=obj["schema_hash"],
+        model_version=obj["model_version"],
+        trained_at=obj.get("trained_at"),
+        sklearn_version=obj.get("sklearn_version"),
+    )
@@ -1,7 +1,7 @@
 # Data loading for ML
 import pandas as pd
-import sqlite3
 import os
+from src.utils.sqlite_pool import get_pool
 
 def load_data(db_path):
     """
@@ -10,8 +10,6 @@ def load_data(db_path):
     if not os.path.exists(db_path):
         raise FileNotFoundError(f"❌ Database not found at: {db_path}")
 
-    conn = sqlite3.connect(db_path)
-    
     # We want rows that match our feature needs
     query = """
     SELECT 
@@ -26,11 +24,10 @@ def load_data(db_path):
     """
     
     try:
-        df = pd.read_sql(query, conn)
+        with get_pool(db_path).reader() as conn:
+            df = pd.read_sql(query, conn)
         print(f"✅ Loaded {len(df)} rows from database.")
         return df
     except Exception as e:
         print(f"❌ Error loading data: {e}")
-        return pd.DataFrame()
-    finally:
-        conn.close()
\ No newline at end of file
+        return pd.DataFrame()
\ No newline at end of file
@@ -1,12 +1,16 @@
 # Inference logic
 
 
-import joblib
 import os
+import time
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from src.ml.loader import load_data
-from src.ml.preprocessor import feature_engineering
+from src.ml.preprocessor import feature_engineering, build_category_maps
+from src.ml.artifact import UNKNOWN_CATEGORY, load_artifact, save_artifact
+from src.ml.registry import ModelRegistry
+from src.utils.sqlite_pool import get_pool
 
 # Paths
 from src.utils.db_ops import DB_PATH
@@ -14,6 +18,9 @@ from src.utils.db_ops import DB_PATH
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 MODEL_PATH = os.path.join(BASE_DIR, "models", "churn_model.joblib")
 
+# One cached, schema-checked artifact per process (reloaded automatically when the file changes)
+model_registry = ModelRegistry(MODEL_PATH, loader=load_artifact)
+
 def train_model():
     """Trains a Random Forest model and saves it."""
     print("🔄 Starting Model Training...")
@@ -24,17 +31,25 @@ def train_model():
         print("❌ No data to train on!")
         return
 
-    # 2. Preprocess
-    X, y = feature_engineering(df, is_training=True)
+    # 2. Preprocess (learn the category maps that ship with the model)
+    category_maps = build_category_maps(df)
+    X, y = feature_engineering(
+        df, is_training=True, room_map=category_maps["room_type"], unknown_room=UNKNOWN_CATEGORY
+    )
 
     # 3. Train (Random Forest)
+    # Fit on the float32 matrix that FeatureTransformer produces at inference time
+    X = X.to_numpy(dtype=np.float32)
     model = RandomForestClassifier(n_estimators=50, random_state=42)
     model.fit(X, y)
 
-    # 4. Save Model
+    # 4. Save Model + preprocessing schema as one artifact
+    # (write to a temp file and swap, so running servers never load a partial file)
     os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
-    print(f"✅ Model saved to {MODEL_PATH}")
+    tmp_path = MODEL_PATH + ".tmp"
+    schema_hash = save_artifact(model, category_maps, tmp_path)
+    os.replace(tmp_path, MODEL_PATH)
+    print(f"✅ Model saved to {MODEL_PATH} (schema {schema_hash[:12]})")
     print(f"🎯 Training Accuracy: {model.score(X, y):.2f}")
 
 def get_churn_risk(customer_data):
@@ -42,21 +57,149 @@ def get_churn_risk(customer_data):
     Predicts risk for a single customer dictionary.
     Returns: probability of churn (0.0 to 1.0)
     """
-    if not os.path.exists(MODEL_PATH):
+    artifact = model_registry.get()
+    if artifact is None:
         print("⚠️ Model not found. Please train first.")
         return 0.5  # Default uncertainty
 
-    model = joblib.load(MODEL_PATH)
-    
-    # Convert single dict to DataFrame
-    df = pd.DataFrame([customer_data])
-    
-    # Preprocess
-    X = feature_engineering(df, is_training=False)
-    
+    # Preprocess (single-row fast path, no DataFrame)
+    X = artifact.transformer.transform_one(customer_data)
+
     # Predict Probability
-    risk_score = model.predict_proba(X)[0][1] # Probability of class 1 (Churn)
-    return risk_score
+    risk_score = _predict_proba(artifact.model, X)[0][1] # Probability of class 1 (Churn)
+    return float(risk_score)
+
+def _predict_proba(model, X):
+    """Runs predict_proba on a feature matrix, wrapping it for models fitted on a DataFrame."""
+    feature_names = getattr(model, "feature_names_in_", None)
+    if feature_names is not None:
+        # Older models were trained on named columns; keep sklearn from warning
+        X = pd.DataFrame(X, columns=feature_names)
+    return model.predict_proba(X)
+
+# Columns pulled from `bookings` for batch scoring
+SCORING_COLUMNS = [
+    "booking_id",
+    "customer_id",
+    "room_type",
+    "booking_price",
+    "total_stays",
+    "previous_cancellations",
+    "special_requests",
+]
+
+def score_batch(rows, columns=None, artifact=None):
+    """
+    Predicts churn risk for a batch of bookings in one pass.
+    rows: DataFrame, list of dicts, or list of tuples (with `columns`).
+    Returns: NumPy array of probabilities (0.0 to 1.0), aligned with rows.
+    """
+    if artifact is None:
+        artifact = model_registry.get()
+        if artifact is None:
+            raise FileNotFoundError(f"❌ Model not found at {MODEL_PATH}. Please train first.")
+
+    X = artifact.transformer.transform(rows, columns=columns)
+    if len(X) == 0:
+        return np.empty(0, dtype=float)
+
+    return _predict_proba(artifact.model, X)[:, 1]
+
+def _ensure_risk_scores_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS risk_scores (
+            booking_id INTEGER PRIMARY KEY,
+            customer_id INTEGER NOT NULL,
+            risk_score REAL NOT NULL,
+            model_sha256 TEXT,
+            scored_at TEXT NOT NULL
+        )
+    """)
+
+def score_all_bookings(db_path=DB_PATH, chunk_size=10000, limit=None):
+    """
+    Scores every booking in the database and writes results to `risk_scores`.
+
+    Rows are read in `chunk_size` pages using keyset pagination on booking_id,
+    so memory stays bounded no matter how large the table is, and each page is
+    scored with a single predict_proba call.
+    Returns: Dict with rows scored, elapsed seconds and rows/sec.
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"❌ Database not found at: {db_path}")
+
+    artifact = model_registry.get()
+    if artifact is None:
+        raise FileNotFoundError(f"❌ Model not found at {MODEL_PATH}. Please train first.")
+    model_sha256 = model_registry.stats()["sha256"]
+
+    pool = get_pool(db_path)
+    with pool.writer() as conn:
+        _ensure_risk_scores_table(conn)
+
+    query = f"""
+    SELECT {", ".join(SCORING_COLUMNS)}
+    FROM bookings
+    WHERE booking_id > ?
+    ORDER BY booking_id
+    LIMIT ?
+    """
+
+    total = 0
+    last_id = -1
+    start = time.perf_counter()
+    while limit is None or total < limit:
+        page_size = chunk_size if limit is None else min(chunk_size, limit - total)
+        with pool.reader() as conn:
+            rows = conn.execute(query, (last_id, page_size)).fetchall()
+        if not rows:
+            break
+
+        scores = score_batch(rows, columns=SCORING_COLUMNS, artifact=artifact)
+        scored_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+        with pool.writer() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO risk_scores "
+                "(booking_id, customer_id, risk_score, model_sha256, scored_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    (row[0], row[1], score, model_sha256, scored_at)
+                    for row, score in zip(rows, scores.tolist())
+                ),
+            )
+
+        total += len(rows)
+        last_id = rows[-1][0]
+        elapsed = time.perf_counter() - start
+        print(f"📊 Scored {total} rows ({total / elapsed:,.0f} rows/sec)")
+
+    elapsed = time.perf_counter() - start
+    rows_per_sec = total / elapsed if elapsed > 0 else 0.0
+    print(f"✅ Scored {total} bookings in {elapsed:.2f}s ({rows_per_sec:,.0f} rows/sec)")
+    return {"rows": total, "seconds": elapsed, "rows_per_sec": rows_per_sec}
+
+def warm_model():
+    """
+    Loads and schema-checks the model artifact up front (call once at startup).
+    Returns: The artifact metadata, or None if no model has been trained yet.
+    """
+    artifact = model_registry.get()
+    if artifact is None:
+        print("⚠️ Model not found. Please train first.")
+        return None
+    print(f"✅ Churn model {artifact.model_version} ready (schema {artifact.schema_hash[:12]})")
+    return artifact.describe()
+
+def get_model_stats():
+    """Returns load time, cache-hit counters and artifact info for the churn model."""
+    stats = model_registry.stats()
+    artifact = model_registry.peek()
+    if artifact is not None:
+        stats["model_version"] = artifact.model_version
+        stats["schema_hash"] = artifact.schema_hash
+        stats["unknown_room_types"] = artifact.transformer.unknown_rooms
+    return stats
 
 if __name__ == "__main__":
     train_model()
\ No newline at end of file
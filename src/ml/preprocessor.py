@@ -1,39 +1,186 @@
 # Feature engineering
 
 
+from collections.abc import Mapping
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
 
-# Global encoders (in a real app, these would be saved/loaded too)
-room_encoder = LabelEncoder()
+# Legacy Room Type map (Text -> Number), used only for models saved before
+# versioned artifacts. New models learn their map in build_category_maps().
+ROOM_MAP = {"Standard": 0, "Deluxe Suite": 1, "Presidential": 2}
 
-def feature_engineering(df, is_training=True):
+# Model input columns, in the exact order the model was trained on
+FEATURE_COLUMNS = ['room_type_enc', 'booking_price', 'total_stays', 'previous_cancellations', 'has_requests']
+
+# Raw booking columns the features are computed from
+RAW_COLUMNS = ['room_type', 'booking_price', 'total_stays', 'previous_cancellations', 'special_requests']
+
+def build_category_maps(df):
+    """
+    Learns the category encodings from training data.
+    Returns: {"room_type": {room_type: code}} with codes in sorted name order.
+    """
+    room_types = sorted(df['room_type'].dropna().unique().tolist())
+    return {"room_type": {room: code for code, room in enumerate(room_types)}}
+
+def feature_engineering(df, is_training=True, room_map=None, unknown_room=0):
     """
     Prepares raw data for the model.
+    room_map: Room type encoding (defaults to the legacy ROOM_MAP).
+    unknown_room: Code used for room types missing from room_map.
     """
     df_clean = df.copy()
+    room_map = ROOM_MAP if room_map is None else room_map
 
     # 1. Handle Room Type (Text -> Number)
-    # Mocking fit_transform for simplicity in this capstone
-    room_map = {"Standard": 0, "Deluxe Suite": 1, "Presidential": 2}
-    df_clean['room_type_enc'] = df_clean['room_type'].map(room_map).fillna(0)
+    df_clean['room_type_enc'] = df_clean['room_type'].map(room_map).fillna(unknown_room)
 
     # 2. Handle Special Requests (Yes/No -> 1/0)
     df_clean['has_requests'] = df_clean['special_requests'].notna().astype(int)
 
     # 3. Select Features for Model
-    features = ['room_type_enc', 'booking_price', 'total_stays', 'previous_cancellations', 'has_requests']
-    
+    features = FEATURE_COLUMNS
+
     if is_training:
-        # Create a mock target variable 'churned' based on logic 
+        # Create a mock target variable 'churned' based on logic
         # (Since our DB doesn't have a 'cancelled' column for history yet)
         # LOGIC: High cancellations OR High price (>500) = Likely Churn
         df_clean['churned'] = np.where(
-            (df_clean['previous_cancellations'] > 0) | (df_clean['booking_price'] > 600), 
-            1, 
+            (df_clean['previous_cancellations'] > 0) | (df_clean['booking_price'] > 600),
+            1,
             0
         )
         return df_clean[features], df_clean['churned']
-    
-    return df_clean[features]
\ No newline at end of file
+
+    return df_clean[features]
+
+def _is_present(value):
+    """Mirrors pandas `notna` for a single value (None and NaN are missing)."""
+    return value is not None and value == value
+
+class FeatureTransformer:
+    """
+    Turns raw booking rows straight into a contiguous float32 matrix (FEATURE_COLUMNS order).
+
+    Produces the same values as `feature_engineering(df, is_training=False)`
+    without building or copying a DataFrame. float32 is what scikit-learn's
+    trees use internally, so predict_proba does not need to convert it again.
+
+    Rows can be dicts, or tuples/sqlite3 rows together with their column names.
+    """
+
+    def __init__(self, room_map=None, unknown_room=0):
+        self.room_map = dict(ROOM_MAP if room_map is None else room_map)
+        self.unknown_room = float(unknown_room)
+        self.n_features = len(FEATURE_COLUMNS)
+        self.unknown_rooms = 0
+        self._index_cache = {}
+
+    def _indices(self, columns):
+        """Returns the positions of RAW_COLUMNS within a tuple row's column list."""
+        if columns is None:
+            raise ValueError("`columns` is required when rows are tuples.")
+        key = tuple(columns)
+        indices = self._index_cache.get(key)
+        if indices is None:
+            missing = [c for c in RAW_COLUMNS if c not in key]
+            if missing:
+                raise KeyError(f"Missing columns for feature transform: {missing}")
+            indices = tuple(key.index(c) for c in RAW_COLUMNS)
+            self._index_cache[key] = indices
+        return indices
+
+    def transform_one(self, row, columns=None, out=None):
+        """
+        Fast path for a single row. Returns a (1, n_features) float32 array.
+        Pass `out` to reuse a preallocated buffer.
+        """
+        if isinstance(row, Mapping):
+            room, price, stays, cancellations, requests = (row.get(c) for c in RAW_COLUMNS)
+        else:
+            i_room, i_price, i_stays, i_cancel, i_req = self._indices(columns)
+            room, price, stays, cancellations, requests = (
+                row[i_room], row[i_price], row[i_stays], row[i_cancel], row[i_req]
+            )
+
+        if out is None:
+            out = np.empty((1, self.n_features), dtype=np.float32)
+        code = self.room_map.get(room)
+        if code is None:
+            self.unknown_rooms += 1
+            code = self.unknown_room
+        out[0, 0] = code
+        out[0, 1] = np.nan if price is None else price
+        out[0, 2] = np.nan if stays is None else stays
+        out[0, 3] = np.nan if cancellations is None else cancellations
+        out[0, 4] = 1.0 if _is_present(requests) else 0.0
+        return out
+
+    def transform(self, rows, columns=None, out=None):
+        """
+        Batch path. Accepts a DataFrame, a list of dicts, or a list of tuples
+        (with `columns`). Returns an (n, n_features) float32 array.
+        """
+        if isinstance(rows, pd.DataFrame):
+            cols = [rows[c].tolist() for c in RAW_COLUMNS]
+            n = len(rows)
+        else:
+            if not isinstance(rows, list):
+                rows = list(rows)
+            n = len(rows)
+            if n == 0:
+                cols = [[] for _ in RAW_COLUMNS]
+            elif isinstance(rows[0], Mapping):
+                cols = [[r.get(c) for r in rows] for c in RAW_COLUMNS]
+            else:
+                transposed = list(zip(*rows))
+                cols = [transposed[i] for i in self._indices(columns)]
+
+        room, price, stays, cancellations, requests = cols
+        room_get = self.room_map.get
+        unknown = self.unknown_room
+        codes = [room_get(v) for v in room]
+        misses = codes.count(None)
+        if misses:
+            self.unknown_rooms += misses
+            codes = [unknown if c is None else c for c in codes]
+
+        if out is None:
+            out = np.empty((n, self.n_features), dtype=np.float32)
+        out[:, 0] = np.asarray(codes, dtype=np.float32)
+        out[:, 1] = np.asarray(price, dtype=np.float32)
+        out[:, 2] = np.asarray(stays, dtype=np.float32)
+        out[:, 3] = np.asarray(cancellations, dtype=np.float32)
+        out[:, 4] = np.fromiter((_is_present(v) for v in requests), dtype=np.float32, count=n)
+        return out
+
+# Shared default transformer
+feature_transformer = FeatureTransformer()
+
+def check_transformer_parity(df, transformer=None):
+    """
+    Checks that FeatureTransformer matches feature_engineering on `df`.
+    Returns: True if both paths produce the same float32 matrix.
+    """
+    transformer = transformer or feature_transformer
+    expected = feature_engineering(
+        df, is_training=False, room_map=transformer.room_map, unknown_room=transformer.unknown_room
+    ).to_numpy(dtype=np.float32)
+
+    batch = transformer.transform(df.to_dict(orient="records"))
+    single = np.vstack([transformer.transform_one(r) for r in df.to_dict(orient="records")]) \
+        if len(df) else batch
+    return (
+        np.allclose(expected, batch, equal_nan=True)
+        and np.allclose(expected, single, equal_nan=True)
+        and np.allclose(expected, transformer.transform(df), equal_nan=True)
+    )
+
+if __name__ == "__main__":
+    # Parity check against the live database
+    from src.ml.loader import load_data
+    from src.utils.db_ops import DB_PATH
+
+    data = load_data(DB_PATH)
+    ok = check_transformer_parity(data)
+    print(f"{'✅' if ok else '❌'} FeatureTransformer parity with feature_engineering: {ok}")
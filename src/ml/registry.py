@@ -0,0 +1,136 @@
+# Process-wide model cache
+
+# Loads the churn model once per process and hot-reloads it when the file on disk changes.
+
+import hashlib
+import os
+import threading
+import time
+
+import joblib
+
+from src.agents.tracing import span
+
+
+def _file_sha256(path, block_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Caches a joblib artifact in memory and reloads it only when the file changes.
+
+    A cheap os.stat (mtime + size) is used to detect changes, at most once every
+    `check_interval` seconds. When the stat changes, the file is hashed so that a
+    plain `touch` or a re-copy of identical bytes does not trigger a reload.
+    """
+
+    def __init__(self, path, loader=joblib.load, check_interval=1.0):
+        self.path = path
+        self.loader = loader
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._obj = None
+        self._stat_sig = None
+        self._sha256 = None
+        self._last_check = 0.0
+
+        self._loads = 0
+        self._hits = 0
+        self._misses = 0
+        self._last_load_seconds = 0.0
+        self._total_load_seconds = 0.0
+        self._loaded_at = None
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self):
+        """
+        Returns the cached object, loading or reloading it if needed.
+        Returns None if the file does not exist.
+        """
+        obj = self._obj
+        now = time.monotonic()
+        if obj is not None and now - self._last_check < self.check_interval:
+            self._hits += 1
+            return obj
+
+        sig = self._stat_signature()
+        if obj is not None and sig == self._stat_sig:
+            self._last_check = now
+            self._hits += 1
+            return obj
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if self._obj is not None and sig == self._stat_sig:
+                self._last_check = now
+                self._hits += 1
+                return self._obj
+
+            if sig is None:
+                self._misses += 1
+                return None
+
+            file_hash = _file_sha256(self.path)
+            if self._obj is not None and file_hash == self._sha256:
+                # Metadata changed but the content did not
+                self._stat_sig = sig
+                self._last_check = now
+                self._hits += 1
+                return self._obj
+
+            self._misses += 1
+            start = time.perf_counter()
+            with span(os.path.basename(self.path), "model_load"):
+                obj = self.loader(self.path)
+            elapsed = time.perf_counter() - start
+
+            self._obj = obj
+            self._stat_sig = sig
+            self._sha256 = file_hash
+            self._last_check = time.monotonic()
+            self._loads += 1
+            self._last_load_seconds = elapsed
+            self._total_load_seconds += elapsed
+            self._loaded_at = time.time()
+            print(f"✅ Loaded {os.path.basename(self.path)} in {elapsed * 1000:.1f} ms")
+            return obj
+
+    def peek(self):
+        """Returns the cached object without touching the file (None if not loaded)."""
+        return self._obj
+
+    def invalidate(self):
+        """Drops the cached object so the next get() reloads from disk."""
+        with self._lock:
+            self._obj = None
+            self._stat_sig = None
+            self._sha256 = None
+
+    def stats(self):
+        """Returns load timings and cache-hit counters."""
+        lookups = self._hits + self._misses
+        return {
+            "path": self.path,
+            "loaded": self._obj is not None,
+            "sha256": self._sha256,
+            "loaded_at": self._loaded_at,
+            "loads": self._loads,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "last_load_seconds": self._last_load_seconds,
+            "total_load_seconds": self._total_load_seconds,
+        }
@@ -0,0 +1,13 @@
+# Churn risk levels
+
+# Score -> risk level bands of the classifier. Kept free of model imports so the
+# policy rules (rag layer) can share them without loading sklearn or the database.
+
+# Highest first
+RISK_THRESHOLDS = (("HIGH", 0.7), ("LOW", 0.0))
+
+def risk_level_from_score(score):
+    for level, threshold in RISK_THRESHOLDS:
+        if score >= threshold:
+            return level
+    return "LOW"
@@ -0,0 +1,17 @@
+# Nightly batch scoring: python -m src.ml.score_bookings [--chunk-size N] [--limit N]
+
+import argparse
+from src.ml.predictor import score_all_bookings
+from src.utils.db_ops import DB_PATH
+
+def main():
+    parser = argparse.ArgumentParser(description="Score every booking and write results to the risk_scores table.")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database.")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows read and scored per chunk.")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many rows.")
+    args = parser.parse_args()
+
+    score_all_bookings(db_path=args.db, chunk_size=args.chunk_size, limit=args.limit)
+
+if __name__ == "__main__":
+    main()
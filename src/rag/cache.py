@@ -0,0 +1,213 @@
+# Query-side caches for policy retrieval
+
+# 1. CachedEmbeddings: wraps the embedding model so the same (normalized) query
+#    text is only embedded once. LRU in memory, optionally persisted to SQLite.
+# 2. SemanticCache: remembers final policy-search answers and returns one when a
+#    new query's embedding is close enough (cosine) to a query already answered.
+#    Queries that differ only in a risk level, tier or number embed almost identically
+#    but need different answers, so those facets go into the namespace (`answer_namespace`).
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.utils.sqlite_pool import get_pool
+
+DEFAULT_EMBEDDING_CACHE_SIZE = 4096
+DEFAULT_SEMANTIC_CACHE_SIZE = 512
+DEFAULT_SEMANTIC_THRESHOLD = 0.92
+DEFAULT_SEMANTIC_TTL_SECONDS = 24 * 3600
+
+def normalize_query(text):
+    """Lowercases, strips punctuation at the ends and collapses whitespace."""
+    text = re.sub(r"\s+", " ", text.lower()).strip()
+    return text.strip(" ?.!\"'")
+
+_RISK_WORDS = re.compile(r"\b(high|medium|moderate|low)\b")
+_TIER_WORDS = re.compile(r"\b(bronze|silver|gold|platinum|corporate|vip)\b")
+_NUMBERS = re.compile(r"\d+(?:\.\d+)?")
+
+def answer_namespace(query, base=""):
+    """
+    `base` plus the query's risk levels, tiers and numbers. Two queries only share
+    cached answers when all of these match.
+    """
+    text = normalize_query(query)
+    facets = [
+        "risk=" + ",".join(sorted(set(_RISK_WORDS.findall(text)))),
+        "tier=" + ",".join(sorted(set(_TIER_WORDS.findall(text)))),
+        "n=" + ",".join(sorted(set(_NUMBERS.findall(text)))),
+    ]
+    return ":".join([base] + facets)
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with an LRU cache for `embed_query`.
+    `embed_documents` (indexing) is passed straight through.
+    """
+
+    def __init__(self, embeddings, max_entries=DEFAULT_EMBEDDING_CACHE_SIZE, disk_path=None, namespace=""):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.namespace = namespace
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_ready = False
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_pool(self):
+        pool = get_pool(self.disk_path)
+        if not self._disk_ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self.disk_path)), exist_ok=True)
+            with pool.writer() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS query_embeddings (
+                        namespace TEXT NOT NULL,
+                        query TEXT NOT NULL,
+                        embedding BLOB NOT NULL,
+                        PRIMARY KEY (namespace, query)
+                    )
+                """)
+            self._disk_ready = True
+        return pool
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def embed_query(self, text):
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(vector)
+
+        if self.disk_path:
+            with self._disk_pool().reader() as conn:
+                row = conn.execute(
+                    "SELECT embedding FROM query_embeddings WHERE namespace = ? AND query = ?",
+                    (self.namespace, key),
+                ).fetchone()
+            if row is not None:
+                vector = np.frombuffer(row[0], dtype=np.float32).tolist()
+                self._remember(key, vector)
+                self.disk_hits += 1
+                return list(vector)
+
+        self.misses += 1
+        vector = self.embeddings.embed_query(key)
+        self._remember(key, vector)
+        if self.disk_path:
+            with self._disk_pool().writer() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (namespace, query, embedding) VALUES (?, ?, ?)",
+                    (self.namespace, key, np.asarray(vector, dtype=np.float32).tobytes()),
+                )
+        return list(vector)
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+class SemanticCache:
+    """
+    Caches answers by query embedding. A lookup returns the answer of the most
+    similar stored query if its cosine similarity is >= `threshold`.
+    """
+
+    def __init__(self, threshold=DEFAULT_SEMANTIC_THRESHOLD, max_entries=DEFAULT_SEMANTIC_CACHE_SIZE,
+                 ttl_seconds=DEFAULT_SEMANTIC_TTL_SECONDS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._vectors = None   # (n, dim) float32, unit-normalized rows
+        self._entries = []     # [(namespace, query, answer, created_at, last_used)]
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector, namespace=""):
+        """Returns (answer, similarity, matched_query) or None."""
+        query_vec = self._unit(vector)
+        with self._lock:
+            if self._vectors is None or not self._entries:
+                self.misses += 1
+                return None
+
+            scores = self._vectors @ query_vec
+            now = time.time()
+            for i in np.argsort(-scores):
+                if scores[i] < self.threshold:
+                    break
+                ns, query, answer, created_at, _ = self._entries[i]
+                if ns != namespace or now - created_at > self.ttl_seconds:
+                    continue
+                self._entries[i] = (ns, query, answer, created_at, now)
+                self.hits += 1
+                return answer, float(scores[i]), query
+
+            self.misses += 1
+            return None
+
+    def store(self, vector, answer, query="", namespace=""):
+        unit = self._unit(vector)[None, :]
+        now = time.time()
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = unit
+            else:
+                self._vectors = np.vstack([self._vectors, unit])
+            self._entries.append((namespace, query, answer, now, now))
+
+            if len(self._entries) > self.max_entries:
+                # Evict the least recently used entry
+                oldest = min(range(len(self._entries)), key=lambda i: self._entries[i][4])
+                del self._entries[oldest]
+                self._vectors = np.delete(self._vectors, oldest, axis=0)
+
+    def clear(self):
+        with self._lock:
+            self._vectors = None
+            self._entries = []
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
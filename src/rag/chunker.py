@@ -3,15 +3,219 @@
 
 # It cuts the PDF into bite-sized pieces for the AI.
 
+# `iter_chunks` is the streaming, token-aware chunker used for indexing: it consumes a
+# page stream, packs sentences / bullet items into chunks of at most `chunk_tokens`
+# tokens (counted with the embedding model's tokenizer), never mixes two sections in
+# one chunk, and tags every chunk with the section heading it belongs to.
+
+import re
+import threading
+
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from src.rag.embedder import MODEL_NAME
+
+# all-MiniLM-L6-v2 truncates input at 256 word pieces; stay safely below that
+CHUNK_TOKENS = 200
+OVERLAP_TOKENS = 20
+MIN_CHUNK_TOKENS = 16
+
+# Numbered headings such as "4. Guest Value & Loyalty Segmentation" or "5.1 Low-Risk Guests"
+_HEADING_PATTERN = re.compile(
+    r"(?<!\S)(\d{1,2})\.(\d{1,2})?\.?\s+"
+    r"([A-Z][\w&/-]*(?:\s+(?:[A-Z&/][\w&/-]*|of|and|for|to|the)){0,6})"
+)
+# Sentence ends, bullet markers and blank lines start a new unit
+_UNIT_SPLIT = re.compile(r"(?<=[.!?:])\s+(?=[A-Z0-9●○•])|\s*(?=[●○•])|\n\s*\n")
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+_token_counter = None
+_counter_lock = threading.Lock()
+
+def _approx_count(text):
+    return len(_APPROX_TOKEN.findall(text))
+
+def get_token_counter():
+    """
+    Returns count(text) -> number of embedding-model tokens.
+    Uses the model's own tokenizer when it is available locally (the embedder downloads
+    it), otherwise a word/punctuation estimate.
+    """
+    global _token_counter
+    if _token_counter is None:
+        with _counter_lock:
+            if _token_counter is None:
+                try:
+                    from transformers import AutoTokenizer
+                    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, local_files_only=True)
+                    _token_counter = lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+                except Exception as e:
+                    print(f"⚠️ Tokenizer for {MODEL_NAME} not available ({type(e).__name__}); estimating token counts")
+                    _token_counter = _approx_count
+    return _token_counter
+
+def clean_pdf_text(text):
+    """
+    Normalizes extracted page text to paragraphs separated by blank lines.
+    Some PDFs (like the retention policy) come out one word per line ("word\n \nword")
+    with an extra blank line between paragraphs; those are joined back into prose.
+    """
+    lines = text.split("\n")
+    one_word = sum(1 for line in lines if len(line.split()) <= 1)
+    if lines and one_word / len(lines) > 0.8:
+        paragraphs = re.split(r"\n[ \t]*\n[ \t]*\n", text)
+    else:
+        paragraphs = re.split(r"\n[ \t]*\n", text)
+    paragraphs = (re.sub(r" ([.,;:!?)])", r"\1", " ".join(p.split())) for p in paragraphs)
+    return "\n\n".join(p for p in paragraphs if p)
+
+class _SectionTracker:
+    """Follows numbered headings through a document ("1." ... "6.2") and rejects list items."""
+
+    def __init__(self):
+        self.source = None
+        self.chapter = None      # (number, title)
+        self.section = None      # (number, title)
+
+    def reset(self, source):
+        self.source = source
+        self.chapter = None
+        self.section = None
+
+    def accept(self, match, following=""):
+        top, sub, title = int(match.group(1)), match.group(2), match.group(3).strip()
+        # "Objective: ..." / "Every retention ..." start the body, not the title
+        words = title.split()
+        if len(words) > 1 and (following.startswith(":") or following[1:2].islower()):
+            title = " ".join(words[:-1])
+        current = self.chapter[0] if self.chapter else 0
+        if sub is None and top == current + 1:
+            self.chapter = (top, f"{top}. {title}")
+            self.section = None
+            return True
+        if sub is not None and top == current:
+            self.section = (int(sub), f"{top}.{sub} {title}")
+            return True
+        return False
+
+    @property
+    def heading(self):
+        if self.section:
+            return self.section[1]
+        return self.chapter[1] if self.chapter else ""
+
+    @property
+    def path(self):
+        return " > ".join(h[1] for h in (self.chapter, self.section) if h)
+
+def _sections(text, tracker):
+    """Splits page text at accepted headings. Yields (heading, heading_path, body)."""
+    start = 0
+    heading, path = tracker.heading, tracker.path
+    for match in _HEADING_PATTERN.finditer(text):
+        if not tracker.accept(match, text[match.end():match.end() + 2]):
+            continue
+        body = text[start:match.start()].strip()
+        if body:
+            yield heading, path, body
+        heading, path = tracker.heading, tracker.path
+        start = match.start()
+    body = text[start:].strip()
+    if body:
+        yield heading, path, body
+
+def _units(body, count, chunk_tokens):
+    """Sentences / bullet items, with anything longer than a chunk cut at word boundaries."""
+    for unit in _UNIT_SPLIT.split(body):
+        unit = unit.strip()
+        if not unit:
+            continue
+        tokens = count(unit)
+        if tokens <= chunk_tokens:
+            yield unit, tokens
+            continue
+        words, part = unit.split(), []
+        for word in words:
+            part.append(word)
+            if count(" ".join(part)) >= chunk_tokens:
+                piece = " ".join(part[:-1]) if len(part) > 1 else part[0]
+                yield piece, count(piece)
+                part = part[-1:] if len(part) > 1 else []
+        if part:
+            piece = " ".join(part)
+            yield piece, count(piece)
+
+def iter_chunks(pages, chunk_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS,
+                min_tokens=MIN_CHUNK_TOKENS, count_tokens=None):
+    """
+    Streams chunks from a stream of page Documents (e.g. src.rag.loader.iter_policy_pages).
+    Each chunk has at most `chunk_tokens` tokens and stays within one section (a section
+    may continue across pages); consecutive chunks of a section overlap by up to
+    `overlap_tokens`. A section shorter than `min_tokens` (e.g. a bare heading) is merged
+    into the next one. Chunks carry the metadata of the page they start on plus
+    `section`, `section_path` and `tokens`.
+    """
+    count = count_tokens or get_token_counter()
+    tracker = _SectionTracker()
+
+    window, used, pending = [], 0, False     # window: [(unit, tokens, page_metadata)]
+    current = None                           # (source, section_path) being filled
+    heading = path = ""
+
+    def chunk():
+        return Document(
+            page_content=" ".join(u for u, _, _ in window),
+            metadata={**window[0][2], "section": heading, "section_path": path, "tokens": used},
+        )
+
+    for page in pages:
+        source = page.metadata.get("source")
+        if source != tracker.source:
+            tracker.reset(source)
+
+        for section_heading, section_path, body in _sections(clean_pdf_text(page.page_content), tracker):
+            if (source, section_path) != current:
+                new_source = current is None or source != current[0]
+                if pending and (used >= min_tokens or new_source):
+                    yield chunk()
+                    window, used, pending = [], 0, False
+                elif not pending:
+                    window, used = [], 0
+                current = (source, section_path)
+                heading, path = section_heading, section_path
+
+            for unit, tokens in _units(body, count, chunk_tokens):
+                if pending and used + tokens > chunk_tokens:
+                    yield chunk()
+                    # Carry the tail of this chunk into the next one
+                    carry, carried = [], 0
+                    for item in reversed(window):
+                        if carried + item[1] > min(overlap_tokens, chunk_tokens - tokens):
+                            break
+                        carry.insert(0, item)
+                        carried += item[1]
+                    window, used, pending = carry, carried, False
+                window.append((unit, tokens, page.metadata))
+                used += tokens
+                pending = True
+
+    if pending:
+        yield chunk()
+
+_splitters = {}
+
 def split_documents(docs, chunk_size=500, chunk_overlap=50):
     """
-    Splits a list of documents into smaller chunks.
+    Splits a list of documents into smaller chunks (character-based).
+    Indexing uses iter_chunks; this is kept for callers that want the old behaviour.
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", ".", " ", ""]
-    )
-    return text_splitter.split_documents(docs)
\ No newline at end of file
+    key = (chunk_size, chunk_overlap)
+    text_splitter = _splitters.get(key)
+    if text_splitter is None:
+        text_splitter = _splitters[key] = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=["\n\n", "\n", ".", " ", ""]
+        )
+    return text_splitter.split_documents(docs)
@@ -2,13 +2,34 @@
 
 # : The "Translator". It initializes the embedding model once so we don't load it multiple times.
 
+import threading
+import time
 from langchain_huggingface import HuggingFaceEmbeddings
+from src.agents.tracing import span
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+_embeddings = None
+_load_seconds = None
+_lock = threading.Lock()
 
 def get_embedding_model():
     """
     Returns the HuggingFace embedding model.
     Using 'all-MiniLM-L6-v2' for fast, free, local embeddings.
+    The weights are loaded once per process; later calls return the same instance.
     """
-    model_name = "sentence-transformers/all-MiniLM-L6-v2"
-    embeddings = HuggingFaceEmbeddings(model_name=model_name)
-    return embeddings
\ No newline at end of file
+    global _embeddings, _load_seconds
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                start = time.perf_counter()
+                with span(MODEL_NAME, "model_load"):
+                    _embeddings = HuggingFaceEmbeddings(model_name=MODEL_NAME)
+                _load_seconds = time.perf_counter() - start
+                print(f"✅ Loaded embedding model {MODEL_NAME} in {_load_seconds:.2f}s")
+    return _embeddings
+
+def get_embedding_load_seconds():
+    """Seconds spent loading the embedding model (None if not loaded yet)."""
+    return _load_seconds
@@ -0,0 +1,145 @@
+# Hybrid (BM25 + vector) retrieval for the policy tool
+
+# Dense similarity alone misses exact policy terms ("Presidential", "20%"). A BM25
+# inverted index, precomputed next to the vector index by src/rag/store.py, catches
+# those; the two rankings are merged with reciprocal rank fusion (RRF), duplicates are
+# dropped, and chunks are returned until a token budget is used up.
+
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+from langchain_core.documents import Document
+
+# Subdirectory of a vectorstore version that holds the BM25 index (see src/rag/store.py)
+INDEX_DIR = "bm25_index"
+INDEX_FILE = "bm25.json"
+
+RRF_K = 60                 # standard RRF damping constant
+DEFAULT_TOKEN_BUDGET = 600
+CHARS_PER_TOKEN = 4        # rough estimate for English prose
+
+# Numbers keep their decimals / percent sign so "20%" and "1.5" stay single terms
+_TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)?%?|[a-z]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its of on or "
+    "our should the their this to we what when which who will with you your".split()
+)
+
+def tokenize(text):
+    """Lowercase terms for BM25 (stopwords dropped)."""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+
+def estimate_tokens(text):
+    """Cheap LLM token estimate used for the context budget."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def _content_key(doc):
+    return " ".join(doc.page_content.split()).lower()
+
+class BM25Index:
+    """Okapi BM25 over policy chunks, stored as a JSON inverted index."""
+
+    def __init__(self, ids, texts, metadatas, postings, doc_lengths, k1=1.5, b=0.75):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.postings = postings          # term -> [[doc_index, term_frequency], ...]
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+
+    @classmethod
+    def build(cls, ids, texts, metadatas=None, k1=1.5, b=0.75):
+        postings = defaultdict(list)
+        doc_lengths = []
+        for i, text in enumerate(texts):
+            terms = tokenize(text)
+            doc_lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                postings[term].append([i, tf])
+        metadatas = [m or {} for m in metadatas] if metadatas is not None else [{} for _ in texts]
+        return cls(list(ids), list(texts), metadatas, dict(postings), doc_lengths, k1=k1, b=b)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": self.ids, "texts": self.texts, "metadatas": self.metadatas,
+                "postings": self.postings, "doc_lengths": self.doc_lengths,
+                "k1": self.k1, "b": self.b,
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        index_path = os.path.join(path, INDEX_FILE)
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"❌ BM25 index not found at {path}. Run src/rag/store.py first.")
+        with open(index_path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["ids"], data["texts"], data["metadatas"], data["postings"],
+                   data["doc_lengths"], k1=data["k1"], b=data["b"])
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, INDEX_FILE))
+
+    def search(self, query, k=10):
+        """Returns up to k (Document, score) pairs, best first."""
+        n = len(self.ids)
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[i] / self.avg_length)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [
+            (Document(id=self.ids[i], page_content=self.texts[i], metadata=dict(self.metadatas[i])), score)
+            for i, score in best
+        ]
+
+def reciprocal_rank_fusion(rankings, rrf_k=RRF_K):
+    """
+    Merges ranked Document lists: score = sum(1 / (rrf_k + rank)).
+    Chunks with the same (whitespace-normalized) text count as one.
+    Returns: list of Documents, best first.
+    """
+    scores = defaultdict(float)
+    docs = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = _content_key(doc)
+            scores[key] += 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+def apply_token_budget(docs, k, token_budget=DEFAULT_TOKEN_BUDGET):
+    """First k docs that fit in token_budget (the best doc is always kept)."""
+    selected = []
+    used = 0
+    for doc in docs:
+        if len(selected) >= k:
+            break
+        cost = estimate_tokens(doc.page_content)
+        if selected and used + cost > token_budget:
+            continue
+        selected.append(doc)
+        used += cost
+    return selected
+
+def hybrid_search(query, dense_docs, bm25_index, k=3, token_budget=DEFAULT_TOKEN_BUDGET, candidates=20):
+    """
+    Fuses a dense ranking (already retrieved) with BM25 for the same query.
+    Returns: deduplicated Documents, at most k and within token_budget.
+    """
+    sparse_docs = [doc for doc, _ in bm25_index.search(query, k=candidates)]
+    fused = reciprocal_rank_fusion([dense_docs, sparse_docs])
+    return apply_token_budget(fused, k, token_budget)
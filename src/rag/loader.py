@@ -1,15 +1,152 @@
 # Document loading logic
-from langchain_community.document_loaders import PyPDFLoader
+
+# Pages are extracted with pypdf (in parallel for large PDFs) and cached on disk by
+# file hash + page number, so re-indexing an unchanged PDF never parses it again.
+# `iter_policy_pages` yields pages lazily, in page order.
+
+import hashlib
+import json
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
 
-def load_policy_docs(pdf_path):
+from langchain_core.documents import Document
+
+from src.utils.sqlite_pool import get_pool
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PAGE_CACHE_PATH = os.path.join(BASE_DIR, "data", "page_cache.db")
+
+# Below this many pages, extracting in this process beats starting workers
+PARALLEL_MIN_PAGES = 32
+PAGES_PER_TASK = 8
+
+_cache_ready = set()
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _page_cache(cache_path):
+    pool = get_pool(cache_path)
+    if pool.path not in _cache_ready:
+        os.makedirs(os.path.dirname(pool.path), exist_ok=True)
+        with pool.writer() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pdf_files (
+                    file_hash TEXT PRIMARY KEY,
+                    total_pages INTEGER NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS parsed_pages (
+                    file_hash TEXT NOT NULL,
+                    page INTEGER NOT NULL,
+                    page_label TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (file_hash, page)
+                )
+            """)
+        _cache_ready.add(pool.path)
+    return pool
+
+def _pdf_metadata(reader):
+    """Document-level metadata, named the way PyPDFLoader names it."""
+    metadata = {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""}
+    for key, value in (reader.metadata or {}).items():
+        metadata[key.lstrip("/").lower()] = str(value)
+    metadata["total_pages"] = len(reader.pages)
+    return metadata
+
+def _extract_pages(pdf_path, page_numbers):
+    """Worker: extracts the text of some pages. Returns [(page, page_label, text)]."""
+    from pypdf import PdfReader
+    reader = PdfReader(pdf_path)
+    return [
+        (i, reader.page_labels[i], reader.pages[i].extract_text(extraction_mode="plain").strip())
+        for i in page_numbers
+    ]
+
+def _parse_pages(pdf_path, workers):
+    """Yields (page, page_label, text) in page order and the file metadata first."""
+    from pypdf import PdfReader
+    reader = PdfReader(pdf_path)
+    yield _pdf_metadata(reader)
+
+    total = len(reader.pages)
+    if workers <= 1 or total < PARALLEL_MIN_PAGES:
+        for i in range(total):
+            yield i, reader.page_labels[i], reader.pages[i].extract_text(extraction_mode="plain").strip()
+        return
+
+    ranges = [range(start, min(start + PAGES_PER_TASK, total)) for start in range(0, total, PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # map() returns results in submission order, so pages still come out in order
+        for pages in pool.map(_extract_pages, [pdf_path] * len(ranges), ranges):
+            yield from pages
+
+def iter_policy_pages(pdf_path, workers=None, cache_path=PAGE_CACHE_PATH):
     """
-    Loads the PDF policy document.
+    Yields one Document per PDF page, lazily and in page order.
+    Pages come from the parsed-page cache when this exact file (by hash) was seen before;
+    otherwise the PDF is parsed (across `workers` processes for large files) and cached.
+    Pass cache_path=None to disable the cache.
     """
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"❌ Policy file not found: {pdf_path}")
-        
-    loader = PyPDFLoader(pdf_path)
-    docs = loader.load()
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    file_hash = file_sha256(pdf_path) if cache_path else None
+    cache = _page_cache(cache_path) if cache_path else None
+
+    if cache:
+        with cache.reader() as conn:
+            row = conn.execute(
+                "SELECT total_pages, metadata FROM pdf_files WHERE file_hash = ?", (file_hash,)
+            ).fetchone()
+            cached = conn.execute(
+                "SELECT page, page_label, text FROM parsed_pages WHERE file_hash = ? ORDER BY page",
+                (file_hash,),
+            ).fetchall() if row else []
+        if row and len(cached) == row[0]:
+            metadata = json.loads(row[1])
+            for page, page_label, text in cached:
+                yield Document(
+                    page_content=text,
+                    metadata={**metadata, "source": pdf_path, "page": page, "page_label": page_label},
+                )
+            return
+
+    parsed = _parse_pages(pdf_path, workers)
+    metadata = next(parsed)
+    pages = []
+    for page, page_label, text in parsed:
+        pages.append((file_hash, page, page_label, text))
+        yield Document(
+            page_content=text,
+            metadata={**metadata, "source": pdf_path, "page": page, "page_label": page_label},
+        )
+
+    if cache:
+        with cache.writer() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pdf_files (file_hash, total_pages, metadata) VALUES (?, ?, ?)",
+                (file_hash, metadata["total_pages"], json.dumps(metadata)),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO parsed_pages (file_hash, page, page_label, text) VALUES (?, ?, ?, ?)",
+                pages,
+            )
+
+def load_policy_docs(pdf_path):
+    """
+    Loads the PDF policy document.
+    """
+    docs = list(iter_policy_pages(pdf_path))
     print(f"✅ Loaded {len(docs)} pages from {pdf_path}")
-    return docs
\ No newline at end of file
+    return docs
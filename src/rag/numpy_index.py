@@ -0,0 +1,135 @@
+# Exact in-process vector index (alternative to Chroma)
+
+# Embeddings live in a memory-mapped float32 matrix (vectors.npy, rows unit-normalized)
+# with ids / texts / metadata in docs.json next to it. A top-k query is a single
+# matrix-vector dot product, with no client, server or SQLite round trips.
+# It is a LangChain VectorStore, so `as_retriever()` works the same as with Chroma.
+
+import json
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+# Subdirectory of a vectorstore version that holds this index (see src/rag/store.py)
+INDEX_DIR = "numpy_index"
+VECTORS_FILE = "vectors.npy"
+DOCS_FILE = "docs.json"
+
+def _unit_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class NumpyVectorIndex(VectorStore):
+    """
+    Read-mostly exact cosine index.
+    Build it with `from_texts` / `from_embeddings` and `save`, open it with `load`.
+    """
+
+    def __init__(self, embedding, vectors, ids, texts, metadatas, path=None):
+        self.embedding = embedding
+        self.path = path
+        self._vectors = vectors
+        self._ids = list(ids)
+        self._texts = list(texts)
+        self._metadatas = [m or {} for m in metadatas]
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    def __len__(self):
+        return len(self._ids)
+
+    # ───────────────────────────────────────────
+    # Build / persist
+    # ───────────────────────────────────────────
+    @classmethod
+    def from_embeddings(cls, embedding, vectors, texts, metadatas=None, ids=None, path=None):
+        """Wraps precomputed vectors (e.g. exported from Chroma); saves to `path` if given."""
+        texts = list(texts)
+        if texts:
+            vectors = _unit_rows(vectors).reshape(len(texts), -1)
+        else:
+            vectors = np.zeros((0, 1), dtype=np.float32)
+        index = cls(
+            embedding,
+            vectors,
+            ids if ids is not None else [str(i) for i in range(len(texts))],
+            texts,
+            metadatas if metadatas is not None else [{} for _ in texts],
+        )
+        if path:
+            index.save(path)
+        return index
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, *, ids=None, path=None, **kwargs):
+        texts = list(texts)
+        vectors = embedding.embed_documents(texts) if texts else []
+        return cls.from_embeddings(embedding, vectors, texts, metadatas=metadatas, ids=ids, path=path)
+
+    def save(self, path):
+        """Writes vectors.npy + docs.json into `path` (a directory)."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, VECTORS_FILE), np.ascontiguousarray(self._vectors, dtype=np.float32))
+        with open(os.path.join(path, DOCS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids, "texts": self._texts, "metadatas": self._metadatas}, f)
+        self.path = path
+
+    @classmethod
+    def load(cls, path, embedding):
+        """Opens a saved index; the vectors are memory-mapped, not read into memory."""
+        vectors_path = os.path.join(path, VECTORS_FILE)
+        if not os.path.exists(vectors_path):
+            raise FileNotFoundError(f"❌ Vector index not found at {path}. Run src/rag/store.py first.")
+        vectors = np.load(vectors_path, mmap_mode="r")
+        with open(os.path.join(path, DOCS_FILE), encoding="utf-8") as f:
+            docs = json.load(f)
+        return cls(embedding, vectors, docs["ids"], docs["texts"], docs["metadatas"], path=path)
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, VECTORS_FILE)) and os.path.exists(os.path.join(path, DOCS_FILE))
+
+    # ───────────────────────────────────────────
+    # Search
+    # ───────────────────────────────────────────
+    def _top_k(self, vector, k):
+        if not self._ids or k <= 0:
+            return [], np.empty(0, dtype=np.float32)
+        scores = self._vectors @ _unit_rows(vector)
+        k = min(k, len(scores))
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+        return top, scores[top]
+
+    def _document(self, i):
+        return Document(id=self._ids[i], page_content=self._texts[i], metadata=dict(self._metadatas[i]))
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4):
+        top, scores = self._top_k(embedding, k)
+        return [(self._document(i), float(score)) for i, score in zip(top, scores)]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k=k)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k=k)
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities in [-1, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    def get_by_ids(self, ids):
+        positions = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        return [self._document(positions[doc_id]) for doc_id in ids if doc_id in positions]
@@ -0,0 +1,333 @@
+# Precomputed policy rule table
+
+# Almost every policy question the agent asks boils down to a few numbers: how much
+# discount, which upgrades, how many loyalty points, and when a manager must approve.
+# `build_policy_rules` extracts those limits from the retention policy PDF once (offline)
+# into an indexed SQLite table, one row per (risk level, value tier). `lookup_policy_limits`
+# then answers from memory; the RAG search stays available for everything else.
+#
+# Build: python -m src.rag.policy_rules
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from src.rag.chunker import clean_pdf_text
+from src.rag.loader import iter_policy_pages
+from src.utils.sqlite_pool import get_pool
+from src.ml.risk import risk_level_from_score
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PDF_PATH = os.path.join(BASE_DIR, "data", "policy", "Company_Retention_Policy_2026.pdf")
+RULES_DB_PATH = os.path.join(BASE_DIR, "data", "policy_rules.db")
+
+RISK_LEVELS = ("LOW", "MEDIUM", "HIGH")
+VALUE_TIERS = ("BRONZE", "SILVER", "GOLD", "PLATINUM")
+
+# A risk_score is classified with get_customer_risk_score's bands (HIGH / LOW); MEDIUM
+# rules are only used when a caller asks for MEDIUM explicitly. Value tiers are defined
+# qualitatively (section 4.1), so the caller has to choose one - there is no stays cut-off.
+
+_TIER_ALIASES = {"CORPORATE": "PLATINUM", "VIP": "PLATINUM", "PLATINUM / CORPORATE": "PLATINUM"}
+
+class PolicyExtractionError(ValueError):
+    """The policy text no longer contains a rule the table depends on."""
+
+def _find(pattern, text, section, cast=str):
+    match = re.search(pattern, text, flags=re.IGNORECASE)
+    if not match:
+        raise PolicyExtractionError(f"❌ Rule not found in section {section}: /{pattern}/")
+    values = [cast(g.replace(",", "")) if cast is not str else g for g in match.groups()]
+    return values[0] if len(values) == 1 else values
+
+def _section(text, start, end=None):
+    """Text from heading `start` (e.g. "5.1") up to heading `end`."""
+    begin = re.search(rf"(?<!\S){re.escape(start)}\s", text)
+    if not begin:
+        raise PolicyExtractionError(f"❌ Section {start} not found in policy")
+    if end is None:
+        return text[begin.start():]
+    finish = re.search(rf"(?<!\S){re.escape(end)}\s", text[begin.end():])
+    return text[begin.start():begin.end() + finish.start()] if finish else text[begin.start():]
+
+def extract_policy_rules(pdf_path=PDF_PATH):
+    """
+    Parses the policy PDF into rule rows.
+    Returns: (document_info, rows, approval_thresholds)
+    Raises PolicyExtractionError if a rule the table needs is missing from the text.
+    """
+    text = "\n\n".join(clean_pdf_text(page.page_content) for page in iter_policy_pages(pdf_path))
+
+    document = {
+        "document_id": _find(r"Document ID:\s*(\S+)", text, "header"),
+        "version": _find(r"Version:\s*([\d.]+)", text, "header"),
+    }
+
+    tier_text = _section(text, "4.1", "5.")
+    document["tier_definitions"] = json.dumps({
+        "BRONZE": _find(r"Bronze\s+(.+?)\s+Silver", tier_text, "4.1"),
+        "SILVER": _find(r"Silver\s+(.+?)\s+Gold", tier_text, "4.1"),
+        "GOLD": _find(r"Gold\s+(.+?)\s+Platinum", tier_text, "4.1"),
+        "PLATINUM": _find(r"Platinum / Corporate\s+(.+?)\s*$", tier_text.strip(), "4.1"),
+    })
+
+    low = _section(text, "5.1", "5.2")
+    medium = _section(text, "5.2", "5.3")
+    high = _section(text, "5.3", "5.3.1")
+    tiers = _section(text, "5.3.1", "6.")
+    approvals = _section(text, "6.1", "6.2")
+
+    # 6.1 Offers requiring manager approval (apply at every risk level)
+    approval_thresholds = [
+        {"rule": "discount_pct", "threshold": _find(r"Discounts exceeding (\d+)%", approvals, "6.1", float),
+         "description": "Discounts above this percentage need written manager approval"},
+        {"rule": "cash_credit_usd", "threshold": _find(r"Cash-equivalent credits exceeding USD ([\d,]+)", approvals, "6.1", float),
+         "description": "Cash-equivalent credits above this amount need approval"},
+        {"rule": "package_value_usd", "threshold": _find(r"package valued over USD ([\d,]+)", approvals, "6.1", float),
+         "description": "Any retention package valued above this amount needs approval"},
+    ]
+    always_approval = [
+        item for item, pattern in (
+            ("Complimentary free night", r"Complimentary free night"),
+            ("Multi-night vouchers", r"Multi-night vouchers"),
+            ("Executive / Presidential suite upgrades", r"Executive / Presidential suite upgrades"),
+        ) if re.search(pattern, approvals, flags=re.IGNORECASE)
+    ]
+    approval_pct = approval_thresholds[0]["threshold"]
+
+    low_points = _find(r"([\d,]+)\s*[–-]\s*([\d,]+) loyalty points", low, "5.1", int)
+    medium_points = _find(r"([\d,]+)\s*[–-]\s*([\d,]+) loyalty points", medium, "5.2", int)
+    high_points = _find(r"([\d,]+)\s*[–-]\s*([\d,]+) loyalty points", high, "5.3", int)
+
+    base = {
+        "LOW": {
+            "max_room_discount_pct": 0.0,
+            "max_service_discount_pct": 0.0,
+            "future_stay_voucher_pct": _find(r"(\d+)% discount voucher", low, "5.1", float),
+            "max_amenity_value_usd": _find(r"Maximum value: USD ([\d,]+)", low, "5.1", float),
+            "loyalty_points": low_points,
+            "upgrade": "Not allowed (no upgrades promised in advance)",
+            "system_approved": True,
+            "source_section": "5.1",
+        },
+        "MEDIUM": {
+            "max_room_discount_pct": 0.0,
+            "max_service_discount_pct": _find(r"(\d+)% discount on spa", medium, "5.2", float),
+            "future_stay_voucher_pct": 0.0,
+            "max_amenity_value_usd": None,
+            "loyalty_points": medium_points,
+            "upgrade": "Complimentary room upgrade, subject to availability",
+            "system_approved": bool(re.search(r"No approval required", medium, flags=re.IGNORECASE)),
+            "source_section": "5.2",
+        },
+        "HIGH": {
+            "max_room_discount_pct": _find(r"Room rate discount up to (\d+)%", high, "5.3", float),
+            "max_service_discount_pct": 0.0,
+            "future_stay_voucher_pct": 0.0,
+            "max_amenity_value_usd": _find(r"Value cap: USD ([\d,]+)", high, "5.3", float),
+            "loyalty_points": high_points,
+            "upgrade": "Not in the standard high-risk actions (see tier extras)",
+            "system_approved": True,
+            "source_section": "5.3",
+        },
+    }
+
+    # 5.3.1 Loyalty tier enhancements (high-risk guests only)
+    tier_bonus = {
+        "BRONZE": (0.0, None),
+        "SILVER": (_find(r"Silver \+(\d+)% discount cap", tiers, "5.3.1", float), "Priority upgrades"),
+        "GOLD": (_find(r"Gold \+(\d+)% discount cap", tiers, "5.3.1", float), "Airport transfer"),
+        "PLATINUM": (0.0, "Custom offers allowed with approval"),
+    }
+    custom_with_approval = bool(re.search(r"Platinum / Corporate\s+Custom offers allowed with approval", tiers))
+
+    rows = []
+    for risk in RISK_LEVELS:
+        for tier in VALUE_TIERS:
+            limits = dict(base[risk])
+            extras = []
+            if risk == "HIGH":
+                bonus_pct, extra = tier_bonus[tier]
+                limits["max_room_discount_pct"] += bonus_pct
+                if extra:
+                    extras.append(extra)
+                if tier != "BRONZE":
+                    limits["source_section"] = "5.3 + 5.3.1"
+            limits["points_min"], limits["points_max"] = limits.pop("loyalty_points")
+            limits["extras"] = extras
+            limits["needs_approval_above_discount_pct"] = approval_pct
+            # 6.1: the cap itself is only reachable with manager approval when it is above
+            # the approval threshold (e.g. HIGH / GOLD: 25% > 20%)
+            limits["requires_approval"] = limits["max_room_discount_pct"] > approval_pct or (
+                risk == "HIGH" and tier == "PLATINUM" and custom_with_approval)
+            limits["max_discount_without_approval_pct"] = min(limits["max_room_discount_pct"], approval_pct)
+            limits["system_approved"] = limits["system_approved"] and not limits["requires_approval"]
+            limits["always_needs_approval"] = always_approval
+            rows.append({"risk_level": risk, "tier": tier, **limits})
+
+    return document, rows, approval_thresholds
+
+def _create_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS policy_rules (
+            risk_level TEXT NOT NULL,
+            tier TEXT NOT NULL,
+            max_room_discount_pct REAL NOT NULL,
+            max_service_discount_pct REAL NOT NULL,
+            future_stay_voucher_pct REAL NOT NULL,
+            max_amenity_value_usd REAL,
+            points_min INTEGER NOT NULL,
+            points_max INTEGER NOT NULL,
+            upgrade TEXT NOT NULL,
+            system_approved INTEGER NOT NULL,
+            details TEXT NOT NULL,
+            source_section TEXT NOT NULL,
+            PRIMARY KEY (risk_level, tier)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS approval_thresholds (
+            rule TEXT PRIMARY KEY,
+            threshold REAL NOT NULL,
+            description TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS policy_document (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+def build_policy_rules(pdf_path=PDF_PATH, db_path=RULES_DB_PATH):
+    """Extracts the rules and replaces the rule table in one transaction."""
+    start = time.perf_counter()
+    document, rows, approval_thresholds = extract_policy_rules(pdf_path)
+    with open(pdf_path, "rb") as f:
+        document["pdf_sha256"] = hashlib.sha256(f.read()).hexdigest()
+    document["built_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    with get_pool(db_path).writer() as conn:
+        _create_tables(conn)
+        conn.execute("DELETE FROM policy_rules")
+        conn.execute("DELETE FROM approval_thresholds")
+        conn.execute("DELETE FROM policy_document")
+        conn.executemany(
+            "INSERT INTO policy_rules VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    r["risk_level"], r["tier"], r["max_room_discount_pct"], r["max_service_discount_pct"],
+                    r["future_stay_voucher_pct"], r["max_amenity_value_usd"], r["points_min"], r["points_max"],
+                    r["upgrade"], int(r["system_approved"]),
+                    json.dumps({
+                        "extras": r["extras"],
+                        "needs_approval_above_discount_pct": r["needs_approval_above_discount_pct"],
+                        "requires_approval": r["requires_approval"],
+                        "max_discount_without_approval_pct": r["max_discount_without_approval_pct"],
+                        "always_needs_approval": r["always_needs_approval"],
+                    }),
+                    r["source_section"],
+                )
+                for r in rows
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO approval_thresholds VALUES (:rule, :threshold, :description)", approval_thresholds
+        )
+        conn.executemany("INSERT INTO policy_document VALUES (?, ?)", list(document.items()))
+
+    policy_rulebook.reload()
+    print(f"✅ Extracted {len(rows)} policy rules from {document['document_id']} v{document['version']}"
+          f" in {time.perf_counter() - start:.2f}s -> {db_path}")
+    return rows
+
+# ───────────────────────────────────────────────
+# Lookup
+# ───────────────────────────────────────────────
+def normalize_risk_level(risk_level):
+    level = str(risk_level).strip().upper().replace("RISK", "").replace("-", "").strip()
+    if level not in RISK_LEVELS:
+        raise ValueError(f"Unknown risk level: {risk_level!r} (expected one of {', '.join(RISK_LEVELS)})")
+    return level
+
+def normalize_tier(tier):
+    name = " ".join(str(tier).strip().upper().split())
+    name = _TIER_ALIASES.get(name, name)
+    if name not in VALUE_TIERS:
+        raise ValueError(f"Unknown value tier: {tier!r} (expected one of {', '.join(VALUE_TIERS)})")
+    return name
+
+class PolicyRuleBook:
+    """The whole rule table, held in memory as ready-to-return dicts (read once per process)."""
+
+    def __init__(self, db_path=RULES_DB_PATH):
+        self.db_path = db_path
+        self._rules = None
+        self._tier_definitions = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(
+                f"❌ Policy rule table not found at {self.db_path}. Run python -m src.rag.policy_rules first."
+            )
+        with get_pool(self.db_path).reader() as conn:
+            document = dict(conn.execute("SELECT key, value FROM policy_document").fetchall())
+            self._tier_definitions = json.loads(document.get("tier_definitions", "{}"))
+            rules = {}
+            cursor = conn.execute("SELECT * FROM policy_rules")
+            columns = [d[0] for d in cursor.description]
+            for row in cursor.fetchall():
+                rule = dict(zip(columns, row))
+                rule.update(json.loads(rule.pop("details")))
+                rule["system_approved"] = bool(rule["system_approved"])
+                rule["policy"] = f"{document.get('document_id', '')} v{document.get('version', '')}".strip()
+                rules[(rule["risk_level"], rule["tier"])] = rule
+        return rules
+
+    @property
+    def rules(self):
+        if self._rules is None:
+            with self._lock:
+                if self._rules is None:
+                    self._rules = self._load()
+        return self._rules
+
+    @property
+    def tier_definitions(self):
+        """{tier: definition} from section 4.1 of the policy."""
+        self.rules
+        return self._tier_definitions
+
+    def lookup(self, risk_level, tier):
+        """Limits for one (risk level, tier). The returned dict is shared: do not modify it."""
+        return self.rules[(normalize_risk_level(risk_level), normalize_tier(tier))]
+
+    def reload(self):
+        with self._lock:
+            self._rules = None
+            self._tier_definitions = None
+
+# Shared by every caller in the process
+policy_rulebook = PolicyRuleBook()
+
+def lookup_policy_limits(risk_level=None, tier=None, risk_score=None):
+    """
+    Applicable policy limits for a guest.
+    risk_level: LOW / MEDIUM / HIGH (or pass risk_score, 0-1, classified like get_customer_risk_score)
+    tier: BRONZE / SILVER / GOLD / PLATINUM (required; see section 4.1 for the definitions)
+    """
+    if risk_level is None:
+        if risk_score is None:
+            raise ValueError("Either risk_level or risk_score is required.")
+        risk_level = risk_level_from_score(risk_score)
+    if tier is None:
+        definitions = "; ".join(f"{name}: {text}" for name, text in policy_rulebook.tier_definitions.items())
+        raise ValueError(f"A value tier is required (the policy does not derive it from stays). {definitions}")
+    return policy_rulebook.lookup(risk_level, tier)
+
+if __name__ == "__main__":
+    build_policy_rules()
+    for rule in policy_rulebook.rules.values():
+        print(f"  {rule['risk_level']:<6} {rule['tier']:<8} room discount <= {rule['max_room_discount_pct']:.0f}%"
+              f"{' (approval)' if rule['requires_approval'] else '':<11}"
+              f"  points {rule['points_min']}-{rule['points_max']}  [{rule['source_section']}]")
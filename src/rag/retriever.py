@@ -1,25 +1,214 @@
 # Retrieval logic
 
 import os
+import threading
+import time
+from collections import deque
 from langchain_community.vectorstores import Chroma
-from src.rag.embedder import get_embedding_model
+from src.rag.numpy_index import INDEX_DIR, NumpyVectorIndex
+from src.rag.hybrid import INDEX_DIR as BM25_INDEX_DIR, BM25Index, DEFAULT_TOKEN_BUDGET, hybrid_search
+from src.rag.cache import CachedEmbeddings, SemanticCache, DEFAULT_SEMANTIC_THRESHOLD
+from src.rag.embedder import MODEL_NAME, get_embedding_model, get_embedding_load_seconds
+from src.agents.tracing import span
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DB_PATH = os.path.join(BASE_DIR, "vectorstore", "chroma_db")
 
+# Optional on-disk query embedding cache (e.g. data/query_embeddings.db); memory-only if unset
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH") or None
+# "chroma" or "numpy" (in-process exact index exported by src/rag/store.py)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+# "hybrid" (BM25 + vector, fused with RRF) or "dense" (vector only) for the policy tool
+RETRIEVAL_MODE = os.getenv("POLICY_RETRIEVAL", "hybrid").lower()
+POLICY_TOKEN_BUDGET = int(os.getenv("POLICY_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+# Cosine similarity above which a cached policy answer is reused for a new query
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("POLICY_CACHE_THRESHOLD", DEFAULT_SEMANTIC_THRESHOLD))
+
+class RetrieverService:
+    """
+    Process-wide retrieval service.
+    Loads the embedding model and opens the vectorstore once, then serves
+    concurrent `invoke` calls from any thread.
+    """
+
+    def __init__(self, db_path=DB_PATH, default_k=2, latency_window=1000, backend=VECTOR_BACKEND):
+        if backend not in ("chroma", "numpy"):
+            raise ValueError(f"Unknown vector backend: {backend!r} (expected 'chroma' or 'numpy')")
+        self.db_path = db_path
+        self.backend = backend
+        self.default_k = default_k
+
+        self._lock = threading.Lock()
+        self._embeddings = None
+        self._vectorstore = None
+        self._bm25 = None
+        self._version_path = None     # the version directory the open indexes belong to
+        self._load_seconds = None
+
+        self._queries = 0
+        self._errors = 0
+        self._total_query_seconds = 0.0
+        self._latencies = deque(maxlen=latency_window)
+
+    @property
+    def embeddings(self):
+        """The shared embedding model, wrapped with the query embedding cache."""
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    self._embeddings = CachedEmbeddings(
+                        get_embedding_model(),
+                        disk_path=EMBEDDING_CACHE_PATH,
+                        namespace=MODEL_NAME,
+                    )
+        return self._embeddings
+
+    def embed_query(self, query):
+        """Embeds a query through the cache."""
+        embeddings = self.embeddings
+        with span("embed_query", "vector_search"):
+            return embeddings.embed_query(query)
+
+    def _live_version(self):
+        """
+        Resolves db_path (a symlink to the live version). When a rebuild, possibly in
+        another process, has swapped in a new version, the open indexes are dropped and
+        reopened there, instead of reading a directory a later rebuild will prune.
+        """
+        path = os.path.realpath(self.db_path)
+        if path != self._version_path:
+            with self._lock:
+                if path != self._version_path:
+                    if self._version_path is not None:
+                        policy_answer_cache.clear()
+                    self._vectorstore = None
+                    self._bm25 = None
+                    self._version_path = path
+        return path
+
+    @property
+    def vectorstore(self):
+        """The shared vectorstore handle (opened on first use, reopened after a swap)."""
+        path = self._live_version()
+        if self._vectorstore is None:
+            if not os.path.exists(self.db_path):
+                raise FileNotFoundError(
+                    f"❌ Vectorstore not found at {self.db_path}. Run src/rag/store.py first."
+                )
+            embeddings = self.embeddings
+            with self._lock:
+                if self._vectorstore is None:
+                    start = time.perf_counter()
+                    with span(f"vectorstore.{self.backend}", "model_load"):
+                        if self.backend == "numpy":
+                            self._vectorstore = NumpyVectorIndex.load(os.path.join(path, INDEX_DIR), embeddings)
+                        else:
+                            self._vectorstore = Chroma(
+                                persist_directory=path,
+                                embedding_function=embeddings
+                            )
+                    self._load_seconds = time.perf_counter() - start
+        return self._vectorstore
+
+    @property
+    def bm25(self):
+        """The BM25 index of the live vectorstore version (None if it was built without one)."""
+        version_path = self._live_version()
+        if self._bm25 is None:
+            path = os.path.join(version_path, BM25_INDEX_DIR)
+            if not BM25Index.exists(path):
+                return None
+            index = BM25Index.load(path)
+            with self._lock:
+                if self._bm25 is None:
+                    self._bm25 = index
+        return self._bm25
+
+    def warm(self):
+        """Loads everything and runs one query so the first real request is fast."""
+        start = time.perf_counter()
+        self.vectorstore.similarity_search("retention policy", k=1)
+        print(f"✅ Retriever warmed in {time.perf_counter() - start:.2f}s")
+
+    def invoke(self, query, k=None):
+        """Returns the top-k policy chunks for `query`. Safe to call from many threads."""
+        return self.search_by_vector(self.embed_query(query), k=k)
+
+    def search_by_vector(self, vector, k=None):
+        """Returns the top-k policy chunks for an already embedded query."""
+        vectorstore = self.vectorstore
+        start = time.perf_counter()
+        try:
+            with span("similarity_search", "vector_search", k=k or self.default_k):
+                docs = vectorstore.similarity_search_by_vector(vector, k=k or self.default_k)
+        except Exception:
+            self._errors += 1
+            raise
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._queries += 1
+            self._total_query_seconds += elapsed
+            self._latencies.append(elapsed)
+        return docs
+
+    def hybrid_search(self, query, vector=None, k=None, token_budget=POLICY_TOKEN_BUDGET, candidates=20):
+        """
+        BM25 + vector retrieval fused with reciprocal rank fusion.
+        Returns deduplicated chunks (at most k) within token_budget. Falls back to
+        dense search if the live index has no BM25 index yet.
+        """
+        k = k or self.default_k
+        if vector is None:
+            vector = self.embed_query(query)
+        bm25 = self.bm25
+        if bm25 is None:
+            return self.search_by_vector(vector, k=k)
+        dense_docs = self.search_by_vector(vector, k=candidates)
+        with span("bm25_fusion", "vector_search"):
+            return hybrid_search(query, dense_docs, bm25, k=k, token_budget=token_budget, candidates=candidates)
+
+    def reload(self):
+        """Drops the vectorstore handle so the next call reopens it (e.g. after a rebuild)."""
+        with self._lock:
+            self._vectorstore = None
+            self._bm25 = None
+            self._version_path = None
+        policy_answer_cache.clear()
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+        p50 = latencies[len(latencies) // 2] if latencies else 0.0
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0.0
+        return {
+            "backend": self.backend,
+            "retrieval_mode": RETRIEVAL_MODE,
+            "embedding_load_seconds": get_embedding_load_seconds(),
+            "vectorstore_load_seconds": self._load_seconds,
+            "queries": self._queries,
+            "errors": self._errors,
+            "avg_query_seconds": self._total_query_seconds / self._queries if self._queries else 0.0,
+            "p50_query_seconds": p50,
+            "p99_query_seconds": p99,
+            "embedding_cache": self._embeddings.stats() if self._embeddings else None,
+            "semantic_cache": policy_answer_cache.stats(),
+        }
+
+# Shared by every caller in the process
+policy_answer_cache = SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD)
+retriever_service = RetrieverService()
+
 def get_retriever(k=2):
     """
-    Loads the vectorstore and returns a retriever object.
+    Returns a retriever object over the shared vectorstore.
     k: Number of chunks to retrieve.
     """
-    if not os.path.exists(DB_PATH):
-        raise FileNotFoundError(f"❌ Vectorstore not found at {DB_PATH}. Run src/rag/store.py first.")
-
-    embedding_fn = get_embedding_model()
-    
-    vectorstore = Chroma(
-        persist_directory=DB_PATH,
-        embedding_function=embedding_fn
-    )
-    
-    return vectorstore.as_retriever(search_kwargs={"k": k})
\ No newline at end of file
+    return retriever_service.vectorstore.as_retriever(search_kwargs={"k": k})
+
+def warm_retriever():
+    """Warms the retriever at startup; logs instead of failing if the index is missing."""
+    try:
+        retriever_service.warm()
+    except Exception as e:
+        print(f"⚠️ Retriever not warmed: {e}")
@@ -1,43 +1,342 @@
+import argparse
+import glob
+import hashlib
+import multiprocessing
 import os
 import shutil
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from langchain_community.vectorstores import Chroma
-from src.rag.loader import load_policy_docs
-from src.rag.chunker import split_documents
-from src.rag.embedder import get_embedding_model
+from src.rag.loader import iter_policy_pages
+from src.rag.chunker import iter_chunks
+from src.rag.embedder import MODEL_NAME, get_embedding_model
+from src.rag.numpy_index import INDEX_DIR, NumpyVectorIndex
+from src.rag.hybrid import INDEX_DIR as BM25_INDEX_DIR, BM25Index
 
 # Paths
-PDF_PATH = "data/policy/Company_Retention_Policy_2026.pdf"
-DB_PATH = "vectorstore/chroma_db"
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+POLICY_DIR = os.path.join(BASE_DIR, "data", "policy")
+PDF_PATH = os.path.join(POLICY_DIR, "Company_Retention_Policy_2026.pdf")
+DB_PATH = os.path.join(BASE_DIR, "vectorstore", "chroma_db")
 
-def build_vectorstore():
+# DB_PATH is a symlink to the live index version (e.g. chroma_db.20260101120000000000).
+# Older versions are kept around briefly so readers that still have them open keep working.
+KEEP_VERSIONS = 2
+
+EMBED_BATCH_SIZE = 64      # chunks per embedding call (and per worker task)
+WRITE_BATCH_SIZE = 2048    # chunks per store transaction (capped by Chroma's max batch size)
+# Workers load torch themselves; "spawn" avoids forking a process that already has threads
+EMBED_START_METHOD = "spawn"
+
+def chunk_id(doc):
     """
-    Orchestrates the indexing pipeline: Load -> Split -> Embed -> Store.
+    Content hash of a chunk: embedding model + source file + page + text.
+    A chunk whose hash is already in the index does not need to be embedded again.
     """
-    print("🏗️  Building Vector Store...")
+    source = doc.metadata.get("source", "")
+    if os.path.isabs(source):
+        source = os.path.relpath(source, BASE_DIR)
+    raw = f"{MODEL_NAME}\x00{source}\x00{doc.metadata.get('page', '')}\x00{doc.page_content}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def hash_chunks(splits):
+    """Returns {chunk_id: chunk}, dropping exact duplicates."""
+    chunks = {}
+    for doc in splits:
+        chunks.setdefault(chunk_id(doc), doc)
+    return chunks
+
+def iter_policy_chunks(pdf_paths):
+    """Streams pages (parsed or from the page cache) through the chunker (the corpus is never all in memory)."""
+    def pages():
+        for pdf_path in pdf_paths:
+            count = 0
+            for page in iter_policy_pages(pdf_path):
+                count += 1
+                yield page
+            print(f"✅ Loaded {count} pages from {pdf_path}")
+
+    yield from iter_chunks(pages())
+
+def find_policy_pdfs(pdf_dir=POLICY_DIR):
+    """All PDFs under pdf_dir, in a stable order."""
+    paths = glob.glob(os.path.join(pdf_dir, "**", "*.pdf"), recursive=True)
+    return sorted(paths)
+
+# ───────────────────────────────────────────────
+# Index versions
+# ───────────────────────────────────────────────
+def get_live_index_path(db_path=DB_PATH):
+    """The directory currently served at db_path (None if no index exists yet)."""
+    if not os.path.exists(db_path):
+        return None
+    return os.path.realpath(db_path)
+
+def _new_version_path(db_path):
+    """
+    db_path + a timestamp down to the microsecond (YYYYmmddHHMMSS + 6 digits), so versions
+    sort by name in build order. Bumped past any existing version built the same microsecond.
+    """
+    ns = time.time_ns()
+    while True:
+        stamp = time.strftime("%Y%m%d%H%M%S", time.localtime(ns // 1_000_000_000))
+        path = f"{db_path}.{stamp}{ns // 1000 % 1_000_000:06d}"
+        if not os.path.lexists(path):
+            return path
+        ns += 1000
+
+def _swap_in(db_path, version_path):
+    """Atomically points db_path at version_path (symlink + rename)."""
+    if os.path.isdir(db_path) and not os.path.islink(db_path):
+        # One-off upgrade from a plain directory: it becomes a version like any other
+        os.rename(db_path, _new_version_path(db_path))
+
+    tmp_link = f"{db_path}.swap"
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(os.path.basename(version_path), tmp_link)
+    os.replace(tmp_link, db_path)
 
-    # 1. Clear old DB to avoid duplicates
-    if os.path.exists(DB_PATH):
-        shutil.rmtree(DB_PATH)
-
-    # 2. Load
-    docs = load_policy_docs(PDF_PATH)
-    if not docs:
-        print("❌ No documents found.")
-        return
-
-    # 3. Split
-    splits = split_documents(docs)
-    print(f"🧩 Split into {len(splits)} chunks.")
-
-    # 4. Embed & Store
-    embedding_fn = get_embedding_model()
-    
-    vectorstore = Chroma.from_documents(
-        documents=splits,
-        embedding=embedding_fn,
-        persist_directory=DB_PATH
+def _prune_versions(db_path, keep=KEEP_VERSIONS):
+    """Deletes old index versions, keeping the live one and the newest `keep - 1` others."""
+    live = get_live_index_path(db_path)
+    versions = sorted(
+        (p for p in glob.glob(f"{db_path}.*") if os.path.isdir(p) and not os.path.islink(p)),
+        reverse=True,
     )
-    print(f"💾 Vectorstore saved successfully to {DB_PATH}")
+    old = [p for p in versions if os.path.realpath(p) != live]
+    for path in old[max(keep - 1, 0):]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def export_search_indexes(vectorstore, version_path):
+    """
+    Writes the indexes derived from a vectorstore version (no re-embedding):
+    the NumpyVectorIndex and the BM25 inverted index used by hybrid retrieval.
+    """
+    data = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+    NumpyVectorIndex.from_embeddings(
+        vectorstore.embeddings,
+        data["embeddings"],
+        data["documents"],
+        metadatas=data["metadatas"],
+        ids=data["ids"],
+        path=os.path.join(version_path, INDEX_DIR),
+    )
+    BM25Index.build(data["ids"], data["documents"], data["metadatas"]).save(
+        os.path.join(version_path, BM25_INDEX_DIR)
+    )
+
+def has_search_indexes(version_path):
+    """True if a vectorstore version already has every derived index."""
+    return (NumpyVectorIndex.exists(os.path.join(version_path, INDEX_DIR))
+            and BM25Index.exists(os.path.join(version_path, BM25_INDEX_DIR)))
+
+# ───────────────────────────────────────────────
+# Embedding workers
+# ───────────────────────────────────────────────
+def _init_embed_worker(threads):
+    """Runs once per worker process: pin torch threads and load the model."""
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    get_embedding_model()
+
+def _embed_texts(texts):
+    return get_embedding_model().embed_documents(texts)
+
+class _Progress:
+    """Prints chunk counts and throughput as the pipeline runs."""
+
+    def __init__(self, every=EMBED_BATCH_SIZE * 16):
+        self.every = every
+        self.start = time.perf_counter()
+        self.seen = 0
+        self.embedded = 0
+        self._next_report = every
+
+    def report(self, force=False):
+        if not force and self.embedded < self._next_report:
+            return
+        self._next_report = self.embedded + self.every
+        elapsed = time.perf_counter() - self.start
+        rate = self.embedded / elapsed if elapsed else 0.0
+        print(f"🔄 {self.seen} chunks read, {self.embedded} embedded ({rate:.1f} chunks/s)")
+
+def _index_chunks(vectorstore, chunks, existing, workers=0, batch_size=EMBED_BATCH_SIZE,
+                  write_batch_size=WRITE_BATCH_SIZE):
+    """
+    Streams chunks into the vectorstore. Chunks whose id is already in `existing` are
+    skipped; the rest are embedded in batches (across `workers` processes, or in this
+    process when workers=0) and upserted in bulk transactions.
+    Returns: (set of every chunk id seen, number embedded)
+    """
+    collection = vectorstore._collection
+    write_batch_size = min(write_batch_size, vectorstore._client.get_max_batch_size())
+    progress = _Progress()
+    seen = set()
+    buffer = {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+
+    def flush():
+        if buffer["ids"]:
+            collection.upsert(**buffer)
+            for values in buffer.values():
+                values.clear()
+
+    def collect(batch, embeddings):
+        for (cid, doc), embedding in zip(batch, embeddings):
+            buffer["ids"].append(cid)
+            buffer["embeddings"].append(embedding)
+            buffer["documents"].append(doc.page_content)
+            buffer["metadatas"].append(doc.metadata or None)
+        progress.embedded += len(batch)
+        if len(buffer["ids"]) >= write_batch_size:
+            flush()
+        progress.report()
+
+    def batches():
+        batch = []
+        for doc in chunks:
+            cid = chunk_id(doc)
+            progress.seen += 1
+            if cid in seen:
+                continue
+            seen.add(cid)
+            if cid in existing:
+                continue
+            batch.append((cid, doc))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    if workers <= 0:
+        embed_fn = get_embedding_model()
+        for batch in batches():
+            collect(batch, embed_fn.embed_documents([doc.page_content for _, doc in batch]))
+    else:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(EMBED_START_METHOD),
+            initializer=_init_embed_worker,
+            initargs=(threads,),
+        ) as pool:
+            # Keep a couple of batches in flight per worker; collect in submission order
+            pending = deque()
+            for batch in batches():
+                pending.append((batch, pool.submit(_embed_texts, [doc.page_content for _, doc in batch])))
+                while len(pending) >= workers * 2:
+                    done_batch, future = pending.popleft()
+                    collect(done_batch, future.result())
+            while pending:
+                done_batch, future = pending.popleft()
+                collect(done_batch, future.result())
+
+    flush()
+    progress.report(force=True)
+    return seen, progress.embedded
+
+def _build(chunks, db_path, rebuild, workers, batch_size):
+    """Stages the next index version, updates it from `chunks` and swaps it in."""
+    start = time.perf_counter()
+
+    # Stage the next version alongside the live one
+    live_path = get_live_index_path(db_path)
+    version_path = _new_version_path(db_path)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    if live_path and not rebuild:
+        shutil.copytree(live_path, version_path)
+    else:
+        os.makedirs(version_path)
+
+    try:
+        vectorstore = Chroma(persist_directory=version_path, embedding_function=get_embedding_model())
+        existing = set(vectorstore.get(include=[])["ids"])
+
+        # Embed & store only what changed, then drop what disappeared
+        seen, added = _index_chunks(vectorstore, chunks, existing, workers=workers, batch_size=batch_size)
+        if not seen:
+            shutil.rmtree(version_path, ignore_errors=True)
+            print("❌ No documents found.")
+            return None
+
+        to_delete = [cid for cid in existing if cid not in seen]
+        for i in range(0, len(to_delete), WRITE_BATCH_SIZE):
+            vectorstore.delete(ids=to_delete[i:i + WRITE_BATCH_SIZE])
+        unchanged = len(seen) - added
+
+        # The numpy backend (VECTOR_BACKEND=numpy) and BM25 index live in the same version
+        export_search_indexes(vectorstore, version_path)
+    except Exception:
+        shutil.rmtree(version_path, ignore_errors=True)
+        raise
+
+    up_to_date = has_search_indexes(live_path) if live_path else False
+    if up_to_date and not rebuild and not added and not to_delete:
+        shutil.rmtree(version_path, ignore_errors=True)
+        print(f"✅ Vectorstore already up to date ({unchanged} chunks).")
+        return {"added": 0, "deleted": 0, "unchanged": unchanged, "path": live_path}
+
+    # Swap in and let this process' retriever pick up the new version
+    _swap_in(db_path, version_path)
+    _prune_versions(db_path)
+
+    from src.rag.retriever import retriever_service
+    if os.path.realpath(retriever_service.db_path) == os.path.realpath(db_path):
+        retriever_service.reload()
+
+    elapsed = time.perf_counter() - start
+    print(f"📊 Added {added}, deleted {len(to_delete)}, unchanged {unchanged} chunks in {elapsed:.2f}s"
+          f" ({added / elapsed:.1f} chunks/s embedded)")
+    print(f"💾 Vectorstore saved successfully to {db_path} -> {os.path.basename(version_path)}")
+    return {"added": added, "deleted": len(to_delete), "unchanged": unchanged, "path": version_path}
+
+def build_vectorstore(pdf_path=PDF_PATH, db_path=DB_PATH, rebuild=False, workers=0, batch_size=EMBED_BATCH_SIZE):
+    """
+    Orchestrates the indexing pipeline: Load -> Split -> Hash -> Embed (changed only) -> Swap.
+
+    The next index version is prepared next to the live one (a copy of it, or empty when
+    `rebuild` is set). Only new or changed chunks are embedded, chunks that disappeared are
+    deleted, and the finished version is swapped in atomically.
+    Returns: dict with added / deleted / unchanged chunk counts.
+    """
+    print("🏗️  Building Vector Store...")
+    return _build(iter_policy_chunks([pdf_path]), db_path, rebuild, workers, batch_size)
+
+def build_vectorstore_from_dir(pdf_dir=POLICY_DIR, db_path=DB_PATH, rebuild=False,
+                               workers=None, batch_size=EMBED_BATCH_SIZE):
+    """
+    Same pipeline as build_vectorstore, over every PDF in pdf_dir.
+    Chunks are streamed file by file and embedded by a pool of `workers` processes
+    (default: one per CPU); pass workers=0 to embed in this process.
+    """
+    pdf_paths = find_policy_pdfs(pdf_dir)
+    if not pdf_paths:
+        raise FileNotFoundError(f"❌ No policy PDFs found in {pdf_dir}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    print(f"🏗️  Building Vector Store from {len(pdf_paths)} PDFs with {workers} embedding workers...")
+    return _build(iter_policy_chunks(pdf_paths), db_path, rebuild, workers, batch_size)
 
 if __name__ == "__main__":
-    build_vectorstore()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build or incrementally update the policy vectorstore.")
+    parser.add_argument("--pdf", default=PDF_PATH, help="Policy PDF to index")
+    parser.add_argument("--dir", default=None, help="Index every PDF in this directory instead of --pdf")
+    parser.add_argument("--db", default=DB_PATH, help="Vectorstore path (symlink to the live version)")
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed everything instead of updating")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Embedding processes (default: 0 for --pdf, one per CPU for --dir)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Chunks per embedding batch")
+    args = parser.parse_args()
+
+    if args.dir:
+        build_vectorstore_from_dir(pdf_dir=args.dir, db_path=args.db, rebuild=args.rebuild,
+                                   workers=args.workers, batch_size=args.batch_size)
+    else:
+        build_vectorstore(pdf_path=args.pdf, db_path=args.db, rebuild=args.rebuild,
+                          workers=args.workers or 0, batch_size=args.batch_size)
@@ -1,10 +1,18 @@
 import os
+import re
+import time
 import sqlite3
 import logging
-from langchain_groq import ChatGroq
 from langchain_core.tools import tool
 from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
+from src.utils.sqlite_pool import get_pool
+from src.utils.schema_cache import schema_cache
+from src.utils.sql_cache import sql_cache, match_sql_template
+from src.utils.db_ops import has_name_index
+from src.utils.result_pager import cursor_store, format_result_page, paged_sql
+from src.agents.llm import get_chat_model, sql_script
+from src.agents.tracing import span
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -17,28 +25,27 @@ load_dotenv()
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DB_PATH = os.path.join(BASE_DIR, "data", "hotel_retention.db")
 
+# Only a plain SELECT is known to be read-only (a WITH ... can end in DELETE / UPDATE), so
+# only those run on a pooled reader; anything else goes through the writer
+READ_ONLY_SQL = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
 # --- 2. SETUP THE LLM ---
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile", 
-    temperature=0
+SQL_MODEL = "llama-3.3-70b-versatile"
+llm = get_chat_model(
+    SQL_MODEL, 
+    temperature=0,
+    script=sql_script,
 )
 
 # --- 3. GET DATABASE SCHEMA ---
 def get_database_schema():
-    """Fetch the schema of the bookings table"""
+    """Fetch the schema of the bookings table (cached until the DB schema changes)"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(bookings)")
-        columns = cursor.fetchall()
-        conn.close()
-        
-        if not columns:
+        schema = schema_cache.get(DB_PATH, "bookings")
+
+        if not schema:
              return "Error: Table 'bookings' not found or empty."
 
-        schema = "Table: bookings\nColumns:\n"
-        for col in columns:
-            schema += f"  - {col[1]} ({col[2]})\n"
         return schema
     except Exception as e:
         logger.error(f"Error fetching schema: {e}")
@@ -65,11 +72,25 @@ Rules:
 
 sql_chain = sql_prompt | llm
 
+def _fetch_next_page(cursor_token):
+    """Returns the next page of an earlier result."""
+    entry = cursor_store.get(cursor_token)
+    if entry is None:
+        return "Error: cursor expired or unknown. Ask the question again."
+
+    sql, params, offset = entry
+    with span("bookings.next_page", "sql", offset=offset), get_pool(DB_PATH).reader() as conn:
+        cursor = conn.execute(paged_sql(sql), params + (offset,))
+        page = format_result_page(cursor, sql=sql, params=params, offset=offset)
+    return page or "No more records."
+
 @tool
-def fetch_customer_booking(query: str):
+def fetch_customer_booking(query: str, cursor: str = ""):
     """
     Useful for getting ANY data from the database using natural language.
     You can search by Name, ID, Price, Date, or any other column.
+    Results come back as JSON: {"columns": {column: [values...]}, "row_count": n}.
+    If the result has "next_cursor", call again with that cursor to get the next page.
     
     Args:
         query (str): The natural language question.
@@ -77,56 +98,82 @@ def fetch_customer_booking(query: str):
         - "Get details for customer named Alice"
         - "What is the booking price for customer ID 101?"
         - "Show me the top 5 most expensive bookings"
+        cursor (str): Optional "next_cursor" value from a previous result.
     """
+    if cursor:
+        try:
+            return _fetch_next_page(cursor)
+        except sqlite3.Error as e:
+            logger.error(f"Database Error: {e}")
+            return f"Database error: {str(e)}"
+
     try:
         # Step 1: Get database schema
         schema = get_database_schema()
-        logger.info(f"Database Schema: {schema}")
+        logger.debug(f"Database Schema: {schema}")
         
         if "Error" in schema:
             return schema
 
-        # Step 2: Generate SQL query using LLM
-        logger.info(f"Generating SQL for query: {query}")
-        try:
-            response = sql_chain.invoke({
-                "schema": schema,
-                "question": query
-            })
-            # Log the raw response for debugging
-            logger.info(f"LLM Response: {response.content}")
-        except Exception as llm_error:
-            logger.error(f"LLM Invocation Failed: {llm_error}")
-            return f"Error generating SQL: {str(llm_error)}"
-        
-        # Extract the SQL query from the response
-        generated_sql = response.content.strip()
-        
-        # Clean up any potential markdown formatting
-        generated_sql = generated_sql.replace("```sql", "").replace("```", "").strip()
+        # Step 2: Get SQL -> template (no LLM) / cache (no LLM) / LLM
+        params = ()
+        llm_seconds = None
+        template = match_sql_template(query, has_name_index=has_name_index())
+        if template:
+            template_name, generated_sql, params = template
+            sql_cache.record_template_hit()
+            logger.info(f"SQL template '{template_name}' matched query: {query}")
+        else:
+            generated_sql = sql_cache.get(query, schema, model_name=SQL_MODEL)
+            if generated_sql:
+                logger.info(f"SQL cache hit for query: {query}")
+
+        if generated_sql is None:
+            logger.info(f"Generating SQL for query: {query}")
+            try:
+                start = time.perf_counter()
+                with span(SQL_MODEL, "llm"):
+                    response = sql_chain.invoke({
+                        "schema": schema,
+                        "question": query
+                    })
+                llm_seconds = time.perf_counter() - start
+                sql_cache.record_llm_call(llm_seconds)
+                # Log the raw response for debugging
+                logger.info(f"LLM Response: {response.content}")
+            except Exception as llm_error:
+                logger.error(f"LLM Invocation Failed: {llm_error}")
+                return f"Error generating SQL: {str(llm_error)}"
+
+            # Extract the SQL query from the response
+            generated_sql = response.content.strip()
+
+            # Clean up any potential markdown formatting
+            generated_sql = generated_sql.replace("```sql", "").replace("```", "").strip()
         logger.info(f"Executed SQL: {generated_sql}")
         
-        # Step 3: Execute the query
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(generated_sql)
-        
-        # Fetch results
-        results = cursor.fetchall()
-        column_names = [description[0] for description in cursor.description]
-        conn.close()
-        
-        # Step 4: Format results
-        if not results:
+        # Step 3: Execute the query & Step 4: Format one page of results
+        pool = get_pool(DB_PATH)
+        is_read_only = READ_ONLY_SQL.match(generated_sql) is not None
+        connection = pool.reader() if is_read_only else pool.writer()
+        with span("bookings.query", "sql", read_only=is_read_only,
+                  source="template" if params else ("llm" if llm_seconds is not None else "cache")), connection as conn:
+            cursor = conn.execute(generated_sql, params)
+
+            # Only cache freshly generated SQL that ran cleanly and only reads
+            if llm_seconds is not None and is_read_only:
+                sql_cache.put(query, schema, generated_sql, llm_seconds, model_name=SQL_MODEL)
+
+            page = format_result_page(
+                cursor,
+                sql=generated_sql if is_read_only else None,
+                params=params,
+            )
+
+        if page is None:
             return "No records found matching that query."
-        
-        # Convert to readable format
-        formatted_results = []
-        for row in results:
-            row_dict = dict(zip(column_names, row))
-            formatted_results.append(row_dict)
-        
-        return str(formatted_results)
+
+        return page
 
     except sqlite3.Error as e:
         logger.error(f"Database Error: {e}")
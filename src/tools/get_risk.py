@@ -6,6 +6,7 @@
 import json
 from langchain_core.tools import tool
 from src.ml.predictor import get_churn_risk
+from src.ml.risk import risk_level_from_score
 from src.utils.db_ops import fetch_booking_by_id
 
 @tool
@@ -28,7 +29,7 @@ def get_customer_risk_score(customer_id: int):
         return json.dumps({
             "customer_id": customer_id,
             "risk_score": risk_score,
-            "risk_level": "HIGH" if risk_score >= 0.7 else "LOW"
+            "risk_level": risk_level_from_score(risk_score)
         })
     except Exception as e:
         return json.dumps({"error": f"Risk calculation failed: {str(e)}"})
\ No newline at end of file
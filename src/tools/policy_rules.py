@@ -0,0 +1,31 @@
+# Tool: Policy limits lookup
+
+# Answers "what am I allowed to offer?" from the precomputed rule table (no retrieval).
+# Falls back to telling the agent to use search_retention_policy when the table is missing.
+
+import json
+from langchain_core.tools import tool
+from src.rag.policy_rules import lookup_policy_limits
+
+@tool
+def get_policy_limits(customer_tier: str, risk_level: str = "", risk_score: float = -1.0):
+    """
+    Returns the retention policy limits for a guest: max room discount, service discount,
+    amenity value cap, loyalty points range, upgrade rules, manager-approval thresholds and
+    whether the full discount cap needs approval (requires_approval).
+    customer_tier: BRONZE (first-time / low value), SILVER (returning / moderate spend),
+    GOLD (high spend / active loyalty member) or PLATINUM (VIP, corporate, strategic).
+    Give risk_level (LOW/MEDIUM/HIGH) or risk_score (0-1).
+    Use this BEFORE making any offer; use search_retention_policy for anything else.
+    """
+    try:
+        limits = lookup_policy_limits(
+            risk_level=risk_level or None,
+            tier=customer_tier or None,
+            risk_score=risk_score if risk_score >= 0 else None,
+        )
+        return json.dumps(limits)
+    except FileNotFoundError:
+        return "Policy rule table is not available. Use search_retention_policy instead."
+    except ValueError as e:
+        return f"Error looking up policy limits: {e}"
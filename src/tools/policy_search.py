@@ -3,7 +3,8 @@
 # Allows the agent to check if a customer is "High Risk".
 
 from langchain_core.tools import tool
-from src.rag.retriever import get_retriever
+from src.rag.cache import answer_namespace
+from src.rag.retriever import retriever_service, policy_answer_cache, RETRIEVAL_MODE
 
 @tool
 def search_retention_policy(query: str):
@@ -12,13 +13,28 @@ def search_retention_policy(query: str):
     Use this BEFORE making any offer to a customer.
     """
     try:
-        # Get the retriever (The Librarian)
-        retriever = get_retriever(k=2)
-        
-        # Ask the question
-        docs = retriever.invoke(query)
+        k = 3 if RETRIEVAL_MODE == "hybrid" else 2
+        # Embed once (cached per normalized query text)
+        query_vector = retriever_service.embed_query(query)
+
+        # A near-identical question (same risk level / tier / numbers) was answered
+        # already -> reuse that answer
+        namespace = answer_namespace(query, f"{RETRIEVAL_MODE}:k={k}")
+        cached = policy_answer_cache.lookup(query_vector, namespace=namespace)
+        if cached:
+            return cached[0]
+
+        # Ask the shared retriever (The Librarian), loaded once per process.
+        # Hybrid mode also matches exact terms ("Presidential", "20%") and keeps the
+        # result under a token budget.
+        if RETRIEVAL_MODE == "hybrid":
+            docs = retriever_service.hybrid_search(query, vector=query_vector, k=k)
+        else:
+            docs = retriever_service.search_by_vector(query_vector, k=k)
         
         # Combine the answers found
-        return "\n\n".join([doc.page_content for doc in docs])
+        answer = "\n\n".join([doc.page_content for doc in docs])
+        policy_answer_cache.store(query_vector, answer, query=query, namespace=namespace)
+        return answer
     except Exception as e:
-        return f"Error searching policy: {e}"
\ No newline at end of file
+        return f"Error searching policy: {e}"
@@ -1,17 +1,53 @@
-import sqlite3
-import pandas as pd
 import os
+import threading
+from src.utils.migrations import MIGRATIONS, get_schema_version, has_name_trigram_index
+from src.utils.sqlite_pool import get_pool
+from src.agents.tracing import span
 
 # Consolidated Database Path
 # Dynamic Path Resolution (Robust for Notebooks)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DB_PATH = os.path.join(BASE_DIR, "data", "hotel_retention.db")
 
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
+# Per database path: whether the FTS5 trigram name index exists (checked on first use)
+_has_fts = {}
+_check_lock = threading.Lock()
+
+def _dict_factory(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+def get_db_pool():
+    """
+    Returns the shared connection pool for the bookings database.
+    Only readers are used here: the schema is never changed at runtime. Index migrations
+    are applied by setup_db.py or `python -m src.utils.migrations` (start.sh runs it).
+    """
     if not os.path.exists(DB_PATH):
         raise FileNotFoundError(f"Database not found at {DB_PATH}. Please run setup_db.py first.")
-    return sqlite3.connect(DB_PATH)
+    pool = get_pool(DB_PATH)
+    if pool.path not in _has_fts:
+        with _check_lock:
+            if pool.path not in _has_fts:
+                with pool.reader() as conn:
+                    version = get_schema_version(conn)
+                    if version < len(MIGRATIONS):
+                        print(f"⚠️ {DB_PATH} is at schema version {version} of {len(MIGRATIONS)}; "
+                              "run `python -m src.utils.migrations` to add the lookup indexes.")
+                    _has_fts[pool.path] = has_name_trigram_index(conn)
+    return pool
+
+def has_name_index():
+    """True if the bookings database has the FTS5 trigram name index."""
+    return _has_fts[get_db_pool().path]
+
+def _query(query, params=(), one=False):
+    """Runs a read query on a pooled connection and returns plain dicts."""
+    pool = get_db_pool()
+    with span("db_ops.query", "sql"), pool.reader() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = _dict_factory
+        cursor.execute(query, params)
+        return cursor.fetchone() if one else cursor.fetchall()
 
 def fetch_booking_by_id(customer_id: int):
     """
@@ -19,15 +55,13 @@ def fetch_booking_by_id(customer_id: int):
     Returns: Dictionary with customer details or error message.
     """
     try:
-        conn = get_db_connection()
-        query = "SELECT * FROM bookings WHERE customer_id = ?"
-        df = pd.read_sql(query, conn, params=(customer_id,))
-        conn.close()
+        query = "SELECT * FROM bookings WHERE customer_id = ? LIMIT 1"
+        row = _query(query, (customer_id,), one=True)
 
-        if df.empty:
+        if row is None:
             return {"error": f"Customer ID {customer_id} not found."}
-        
-        return df.iloc[0].to_dict()
+
+        return row
     except Exception as e:
         return {"error": str(e)}
 
@@ -37,19 +71,21 @@ def search_customers_by_name(name_query: str):
     Returns: List of matching customer dictionaries.
     """
     try:
-        conn = get_db_connection()
+        pool = get_db_pool()
         # Case-insensitive partial match
-        query = "SELECT * FROM bookings WHERE name LIKE ?"
         # Add wildcards for partial match
         search_term = f"%{name_query}%"
-        
-        df = pd.read_sql(query, conn, params=(search_term,))
-        conn.close()
 
-        if df.empty:
-            return []
-        
-        return df.to_dict(orient="records")
+        if _has_fts[pool.path] and len(name_query) >= 3:
+            # Trigram index answers LIKE '%term%' without a table scan (needs >= 3 chars)
+            query = """
+            SELECT * FROM bookings
+            WHERE booking_id IN (SELECT rowid FROM bookings_name_fts WHERE name LIKE ?)
+            """
+        else:
+            query = "SELECT * FROM bookings WHERE name LIKE ?"
+
+        return _query(query, (search_term,))
     except Exception as e:
         return [{"error": str(e)}]
 
@@ -58,11 +94,7 @@ def fetch_recent_bookings(limit=5):
     Fetches the most recent bookings for dashboard/bulk analysis.
     """
     try:
-        conn = get_db_connection()
-        query = "SELECT * FROM bookings ORDER BY check_out_date DESC LIMIT ?"
-        df = pd.read_sql(query, conn, params=(limit,))
-        conn.close()
-
-        return df.to_dict(orient="records")
+        query = "SELECT * FROM bookings ORDER BY checkout_date DESC LIMIT ?"
+        return _query(query, (limit,))
     except Exception as e:
         return [{"error": str(e)}]
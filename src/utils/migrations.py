@@ -0,0 +1,95 @@
+# Schema migrations for the bookings database
+
+# Each migration runs once, tracked by SQLite's built-in `PRAGMA user_version`.
+
+import sqlite3
+
+def _add_lookup_indexes(conn):
+    """Indexes for the customer_id / name / checkout_date lookups in db_ops."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_customer_id ON bookings(customer_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_name ON bookings(name COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_checkout_date ON bookings(checkout_date)")
+
+def _add_name_trigram_index(conn):
+    """
+    FTS5 trigram index over bookings.name so `LIKE '%term%'` uses an index
+    instead of scanning the table. Kept in sync with triggers.
+    """
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS bookings_name_fts USING fts5(
+            name,
+            content='bookings',
+            content_rowid='booking_id',
+            tokenize='trigram'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS bookings_name_fts_ai AFTER INSERT ON bookings BEGIN
+            INSERT INTO bookings_name_fts(rowid, name) VALUES (new.booking_id, new.name);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS bookings_name_fts_ad AFTER DELETE ON bookings BEGIN
+            INSERT INTO bookings_name_fts(bookings_name_fts, rowid, name) VALUES ('delete', old.booking_id, old.name);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS bookings_name_fts_au AFTER UPDATE OF name ON bookings BEGIN
+            INSERT INTO bookings_name_fts(bookings_name_fts, rowid, name) VALUES ('delete', old.booking_id, old.name);
+            INSERT INTO bookings_name_fts(rowid, name) VALUES (new.booking_id, new.name);
+        END
+    """)
+    conn.execute("INSERT INTO bookings_name_fts(bookings_name_fts) VALUES ('rebuild')")
+
+# Ordered list of migrations; position + 1 is the schema version it produces
+MIGRATIONS = [
+    _add_lookup_indexes,
+    _add_name_trigram_index,
+]
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def has_name_trigram_index(conn):
+    """True if the FTS5 trigram index over names exists in this database."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bookings_name_fts'"
+    ).fetchone()
+    return row is not None
+
+def apply_migrations(conn):
+    """
+    Applies any pending migrations in order.
+    Returns: The schema version after migrating.
+    """
+    table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bookings'"
+    ).fetchone()
+    if table is None:
+        # Nothing to migrate until setup_db has created the table
+        return get_schema_version(conn)
+
+    version = start_version = get_schema_version(conn)
+    for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        try:
+            with conn:
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+        except sqlite3.OperationalError as e:
+            # e.g. SQLite built without FTS5 / trigram: keep the earlier migrations
+            print(f"⚠️ Migration {target} ({migration.__name__}) skipped: {e}")
+            break
+        print(f"✅ Applied migration {target}: {migration.__name__}")
+        version = target
+
+    if version != start_version:
+        # Refresh planner statistics so the new indexes get picked
+        conn.execute("ANALYZE")
+    return version
+
+if __name__ == "__main__":
+    from src.utils.db_ops import DB_PATH
+    from src.utils.sqlite_pool import get_pool
+
+    with get_pool(DB_PATH).writer() as conn:
+        print(f"📦 Schema version: {apply_migrations(conn)}")
@@ -0,0 +1,132 @@
+# Paged, budgeted formatting of SQL results for LLM tools
+
+# Rows are pulled with fetchmany until a row or byte budget is hit, so a query
+# without a LIMIT never loads the whole table into memory (or into the prompt).
+# The page is returned as compact, column-oriented JSON; if more rows exist, a
+# continuation cursor lets the caller ask for the next page (plain SELECTs only).
+# A single row over the byte budget has its long text values cut.
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ROWS = 25
+DEFAULT_MAX_BYTES = 6000
+FETCH_SIZE = 64
+
+CURSOR_TTL_SECONDS = 15 * 60
+MAX_OPEN_CURSORS = 256
+
+# Only these can be wrapped by paged_sql (EXPLAIN / PRAGMA / WITH cannot be a subquery)
+PAGEABLE_SQL = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+class CursorStore:
+    """Remembers how to fetch the next page of a result (bounded, expiring)."""
+
+    def __init__(self, max_entries=MAX_OPEN_CURSORS, ttl_seconds=CURSOR_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, sql, params, offset):
+        # Derived from the query, not random: the token ends up in the next LLM prompt,
+        # which must stay the same across runs for the LLM cache to hit
+        key = json.dumps([sql, list(params), offset], default=str)
+        token = hashlib.sha1(key.encode()).hexdigest()[:12]
+        with self._lock:
+            self._entries[token] = (sql, tuple(params), offset, time.time())
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return token
+
+    def get(self, token):
+        """Returns (sql, params, offset) for a token, or None if unknown/expired."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if time.time() - entry[3] > self.ttl_seconds:
+                del self._entries[token]
+                return None
+            return entry[:3]
+
+cursor_store = CursorStore()
+
+def paged_sql(sql):
+    """Wraps a SELECT so a later page can skip rows the caller has already seen."""
+    return f"SELECT * FROM ({sql.strip().rstrip(';')}) LIMIT -1 OFFSET ?"
+
+def is_pageable(sql):
+    return sql is not None and PAGEABLE_SQL.match(sql) is not None
+
+def _json_value(value):
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    return value
+
+def _row_bytes(row):
+    return len(json.dumps(row, separators=(",", ":"), default=str))
+
+def _fit_row(row, max_bytes):
+    """Cuts text values (longest first) until the row fits in max_bytes, as far as it can."""
+    row = list(row)
+    for i in sorted((i for i, v in enumerate(row) if isinstance(v, str)), key=lambda i: -len(row[i])):
+        excess = _row_bytes(row) - max_bytes
+        if excess <= 0:
+            break
+        value = row[i]
+        keep = max(0, len(value) - excess - 24)     # leaves room for the marker
+        row[i] = f"{value[:keep]}… [{len(value) - keep} chars cut]"
+    return row
+
+def format_result_page(cursor, sql=None, params=(), offset=0,
+                       max_rows=DEFAULT_MAX_ROWS, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Reads one page from an executed cursor and formats it.
+    sql/params/offset describe the query so a continuation cursor can be issued
+    (only for plain SELECTs; pass sql=None for results that cannot be re-run, e.g. writes).
+    Returns: JSON string, or None if the query produced no rows.
+    """
+    columns = [description[0] for description in cursor.description or []]
+    data = {name: [] for name in columns}
+
+    used_bytes = 0
+    row_count = 0
+    has_more = False
+    values_cut = False
+    while not has_more:
+        batch = cursor.fetchmany(FETCH_SIZE)
+        if not batch:
+            break
+        for row in batch:
+            row = [_json_value(v) for v in row]
+            row_bytes = _row_bytes(row)
+            if row_count and (row_count >= max_rows or used_bytes + row_bytes > max_bytes):
+                has_more = True
+                break
+            if row_bytes > max_bytes:
+                # Only possible for the first row: cut it to fit instead of blowing the budget
+                row = _fit_row(row, max_bytes)
+                row_bytes = _row_bytes(row)
+                values_cut = True
+            for name, value in zip(columns, row):
+                data[name].append(value)
+            used_bytes += row_bytes
+            row_count += 1
+
+    if row_count == 0:
+        return None
+
+    page = {"columns": data, "row_count": row_count, "offset": offset}
+    if values_cut:
+        page["values_truncated"] = True
+    if has_more:
+        page["truncated"] = True
+        if is_pageable(sql):
+            page["next_cursor"] = cursor_store.put(sql, params, offset + row_count)
+    return json.dumps(page, separators=(",", ":"), default=str)
@@ -0,0 +1,108 @@
+# Schema introspection cache for text-to-SQL prompts
+
+# Building the schema description (columns, indexes, sample values) takes several
+# queries. SQLite bumps `PRAGMA schema_version` on every DDL change, so one cheap
+# PRAGMA per call tells us whether the cached description is still valid.
+
+import threading
+
+from src.utils.sqlite_pool import get_pool
+
+# Columns whose values should never be copied into an LLM prompt as examples
+PII_COLUMNS = {"name", "email", "phone"}
+
+class SchemaCache:
+    """
+    Caches the prompt-ready schema description per (database, table).
+    """
+
+    def __init__(self, samples_per_column=3, max_sample_chars=40, skip_sample_columns=PII_COLUMNS):
+        self.samples_per_column = samples_per_column
+        self.max_sample_chars = max_sample_chars
+        self.skip_sample_columns = set(skip_sample_columns)
+
+        self._lock = threading.Lock()
+        self._entries = {}  # (db_path, table) -> (schema_version, description)
+        self.hits = 0
+        self.misses = 0
+
+    def _sample_values(self, conn, table, column):
+        rows = conn.execute(
+            f'SELECT DISTINCT "{column}" FROM "{table}" WHERE "{column}" IS NOT NULL LIMIT ?',
+            (self.samples_per_column,),
+        ).fetchall()
+        samples = []
+        for (value,) in rows:
+            text = str(value)
+            if len(text) > self.max_sample_chars:
+                text = text[: self.max_sample_chars] + "…"
+            samples.append(text)
+        return samples
+
+    def _build(self, conn, table):
+        columns = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+        if not columns:
+            return None
+
+        description = f"Table: {table}\nColumns:\n"
+        for col in columns:
+            name, col_type = col[1], col[2]
+            line = f"  - {name} ({col_type})"
+            if name not in self.skip_sample_columns:
+                samples = self._sample_values(conn, table, name)
+                if samples:
+                    line += f" e.g. {', '.join(samples)}"
+            description += line + "\n"
+
+        indexes = []
+        for idx in conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+            index_name, unique = idx[1], idx[2]
+            index_columns = [c[2] for c in conn.execute(f'PRAGMA index_info("{index_name}")').fetchall()]
+            if not index_columns or any(c is None for c in index_columns):
+                continue  # expression indexes
+            indexes.append(f"{', '.join(index_columns)}{' (unique)' if unique else ''}")
+        if indexes:
+            description += "Indexed columns (fast to filter/sort on):\n"
+            description += "".join(f"  - {entry}\n" for entry in indexes)
+
+        return description
+
+    def get(self, db_path, table="bookings"):
+        """
+        Returns the schema description for `table`, rebuilding it only when the
+        database schema has changed. Returns None if the table does not exist.
+        """
+        key = (db_path, table)
+        with get_pool(db_path).reader() as conn:
+            version = conn.execute("PRAGMA schema_version").fetchone()[0]
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == version:
+                self.hits += 1
+                return cached[1]
+
+            with self._lock:
+                self.misses += 1
+                description = self._build(conn, table)
+                if description is not None:
+                    self._entries[key] = (version, description)
+                return description
+
+    def invalidate(self, db_path=None):
+        """Drops cached entries (all of them, or just one database)."""
+        with self._lock:
+            if db_path is None:
+                self._entries.clear()
+            else:
+                self._entries = {k: v for k, v in self._entries.items() if k[0] != db_path}
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+# Shared by every text-to-SQL caller
+schema_cache = SchemaCache()
@@ -0,0 +1,120 @@
+# Database setup: bookings schema, indexes and synthetic data for local runs & benchmarks
+
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from src.utils.migrations import apply_migrations
+from src.utils.sqlite_pool import get_pool
+
+BOOKINGS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone TEXT,
+    room_type TEXT NOT NULL,
+    booking_price REAL NOT NULL,
+    booking_date TEXT NOT NULL,
+    checkin_date TEXT NOT NULL,
+    checkout_date TEXT NOT NULL,
+    special_requests TEXT,
+    total_stays INTEGER DEFAULT 1,
+    previous_cancellations INTEGER DEFAULT 0,
+    status TEXT DEFAULT 'Confirmed'
+)
+"""
+
+_FIRST_NAMES = [
+    "John", "Laura", "Mark", "Prakash", "Aisha", "Wei", "Maria", "James", "Priya", "Carlos",
+    "Emma", "Liam", "Olivia", "Noah", "Sofia", "Arjun", "Yuki", "Fatima", "Lucas", "Chloe",
+]
+_LAST_NAMES = [
+    "Doe", "Scott", "Orozco", "Saini", "Khan", "Zhang", "Garcia", "Smith", "Sharma", "Lopez",
+    "Brown", "Wilson", "Taylor", "Martin", "Rossi", "Patel", "Tanaka", "Ali", "Silva", "Dubois",
+]
+_ROOM_TYPES = ["Standard", "Deluxe", "Suite", "Executive Suite", "Presidential"]
+_REQUESTS = [None, None, None, "Late checkout requested", "Airport pickup", "Extra bed", "High floor"]
+
+def create_schema(conn):
+    """Creates the bookings table if it does not exist."""
+    with conn:
+        conn.execute(BOOKINGS_SCHEMA)
+
+def _synthetic_rows(n, start_customer_id, rng):
+    base = date(2024, 1, 1)
+    for i in range(n):
+        customer_id = start_customer_id + i
+        first, last = rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES)
+        booked = base + timedelta(days=rng.randrange(0, 730))
+        checkin = booked + timedelta(days=rng.randrange(1, 180))
+        checkout = checkin + timedelta(days=rng.randrange(1, 14))
+        yield (
+            customer_id,
+            f"{first} {last} {customer_id}",
+            f"{first.lower()}.{last.lower()}{customer_id}@example.com",
+            f"555-{customer_id % 10000:04d}",
+            rng.choice(_ROOM_TYPES),
+            round(rng.uniform(80, 2000), 2),
+            booked.isoformat(),
+            checkin.isoformat(),
+            checkout.isoformat(),
+            rng.choice(_REQUESTS),
+            rng.randrange(1, 25),
+            rng.choice([0, 0, 0, 1, 2]),
+            "Confirmed",
+        )
+
+def generate_synthetic_bookings(conn, n, seed=42, batch_size=50000):
+    """
+    Inserts `n` synthetic bookings in batches (bounded memory).
+    Returns: Number of rows inserted.
+    """
+    rng = random.Random(seed)
+    start_id = (conn.execute("SELECT COALESCE(MAX(customer_id), 100) FROM bookings").fetchone()[0]) + 1
+    rows = _synthetic_rows(n, start_id, rng)
+
+    inserted = 0
+    while inserted < n:
+        batch = [row for _, row in zip(range(min(batch_size, n - inserted)), rows)]
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO bookings (
+                    customer_id, name, email, phone, room_type, booking_price,
+                    booking_date, checkin_date, checkout_date, special_requests,
+                    total_stays, previous_cancellations, status
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                batch,
+            )
+        inserted += len(batch)
+    return inserted
+
+def setup_database(db_path, rows=0, migrate=True):
+    """
+    Creates the schema, optionally seeds synthetic rows, then applies index migrations.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    with get_pool(db_path).writer() as conn:
+        create_schema(conn)
+        if rows:
+            start = time.perf_counter()
+            generate_synthetic_bookings(conn, rows)
+            print(f"🌱 Inserted {rows} synthetic bookings in {time.perf_counter() - start:.1f}s")
+        if migrate:
+            apply_migrations(conn)
+    print(f"✅ Database ready at {db_path}")
+
+if __name__ == "__main__":
+    from src.utils.db_ops import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Create the bookings database.")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database.")
+    parser.add_argument("--rows", type=int, default=0, help="Synthetic bookings to insert.")
+    args = parser.parse_args()
+
+    setup_database(args.db, rows=args.rows)
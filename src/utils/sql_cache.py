@@ -0,0 +1,261 @@
+# Text-to-SQL cache
+
+# Two layers in front of the SQL-writing LLM:
+#   1. Templates: common question shapes (ID lookup, name search, top-N by price)
+#      are turned into parameterized SQL directly, with no LLM call at all.
+#   2. A persistent SQLite cache from (normalized question, schema hash) to the SQL
+#      the LLM generated last time, with LRU + TTL eviction. Lookups only read; hit
+#      counters / last_used times are buffered and written in batches.
+
+import hashlib
+import os
+import re
+import threading
+import time
+
+from src.utils.sqlite_pool import get_pool
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SQL_CACHE_PATH = os.path.join(BASE_DIR, "data", "sql_cache.db")
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+HIT_FLUSH_BATCH = 100          # buffered hits written once this many keys are pending...
+HIT_FLUSH_INTERVAL_S = 60      # ...or this long after the last write
+
+# Template SQL always returns at most this many rows (same limit the LLM prompt asks for)
+TEMPLATE_ROW_LIMIT = 10
+
+def normalize_question(question):
+    """Lowercases, drops quotes and trailing punctuation, and collapses whitespace."""
+    text = question.lower().strip()
+    text = re.sub(r"[\"'`]", "", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.rstrip(" ?.!")
+
+# ───────────────────────────────────────────────
+# Templates
+# ───────────────────────────────────────────────
+# Questions containing any of these need real SQL reasoning (aggregates, writes, extra filters)
+_NEEDS_LLM = re.compile(
+    r"\b(how many|count|average|avg|sum|total number|group|per|between|before|after|"
+    r"update|delete|insert|change|set|where|and|or|not|except|without|cancel\w*|status|"
+    r"risk|date|month|year|stay\w*)\b"
+)
+# Only customer ids; a bare "id" / "booking id" is a booking and goes to the LLM
+_ID_PATTERN = re.compile(r"\b(?:customer|guest|client)(?:[ _]?id)?\s*(?:#|no\.?|number)?\s*(\d+)\b")
+# Matched on the raw question (keeps apostrophes and case, e.g. O'Brien); the name must
+# run to the end of the question
+_NAME_PATTERN = re.compile(
+    r"\b(?:named|name is|called)\s+([A-Za-z][A-Za-z .'-]{1,60}?)[\s?.!]*$", re.IGNORECASE
+)
+# A "name" containing one of these words has a clause after it (ordering, filters, ...)
+_AFTER_NAME = re.compile(
+    r"\b(?:order\w*|sort\w*|by|with|who|whose|that|which|in|from|limit|top|first|"
+    r"desc|asc|price\w*|bookings?|rooms?)\b", re.IGNORECASE
+)
+_TOP_PRICE_PATTERN = re.compile(
+    r"^(?:show|list|get|give|find|what are)?(?: me)?(?: the)?\s*(?:top\s+)?(\d+)?\s*"
+    r"(most expensive|highest[- ]priced|cheapest|least expensive|lowest[- ]priced)\s+bookings?$"
+)
+
+def match_sql_template(question, has_name_index=False):
+    """
+    Maps common question shapes straight to parameterized SQL.
+    Returns: (template_name, sql, params) or None if the question needs the LLM.
+    """
+    text = normalize_question(question)
+    if _NEEDS_LLM.search(text):
+        return None
+
+    match = _TOP_PRICE_PATTERN.match(text)
+    if match:
+        limit = int(match.group(1) or 5)
+        order = "ASC" if match.group(2) in ("cheapest", "least expensive", "lowest priced", "lowest-priced") else "DESC"
+        return (
+            "top_n_by_price",
+            f"SELECT * FROM bookings ORDER BY booking_price {order} LIMIT ?",
+            (min(limit, 100),),
+        )
+
+    # An ID lookup must mention exactly one number
+    numbers = re.findall(r"\d+", text)
+    if len(numbers) == 1:
+        match = _ID_PATTERN.search(text)
+        if match:
+            return (
+                "customer_id_lookup",
+                "SELECT * FROM bookings WHERE customer_id = ? LIMIT ?",
+                (int(numbers[0]), TEMPLATE_ROW_LIMIT),
+            )
+        return None
+
+    if not numbers:
+        match = _NAME_PATTERN.search(question.strip())
+        if match and not _AFTER_NAME.search(match.group(1)):
+            name = re.sub(r"\s+", " ", match.group(1)).strip(" .-")
+            if has_name_index and len(name) >= 3:
+                # Trigram index answers LIKE '%term%' without a table scan
+                sql = (
+                    "SELECT * FROM bookings WHERE booking_id IN "
+                    "(SELECT rowid FROM bookings_name_fts WHERE name LIKE ?) LIMIT ?"
+                )
+            else:
+                sql = "SELECT * FROM bookings WHERE name LIKE ? LIMIT ?"
+            return ("name_search", sql, (f"%{name}%", TEMPLATE_ROW_LIMIT))
+
+    return None
+
+# ───────────────────────────────────────────────
+# Persistent LLM SQL cache
+# ───────────────────────────────────────────────
+class TextToSQLCache:
+    """
+    SQLite-backed cache of LLM-generated SQL, keyed on normalized question + schema hash.
+    Entries expire after `ttl_seconds`; beyond `max_entries` the least recently used go first.
+    """
+
+    def __init__(self, path=SQL_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._ready = False
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.template_hits = 0
+        self.saved_seconds = 0.0
+        self._llm_seconds_total = 0.0
+        self._llm_calls = 0
+
+        self._pending_hits = {}     # cache_key -> (hits, last_used) not yet written
+        self._last_flush = time.time()
+
+    def _pool(self):
+        pool = get_pool(self.path)
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    with pool.writer() as conn:
+                        conn.execute("""
+                            CREATE TABLE IF NOT EXISTS sql_cache (
+                                cache_key TEXT PRIMARY KEY,
+                                question TEXT NOT NULL,
+                                generated_sql TEXT NOT NULL,
+                                llm_seconds REAL NOT NULL,
+                                created_at REAL NOT NULL,
+                                last_used REAL NOT NULL,
+                                hits INTEGER NOT NULL DEFAULT 0
+                            )
+                        """)
+                        conn.execute("CREATE INDEX IF NOT EXISTS idx_sql_cache_last_used ON sql_cache(last_used)")
+                    self._ready = True
+        return pool
+
+    @staticmethod
+    def make_key(question, schema, model_name=""):
+        schema_hash = hashlib.sha256(schema.encode("utf-8")).hexdigest()
+        raw = f"{model_name}\x00{schema_hash}\x00{normalize_question(question)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question, schema, model_name=""):
+        """Returns the cached SQL for this question + schema, or None."""
+        key = self.make_key(question, schema, model_name)
+        pool = self._pool()
+        with pool.reader() as conn:
+            row = conn.execute(
+                "SELECT generated_sql, llm_seconds, created_at FROM sql_cache WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+
+        now = time.time()
+        if row is None or now - row[2] > self.ttl_seconds:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.saved_seconds += row[1]
+        with self._lock:
+            count, _ = self._pending_hits.get(key, (0, now))
+            self._pending_hits[key] = (count + 1, now)
+            due = len(self._pending_hits) >= HIT_FLUSH_BATCH or now - self._last_flush >= HIT_FLUSH_INTERVAL_S
+        if due:
+            self.flush_hits()
+        return row[0]
+
+    def _take_pending_hits(self):
+        with self._lock:
+            pending, self._pending_hits = self._pending_hits, {}
+            self._last_flush = time.time()
+        return [(last_used, count, key) for key, (count, last_used) in pending.items()]
+
+    @staticmethod
+    def _write_hits(conn, rows):
+        conn.executemany(
+            "UPDATE sql_cache SET last_used = MAX(last_used, ?), hits = hits + ? WHERE cache_key = ?",
+            rows,
+        )
+
+    def flush_hits(self):
+        """Writes the buffered hit counters and last_used times in one transaction."""
+        rows = self._take_pending_hits()
+        if rows:
+            with self._pool().writer() as conn:
+                self._write_hits(conn, rows)
+
+    def put(self, question, schema, generated_sql, llm_seconds, model_name=""):
+        """Stores LLM-generated SQL and evicts expired / least recently used entries."""
+        key = self.make_key(question, schema, model_name)
+        now = time.time()
+        with self._pool().writer() as conn:
+            # Pending hits first, so LRU eviction below sees current last_used times
+            self._write_hits(conn, self._take_pending_hits())
+            conn.execute(
+                "INSERT OR REPLACE INTO sql_cache "
+                "(cache_key, question, generated_sql, llm_seconds, created_at, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, normalize_question(question), generated_sql, llm_seconds, now, now),
+            )
+            conn.execute("DELETE FROM sql_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM sql_cache WHERE cache_key IN ("
+                "SELECT cache_key FROM sql_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def record_llm_call(self, seconds):
+        """Tracks LLM latency so template hits can report an estimated saving."""
+        self._llm_seconds_total += seconds
+        self._llm_calls += 1
+
+    def record_template_hit(self):
+        self.template_hits += 1
+        if self._llm_calls:
+            self.saved_seconds += self._llm_seconds_total / self._llm_calls
+
+    def clear(self):
+        self._take_pending_hits()
+        with self._pool().writer() as conn:
+            conn.execute("DELETE FROM sql_cache")
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.template_hits
+        entries = 0
+        if self._ready or os.path.exists(self.path):     # don't create the file just to count it
+            with self._pool().reader() as conn:
+                entries = conn.execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0]
+        return {
+            "entries": entries,
+            "template_hits": self.template_hits,
+            "cache_hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.template_hits) / lookups if lookups else 0.0,
+            "llm_calls": self._llm_calls,
+            "avg_llm_seconds": self._llm_seconds_total / self._llm_calls if self._llm_calls else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
+
+# Shared by every text-to-SQL caller
+sql_cache = TextToSQLCache()
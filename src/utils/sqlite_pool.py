@@ -0,0 +1,171 @@
+# Shared SQLite connection pool
+
+# Every SQLite consumer (tools, ML loader, batch scoring, agent checkpointer) gets its
+# connections from here, so connections are opened once and tuned the same way:
+#   - WAL journal (set by the writer): readers never block the writer and vice versa
+#   - synchronous=NORMAL: safe with WAL, far fewer fsyncs than FULL
+#   - mmap_size: reads served from the OS page cache without copies
+#   - busy_timeout: wait for locks instead of failing with "database is locked"
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024  # 256 MB
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_CACHE_SIZE_KB = 16 * 1024  # 16 MB page cache per connection
+DEFAULT_MAX_READERS = 8
+DEFAULT_CHECKOUT_TIMEOUT_S = 30.0   # wait for a free reader before giving up
+
+class PoolExhaustedError(TimeoutError):
+    """Every reader stayed checked out for longer than the checkout timeout."""
+
+class SQLitePool:
+    """
+    A small pool for one SQLite database file.
+
+    Readers are checked out with `reader()`. Each connection is used by one thread
+    at a time and goes back to the pool afterwards, so short-lived request threads
+    reuse connections instead of opening new ones.
+    All writes go through the single `writer()` connection behind a lock, so
+    writers queue up in-process instead of fighting over SQLite's file lock.
+    """
+
+    def __init__(self, path, max_readers=DEFAULT_MAX_READERS, mmap_size=DEFAULT_MMAP_SIZE,
+                 busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS, cache_size_kb=DEFAULT_CACHE_SIZE_KB,
+                 checkout_timeout_s=DEFAULT_CHECKOUT_TIMEOUT_S):
+        self.path = path
+        self.max_readers = max_readers
+        self.checkout_timeout_s = checkout_timeout_s
+        self.mmap_size = mmap_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+
+        self.write_lock = threading.RLock()
+        self._writer = None
+
+        self._checkouts = 0
+        self._waits = 0
+
+    def _connect(self):
+        # Connections move between threads, but only ever one thread at a time
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    @property
+    def writer_connection(self):
+        """The single write connection (opened on first use, switches the file to WAL)."""
+        if self._writer is None:
+            with self.write_lock:
+                if self._writer is None:
+                    conn = self._connect()
+                    conn.execute("PRAGMA journal_mode = WAL")
+                    self._writer = conn
+        return self._writer
+
+    @contextmanager
+    def writer(self):
+        """
+        Serialized write access. Commits on success, rolls back on error.
+        """
+        with self.write_lock:
+            conn = self.writer_connection
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    @contextmanager
+    def reader(self):
+        """
+        Checks out a read connection for the duration of the block.
+        Readers never switch the journal mode: a file that is only read stays byte-identical.
+        """
+        conn = None
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._reader_lock:
+                if self._reader_count < self.max_readers:
+                    self._reader_count += 1
+                    conn = self._connect()
+            if conn is None:
+                self._waits += 1
+                try:
+                    conn = self._readers.get(timeout=self.checkout_timeout_s)
+                except queue.Empty:
+                    raise PoolExhaustedError(
+                        f"❌ No free SQLite reader for {self.path}: all {self.max_readers} stayed "
+                        f"checked out for {self.checkout_timeout_s:.0f}s (a leaked or very slow query?)"
+                    ) from None
+
+        self._checkouts += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "readers_open": self._reader_count,
+            "readers_idle": self._readers.qsize(),
+            "reader_checkouts": self._checkouts,
+            "reader_waits": self._waits,
+            "writer_open": self._writer is not None,
+        }
+
+    def close(self):
+        """Closes all idle readers and the writer."""
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._reader_lock:
+            self._reader_count = 0
+        with self.write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path, **kwargs):
+    """Returns the process-wide pool for a database file (created on first use)."""
+    key = os.path.abspath(path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = SQLitePool(key, **kwargs)
+                _pools[key] = pool
+    return pool
+
+def close_all_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
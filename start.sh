@@ -35,12 +35,16 @@ else
     echo "⚠️ seed_database.py not found, skipping."
 fi
 
+# 4. Apply index migrations (the app itself never changes the schema)
+echo "📦 Applying database migrations..."
+python -m src.utils.migrations || echo "⚠️ Migrations failed, continuing without the lookup indexes."
+
 echo "🚀 Starting Services..."
 
-# 4. Start the Flask backend in the background
-echo "Starting Flask Server (Backend)..."
+# 5. Start the FastAPI backend (uvicorn) in the background
+echo "Starting FastAPI Server (Backend, uvicorn)..."
 python main.py &
 
-# 5. Start the Streamlit frontend in the foreground
+# 6. Start the Streamlit frontend in the foreground
 echo "Starting Streamlit App (Frontend)..."
 streamlit run app.py --server.port=8501 --server.address=0.0.0.0
@@ -0,0 +1,37 @@
+import asyncio
+import os
+os.environ.setdefault("LLM_PROVIDER", "fake")     # before main builds the agent model
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+import main
+
+class ScriptedAgent:
+    """Replays (mode, chunk) pairs the way CompiledGraph.astream yields them."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    async def astream(self, inputs, config, stream_mode):
+        for item in self.stream:
+            yield item
+
+    async def aget_state(self, config):
+        return SimpleNamespace(next=(), values={})
+
+def _events(agent):
+    async def collect():
+        return [e async for e in main.run_agent_events(agent, "t1", user_message="hi")]
+    return asyncio.run(collect())
+
+def test_only_agent_node_tokens_are_streamed():
+    agent = ScriptedAgent([
+        ("messages", (AIMessageChunk(content="SELECT * "), {"langgraph_node": "tools"})),
+        ("messages", (AIMessageChunk(content="Hello "), {"langgraph_node": "agent"})),
+        ("messages", (AIMessageChunk(content="there"), {"langgraph_node": "agent"})),
+        ("updates", {"agent": {"messages": [AIMessage(content="Hello there")]}}),
+    ])
+    events = _events(agent)
+    assert [d["content"] for e, d in events if e == "token"] == ["Hello ", "there"]
+    assert events[-1] == ("done", {"status": "completed", "response": "Hello there", "thread_id": "t1"})
@@ -0,0 +1,115 @@
+import sqlite3
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from src.agents import checkpoints
+from src.utils.sqlite_pool import close_all_pools, get_pool
+
+def _agent(state):
+    if isinstance(state["messages"][-1], ToolMessage):
+        return {"messages": [AIMessage(content="Done.")]}
+    call = {"name": "send_email", "args": {"to": "guest"}, "id": f"call_{len(state['messages'])}"}
+    return {"messages": [AIMessage(content="", tool_calls=[call])]}
+
+def _sensitive_tools(state):
+    call = state["messages"][-1].tool_calls[0]
+    return {"messages": [ToolMessage(content="sent", tool_call_id=call["id"], name=call["name"])]}
+
+@pytest.fixture
+def memory_path(tmp_path):
+    yield str(tmp_path / "agent_memory.db")
+    close_all_pools()
+
+def _graph(path):
+    # Same checkpointer setup and interrupt as src.agents.graph
+    pool = get_pool(path)
+    memory = SqliteSaver(pool.writer_connection)
+    memory.lock = pool.write_lock
+    workflow = StateGraph(MessagesState)
+    workflow.add_node("agent", _agent)
+    workflow.add_node("sensitive_tools", _sensitive_tools)
+    workflow.add_edge(START, "agent")
+    workflow.add_conditional_edges(
+        "agent", lambda s: "sensitive_tools" if s["messages"][-1].tool_calls else END)
+    workflow.add_edge("sensitive_tools", "agent")
+    return workflow.compile(checkpointer=memory, interrupt_before=["sensitive_tools"])
+
+def _turn(app, thread_id, approve=True):
+    config = {"configurable": {"thread_id": thread_id}}
+    app.invoke({"messages": [HumanMessage(content="Offer a discount")]}, config)
+    if approve:
+        app.invoke(None, config)
+    return config
+
+def _count(path, table, thread_id):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+def test_compaction_keeps_a_paused_thread_resumable(memory_path):
+    app = _graph(memory_path)
+    for _ in range(5):
+        done = _turn(app, "done")
+    paused = _turn(app, "paused", approve=False)
+    before = app.get_state(paused)
+    assert before.next == ("sensitive_tools",)
+    done_messages = app.get_state(done).values["messages"]
+
+    stats = checkpoints.compact_checkpoints(memory_path, keep=1, ttl_days=0)
+    assert stats["checkpoints_deleted"] > 0 and stats["threads_expired"] == 0
+    assert _count(memory_path, "checkpoints", "done") == 1
+
+    # Completed thread: same history. Paused thread: same pending step, and it resumes
+    assert app.get_state(done).values["messages"] == done_messages
+    after = app.get_state(paused)
+    assert after.next == ("sensitive_tools",) and after.values == before.values
+    result = app.invoke(None, paused)
+    assert [m.content for m in result["messages"][-2:]] == ["sent", "Done."]
+
+def test_idle_threads_expire_completely(memory_path):
+    app = _graph(memory_path)
+    _turn(app, "old")
+    stats = checkpoints.compact_checkpoints(memory_path, keep=5, ttl_days=1e-9)
+    assert stats["threads_expired"] == 1
+    assert _count(memory_path, "checkpoints", "old") == 0
+    assert _count(memory_path, "writes", "old") == 0
+
+def test_full_vacuum_only_when_asked(memory_path):
+    app = _graph(memory_path)
+    for _ in range(3):
+        _turn(app, "t")
+    checkpoints.compact_checkpoints(memory_path, keep=1, ttl_days=0)
+
+    online = checkpoints.reclaim_space(memory_path)
+    assert online["needs_full_vacuum"] and not online["full_vacuum"]
+    with get_pool(memory_path).reader() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+
+    offline = checkpoints.reclaim_space(memory_path, full_vacuum=True)
+    assert offline["full_vacuum"] and not offline["needs_full_vacuum"]
+    assert not checkpoints.reclaim_space(memory_path)["needs_full_vacuum"]
+
+def test_busy_database_is_retried_then_reported(memory_path):
+    calls = []
+
+    def locked_twice(path):
+        calls.append(path)
+        if len(calls) < 3:
+            raise sqlite3.OperationalError("database is locked")
+        return "ok"
+
+    assert checkpoints._retry_busy(locked_twice, memory_path, delay=0) == "ok"
+    calls.clear()
+
+    def always_locked(path):
+        calls.append(path)
+        raise sqlite3.OperationalError("database is locked")
+
+    with pytest.raises(sqlite3.OperationalError):
+        checkpoints._retry_busy(always_locked, memory_path, delay=0)
+    assert len(calls) == checkpoints.BUSY_RETRIES
@@ -0,0 +1,37 @@
+import sqlite3
+
+import pytest
+
+from src.utils import db_ops
+from src.utils.setup_db import create_schema, generate_synthetic_bookings, setup_database
+from src.utils.sqlite_pool import close_all_pools
+
+@pytest.fixture
+def use_db(monkeypatch):
+    def use(path):
+        monkeypatch.setattr(db_ops, "DB_PATH", str(path))
+        db_ops._has_fts.pop(str(path), None)
+    yield use
+    close_all_pools()
+
+def test_lookups_leave_an_unmigrated_database_untouched(tmp_path, use_db):
+    path = tmp_path / "bookings.db"
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    generate_synthetic_bookings(conn, 20)
+    customer_id, name = conn.execute("SELECT customer_id, name FROM bookings LIMIT 1").fetchone()
+    conn.close()
+    before = path.read_bytes()
+
+    use_db(path)
+    assert db_ops.fetch_booking_by_id(customer_id)["name"] == name
+    assert customer_id in [r["customer_id"] for r in db_ops.search_customers_by_name(name)]
+    assert not db_ops.has_name_index()
+    close_all_pools()
+    assert path.read_bytes() == before
+
+def test_setup_database_applies_the_migrations(tmp_path, use_db):
+    path = tmp_path / "bookings.db"
+    setup_database(str(path), rows=50)
+    use_db(path)
+    assert db_ops.has_name_index()
@@ -0,0 +1,54 @@
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.agents.llm_cache import LLMCacheMiss, LLMResponseStore, ModelCache, cache_key, get_model_cache
+from src.utils.sqlite_pool import close_all_pools
+
+@pytest.fixture
+def store(tmp_path):
+    yield LLMResponseStore(str(tmp_path / "llm_cache.db"))
+    close_all_pools()
+
+def _prompt(call_id, tokens, message_id):
+    call = {"name": "get_customer_risk_score", "args": {"customer_id": 5}, "id": call_id}
+    return dumps([
+        HumanMessage(content="Customer 5?", id=message_id),
+        AIMessage(content="", tool_calls=[call], id=message_id,
+                  usage_metadata={"input_tokens": tokens, "output_tokens": 3, "total_tokens": tokens + 3}),
+        ToolMessage(content='{"risk_score": 0.8}', tool_call_id=call_id, response_metadata={"duration_ms": tokens}),
+    ])
+
+def test_key_ignores_per_run_ids_and_metadata():
+    assert cache_key(_prompt("call_abc", 10, "m1"), "model-a") == cache_key(_prompt("call_xyz", 99, "m2"), "model-a")
+    assert cache_key(_prompt("call_abc", 10, "m1"), "model-a") != cache_key(_prompt("call_abc", 10, "m1"), "model-b")
+
+def test_key_keeps_the_conversation():
+    other = _prompt("call_abc", 10, "m1").replace("Customer 5?", "Customer 6?")
+    assert cache_key(_prompt("call_abc", 10, "m1"), "model-a") != cache_key(other, "model-a")
+
+def _model(store, mode, responses):
+    return FakeListChatModel(responses=responses, cache=ModelCache(store, "fake", mode))
+
+def test_record_then_replay(store):
+    # Same model settings (FakeListChatModel puts its responses in the llm_string)
+    recorded = _model(store, "record", ["Offer 10%."]).invoke("Customer 5 wants to cancel")
+    replayed = _model(store, "replay", ["Offer 10%."]).invoke("Customer 5 wants to cancel")
+    assert replayed.content == recorded.content == "Offer 10%."
+    assert store.stats()["fake"]["hits"] == 1
+
+def test_replay_miss_raises(store):
+    with pytest.raises(LLMCacheMiss):
+        _model(store, "replay", ["never used"]).invoke("Something never recorded")
+
+def test_read_through_calls_the_model_once(store):
+    model = _model(store, "read_through", ["first", "second"])
+    assert [model.invoke("hi").content for _ in range(2)] == ["first", "first"]
+    stats = store.stats()["fake"]
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+def test_sampling_models_are_not_cached_outside_replay():
+    assert get_model_cache("m", temperature=0.7, mode="read_through") is None
+    assert get_model_cache("m", temperature=0, mode="off") is None
+    assert get_model_cache("m", temperature=0.7, mode="replay") is not None
@@ -0,0 +1,22 @@
+import os
+os.environ.setdefault("LLM_PROVIDER", "fake")     # before main builds the agent model
+
+from fastapi.testclient import TestClient
+
+import main
+from src.utils.schema_cache import schema_cache
+from src.utils.sql_cache import sql_cache
+
+def test_metrics_include_cache_counters(monkeypatch):
+    monkeypatch.setattr(sql_cache, "template_hits", 3)
+    monkeypatch.setattr(schema_cache, "misses", 2)
+    text = TestClient(main.app).get("/metrics").text      # no lifespan: nothing is warmed up
+    assert "agent_sql_template_hits_total 3" in text
+    assert 'agent_cache_misses_total{cache="schema"} 2' in text
+    for cache in ("churn_model", "sql", "policy_answers"):
+        assert f'agent_cache_hits_total{{cache="{cache}"}}' in text
+    assert "# TYPE agent_churn_model_loads_total counter" in text
+
+def test_admin_caches():
+    stats = TestClient(main.app).get("/admin/caches").json()
+    assert {"churn_model", "schema", "sql", "embeddings", "policy_answers", "retriever"} <= set(stats)
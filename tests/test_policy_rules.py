@@ -0,0 +1,36 @@
+import pytest
+
+from src.rag import policy_rules
+from src.rag.loader import iter_policy_pages
+
+@pytest.fixture(scope="module")
+def rulebook(tmp_path_factory):
+    # Parse the real policy PDF without touching the repo's page cache
+    mp = pytest.MonkeyPatch()
+    mp.setattr(policy_rules, "iter_policy_pages", lambda path: iter_policy_pages(path, workers=1, cache_path=None))
+    db_path = str(tmp_path_factory.mktemp("rules") / "policy_rules.db")
+    policy_rules.build_policy_rules(policy_rules.PDF_PATH, db_path)
+    mp.setattr(policy_rules, "policy_rulebook", policy_rules.PolicyRuleBook(db_path))
+    yield policy_rules.policy_rulebook
+    mp.undo()
+
+def test_scores_use_the_classifier_bands(rulebook):
+    assert policy_rules.lookup_policy_limits(risk_score=0.5, tier="SILVER")["risk_level"] == "LOW"
+    assert policy_rules.lookup_policy_limits(risk_score=0.7, tier="SILVER")["risk_level"] == "HIGH"
+    assert policy_rules.lookup_policy_limits(risk_level="medium", tier="SILVER")["risk_level"] == "MEDIUM"
+
+def test_tier_is_required(rulebook):
+    with pytest.raises(ValueError, match="Platinum|PLATINUM"):
+        policy_rules.lookup_policy_limits(risk_score=0.9)
+    assert policy_rules.lookup_policy_limits(risk_score=0.9, tier="corporate")["tier"] == "PLATINUM"
+
+def test_caps_above_the_approval_threshold_require_approval(rulebook):
+    gold = policy_rules.lookup_policy_limits(risk_level="HIGH", tier="GOLD")
+    assert gold["max_room_discount_pct"] == 25
+    assert gold["requires_approval"] and not gold["system_approved"]
+    assert gold["max_discount_without_approval_pct"] == 20
+
+    silver = policy_rules.lookup_policy_limits(risk_level="HIGH", tier="SILVER")
+    assert silver["max_room_discount_pct"] == 20 and not silver["requires_approval"]
+    assert policy_rules.lookup_policy_limits(risk_level="HIGH", tier="PLATINUM")["requires_approval"]
+    assert not policy_rules.lookup_policy_limits(risk_level="LOW", tier="BRONZE")["requires_approval"]
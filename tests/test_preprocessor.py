@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ml.preprocessor import (
+    FEATURE_COLUMNS, RAW_COLUMNS, FeatureTransformer, check_transformer_parity, feature_engineering,
+)
+
+ROWS = [
+    {"room_type": "Standard", "booking_price": 120.5, "total_stays": 3, "previous_cancellations": 0, "special_requests": "Late checkout"},
+    {"room_type": "Deluxe Suite", "booking_price": 640.0, "total_stays": 1, "previous_cancellations": 2, "special_requests": None},
+    {"room_type": "Presidential", "booking_price": None, "total_stays": None, "previous_cancellations": 1, "special_requests": float("nan")},
+    {"room_type": "Treehouse", "booking_price": 99.99, "total_stays": 7, "previous_cancellations": None, "special_requests": ""},
+    {"room_type": None, "booking_price": 310.0, "total_stays": 0, "previous_cancellations": 0, "special_requests": "Crib"},
+]
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(ROWS, columns=RAW_COLUMNS)
+
+def expected(df, transformer):
+    """The pandas pipeline the transformer replaced."""
+    return feature_engineering(
+        df, is_training=False, room_map=transformer.room_map, unknown_room=transformer.unknown_room
+    ).to_numpy(dtype=np.float32)
+
+def test_dataframe_input_matches_pandas_pipeline(df):
+    transformer = FeatureTransformer()
+    out = transformer.transform(df)
+    assert out.dtype == np.float32
+    assert out.shape == (len(ROWS), len(FEATURE_COLUMNS))
+    np.testing.assert_array_equal(out, expected(df, transformer))
+
+def test_dict_input_matches_pandas_pipeline(df):
+    transformer = FeatureTransformer()
+    np.testing.assert_array_equal(transformer.transform(ROWS), expected(df, transformer))
+    single = np.vstack([transformer.transform_one(row) for row in ROWS])
+    assert single.dtype == np.float32
+    np.testing.assert_array_equal(single, expected(df, transformer))
+
+def test_tuple_input_matches_pandas_pipeline(df):
+    transformer = FeatureTransformer()
+    columns = ["customer_id"] + RAW_COLUMNS[::-1]       # extra column, different order
+    tuples = [tuple([i] + [row[c] for c in RAW_COLUMNS[::-1]]) for i, row in enumerate(ROWS)]
+    np.testing.assert_array_equal(transformer.transform(tuples, columns=columns), expected(df, transformer))
+    np.testing.assert_array_equal(transformer.transform_one(tuples[2], columns=columns), expected(df, transformer)[2:3])
+
+def test_missing_values_and_unknown_room(df):
+    transformer = FeatureTransformer(unknown_room=0)
+    out = transformer.transform(ROWS)
+    assert np.isnan(out[2, 1]) and np.isnan(out[2, 2])      # None price / stays stay NaN
+    assert out[2, 4] == 0.0 and out[1, 4] == 0.0            # NaN / None requests -> 0
+    assert out[3, 4] == 1.0                                 # empty string is present (pandas notna)
+    assert out[3, 0] == 0.0 and out[4, 0] == 0.0            # unknown / missing room -> unknown code
+    assert transformer.unknown_rooms == 2
+
+def test_learned_room_map(df):
+    transformer = FeatureTransformer(room_map={"Deluxe Suite": 0, "Presidential": 1, "Standard": 2}, unknown_room=-1)
+    np.testing.assert_array_equal(transformer.transform(df), expected(df, transformer))
+    assert check_transformer_parity(df, transformer)
+
+def test_empty_batch():
+    out = FeatureTransformer().transform([])
+    assert out.shape == (0, len(FEATURE_COLUMNS)) and out.dtype == np.float32
@@ -0,0 +1,43 @@
+import json
+import sqlite3
+
+import pytest
+
+from src.utils.result_pager import format_result_page
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE bookings (booking_id INTEGER, name TEXT, notes TEXT)")
+    conn.executemany("INSERT INTO bookings VALUES (?, ?, ?)", [(i, f"Guest {i}", "x" * 50) for i in range(40)])
+    yield conn
+    conn.close()
+
+def test_select_gets_a_next_cursor(conn):
+    sql = "SELECT * FROM bookings"
+    page = json.loads(format_result_page(conn.execute(sql), sql=sql, max_rows=10))
+    assert page["row_count"] == 10 and "next_cursor" in page
+
+def test_non_select_gets_no_cursor(conn):
+    for sql in ("EXPLAIN SELECT * FROM bookings", "PRAGMA table_info(bookings)",
+                "WITH b AS (SELECT * FROM bookings) SELECT * FROM b"):
+        page = json.loads(format_result_page(conn.execute(sql), sql=sql, max_rows=2))
+        assert page["truncated"] and "next_cursor" not in page
+
+def test_oversized_first_row_is_cut_to_the_budget(conn):
+    conn.execute("UPDATE bookings SET notes = ? WHERE booking_id = 0", ("y" * 20_000,))
+    sql = "SELECT * FROM bookings ORDER BY booking_id"
+    text = format_result_page(conn.execute(sql), sql=sql, max_bytes=1000)
+    page = json.loads(text)
+    assert page["row_count"] == 1 and page["values_truncated"]
+    assert len(json.dumps(page["columns"]["notes"])) < 1000
+    assert page["columns"]["name"] == ["Guest 0"]
+    assert "chars cut" in page["columns"]["notes"][0]
+
+def test_next_cursor_is_the_same_for_the_same_page(conn):
+    sql = "SELECT * FROM bookings"
+    first, second = (json.loads(format_result_page(conn.execute(sql), sql=sql, max_rows=10))["next_cursor"]
+                     for _ in range(2))
+    assert first == second
+    other = json.loads(format_result_page(conn.execute(sql), sql=sql, offset=10, max_rows=10))["next_cursor"]
+    assert other != first
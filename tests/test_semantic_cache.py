@@ -0,0 +1,21 @@
+import numpy as np
+
+from src.rag.cache import SemanticCache, answer_namespace
+
+VECTOR = np.ones(8, dtype=np.float32)     # worst case: both queries embed identically
+
+def test_risk_level_is_part_of_the_namespace():
+    cache = SemanticCache(threshold=0.92)
+    high = "What discount can we offer HIGH risk guests?"
+    low = "What discount can we offer LOW risk guests?"
+    cache.store(VECTOR, "HIGH risk: up to 25% off", query=high, namespace=answer_namespace(high, "dense:k=2"))
+
+    assert cache.lookup(VECTOR, namespace=answer_namespace(low, "dense:k=2")) is None
+    answer, _, _ = cache.lookup(VECTOR, namespace=answer_namespace("what discount can we offer high risk guests", "dense:k=2"))
+    assert answer == "HIGH risk: up to 25% off"
+
+def test_tier_and_numbers_are_part_of_the_namespace():
+    base = "hybrid:k=3"
+    assert answer_namespace("offers for gold members", base) != answer_namespace("offers for silver members", base)
+    assert answer_namespace("is a 20% discount allowed", base) != answer_namespace("is a 30% discount allowed", base)
+    assert answer_namespace("Offers for GOLD members?", base) == answer_namespace("offers for gold members", base)
@@ -0,0 +1,43 @@
+from src.utils.sql_cache import TextToSQLCache, match_sql_template
+from src.utils.sqlite_pool import close_all_pools
+
+def test_customer_id_uses_template():
+    name, sql, params = match_sql_template("What is the booking price for customer ID 101?")
+    assert name == "customer_id_lookup"
+    assert "customer_id = ?" in sql
+    assert params[0] == 101
+
+def test_booking_id_goes_to_llm():
+    assert match_sql_template("Show booking ID 5") is None
+    assert match_sql_template("id 5") is None
+
+def test_name_keeps_apostrophe_and_case():
+    name, sql, params = match_sql_template("Get details for customer named O'Brien")
+    assert name == "name_search"
+    assert params[0] == "%O'Brien%"
+
+def test_name_followed_by_clause_goes_to_llm():
+    assert match_sql_template("customers named john ordered by price") is None
+    assert match_sql_template("customers named john, sorted by price") is None
+
+def test_plain_name_uses_template():
+    _, _, params = match_sql_template("give the details of customer named prakash saini?")
+    assert params[0] == "%prakash saini%"
+
+def _stored_hits(cache):
+    with cache._pool().reader() as conn:
+        return dict(conn.execute("SELECT question, hits FROM sql_cache"))
+
+def test_cache_hits_are_written_in_batches(tmp_path):
+    cache = TextToSQLCache(str(tmp_path / "sql_cache.db"))
+    cache.put("Top 3 suites", "schema", "SELECT 1", 1.5)
+    for _ in range(3):
+        assert cache.get("top 3 suites?", "schema") == "SELECT 1"
+    assert _stored_hits(cache) == {"top 3 suites": 0}      # lookups did not write
+
+    cache.flush_hits()
+    assert _stored_hits(cache) == {"top 3 suites": 3}
+    cache.get("Top 3 suites", "schema")
+    cache.put("Cheapest room", "schema", "SELECT 2", 1.0)   # a write flushes pending hits too
+    assert _stored_hits(cache) == {"top 3 suites": 4, "cheapest room": 0}
+    close_all_pools()
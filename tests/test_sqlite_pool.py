@@ -0,0 +1,13 @@
+import pytest
+
+from src.utils.sqlite_pool import PoolExhaustedError, SQLitePool
+
+def test_reader_checkout_times_out(tmp_path):
+    pool = SQLitePool(str(tmp_path / "pool.db"), max_readers=1, checkout_timeout_s=0.05)
+    with pool.reader():
+        with pytest.raises(PoolExhaustedError):
+            with pool.reader():
+                pass
+    with pool.reader() as conn:         # the reader is back in the pool
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+    pool.close()
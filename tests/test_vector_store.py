@@ -0,0 +1,67 @@
+import os
+
+import pytest
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.rag import retriever, store
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    model = DeterministicFakeEmbedding(size=32)
+    monkeypatch.setattr(store, "get_embedding_model", lambda: model)
+    monkeypatch.setattr(retriever, "get_embedding_model", lambda: model)
+    return model
+
+def _docs(*texts):
+    return [Document(page_content=text, metadata={"source": "policy.pdf", "page": i})
+            for i, text in enumerate(texts)]
+
+def _build(db_path, *texts):
+    return store._build(iter(_docs(*texts)), str(db_path), rebuild=False, workers=0, batch_size=8)
+
+def test_version_names_sort_in_build_order(tmp_path):
+    paths = []
+    for _ in range(50):
+        paths.append(store._new_version_path(str(tmp_path / "chroma_db")))
+        os.makedirs(paths[-1])
+    assert sorted(paths) == paths and len(set(paths)) == len(paths)
+
+def test_retriever_follows_a_swap_made_elsewhere(tmp_path, fake_embeddings):
+    db_path = tmp_path / "chroma_db"
+    _build(db_path, "Gold guests get a free upgrade.")
+    service = retriever.RetrieverService(db_path=str(db_path), backend="numpy", default_k=1)
+    first = service.invoke("upgrade")[0].page_content
+
+    # Rebuilt by another process: this process' retriever_service.reload() is never called
+    _build(db_path, "Platinum guests get a suite.")
+    second = service.invoke("suite")[0].page_content
+    assert (first, second) == ("Gold guests get a free upgrade.", "Platinum guests get a suite.")
+
+def _live_ids(db_path):
+    vectorstore = Chroma(persist_directory=os.path.realpath(db_path),
+                         embedding_function=store.get_embedding_model())
+    return set(vectorstore.get(include=[])["ids"])
+
+def test_incremental_update_embeds_only_changes(tmp_path, fake_embeddings):
+    db_path = tmp_path / "chroma_db"
+    first = _build(db_path, "Room upgrades", "Late checkout", "Loyalty points")
+    assert (first["added"], first["deleted"], first["unchanged"]) == (3, 0, 0)
+
+    second = _build(db_path, "Room upgrades", "Late checkout", "Free breakfast")
+    assert (second["added"], second["deleted"], second["unchanged"]) == (1, 1, 2)
+    assert second["path"] != first["path"] and os.path.realpath(db_path) == second["path"]
+    expected = {store.chunk_id(doc) for doc in _docs("Room upgrades", "Late checkout", "Free breakfast")}
+    assert _live_ids(db_path) == expected
+
+    # Nothing changed: no new version is swapped in
+    third = _build(db_path, "Room upgrades", "Late checkout", "Free breakfast")
+    assert (third["added"], third["deleted"], third["path"]) == (0, 0, second["path"])
+
+def test_swap_keeps_the_live_version_and_prunes_old_ones(tmp_path, fake_embeddings):
+    db_path = tmp_path / "chroma_db"
+    paths = [_build(db_path, f"Policy revision {i}")["path"] for i in range(4)]
+    assert os.path.islink(db_path) and os.path.realpath(db_path) == paths[-1]
+    versions = sorted(p for p in os.listdir(tmp_path) if p.startswith("chroma_db."))
+    assert [str(tmp_path / v) for v in versions] == paths[-store.KEEP_VERSIONS:]